@@ -0,0 +1,4 @@
+"""
+Benchmark scripts for the backend.
+Run from the backend directory, e.g. `python -m benchmarks.bench_contract_pdf`.
+"""
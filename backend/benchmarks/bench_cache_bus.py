@@ -0,0 +1,124 @@
+"""
+Cache bus check across processes: starts several listener processes on the
+unix bus (in a private namespace, so a running server isn't disturbed), sends
+invalidations and topic messages from this process, and reports whether every
+listener received each one and how long delivery took (p50/p95/max ms).
+Exits non-zero if any message was lost.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_cache_bus --processes 4 --messages 200
+"""
+import argparse
+import multiprocessing
+import os
+import queue
+import statistics
+import sys
+import time
+import uuid
+from typing import Dict, List
+
+TOPIC = 'bench'
+
+
+def _listener(ready, results, expected: int) -> None:
+    import asyncio
+
+    from cache import InvalidationBus
+
+    async def listen():
+        bus = InvalidationBus()
+        jobs = bus.cache('jobs')
+        received: Dict[str, List[float]] = {'invalidate': [], 'topic': []}
+
+        def on_invalidate():
+            received['invalidate'].append(time.time())
+
+        def on_topic(data):
+            received['topic'].append(time.time() - data['sent'])
+
+        bus.on_remote_invalidate('jobs', on_invalidate)
+        bus.subscribe(TOPIC, on_topic)
+        await bus.start('unix')
+        jobs.set('key', 'value')
+        ready.put(os.getpid())
+        deadline = time.time() + 30
+        while len(received['topic']) < expected and time.time() < deadline:
+            await asyncio.sleep(0.01)
+        await bus.stop()
+        results.put({
+            'pid': os.getpid(),
+            'invalidations': len(received['invalidate']),
+            'cleared': jobs.get('key') is None,
+            'topic_latencies_ms': [seconds * 1000 for seconds in received['topic']],
+        })
+
+    asyncio.run(listen())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--processes', type=int, default=4, help='Listener processes')
+    parser.add_argument('--messages', type=int, default=200, help='Topic messages to send (plus one invalidation each)')
+    args = parser.parse_args()
+
+    # Children inherit the namespace; must be set before `cache` is imported
+    os.environ['CACHE_BUS_NAMESPACE'] = f"bench-{uuid.uuid4().hex[:8]}"
+    os.environ.pop('CACHE_BUS_DIR', None)
+    import asyncio
+
+    from cache import CACHE_BUS_DIR, InvalidationBus
+
+    context = multiprocessing.get_context('spawn')
+    ready, results = context.Queue(), context.Queue()
+    listeners = [context.Process(target=_listener, args=(ready, results, args.messages)) for _ in range(args.processes)]
+    for process in listeners:
+        process.start()
+    for _ in listeners:
+        ready.get(timeout=30)
+
+    async def send():
+        bus = InvalidationBus()
+        await bus.start('unix')
+        for _ in range(args.messages):
+            bus.invalidate('jobs')
+            bus.publish(TOPIC, {'sent': time.time()})
+            # Datagrams to a full receive buffer are dropped; pace like real writes
+            await asyncio.sleep(0.001)
+        await bus.stop()
+
+    asyncio.run(send())
+
+    reports = []
+    for _ in listeners:
+        try:
+            reports.append(results.get(timeout=60))
+        except queue.Empty:
+            break
+    for process in listeners:
+        process.join(timeout=5)
+    try:
+        os.rmdir(CACHE_BUS_DIR)
+    except OSError:
+        pass
+
+    print(f"{len(listeners)} listeners on {CACHE_BUS_DIR}, {args.messages} invalidations + {args.messages} topic messages")
+    lost = len(listeners) - len(reports)
+    for report in sorted(reports, key=lambda report: report['pid']):
+        latencies = sorted(report['topic_latencies_ms'])
+        missing = args.messages - len(latencies)
+        missing_invalidations = args.messages - report['invalidations']
+        lost += bool(missing or missing_invalidations or not report['cleared'])
+        line = f"pid {report['pid']}: {len(latencies)}/{args.messages} topic, {report['invalidations']}/{args.messages} invalidations"
+        if latencies:
+            p95 = latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]
+            line += f", latency p50 {statistics.median(latencies):.2f} p95 {p95:.2f} max {latencies[-1]:.2f} ms"
+        print(line)
+    if lost:
+        print(f"FAILED: {lost} listener(s) missed messages")
+        sys.exit(1)
+    print("OK: every listener received every message")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Benchmark contract PDF generation: bytes/PDF and ms/PDF for the default
+layout vs compact mode.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_contract_pdf --count 1000
+"""
+import argparse
+import random
+import statistics
+import time
+from typing import Any, Dict, List, Tuple
+
+from contract_pdf import generate_contract_pdf
+
+FIRST_NAMES = ['Juan', 'María', 'José', 'Guadalupe', 'Francisco', 'Rosa', 'Miguel', 'Ana']
+LAST_NAMES = ['Hernández', 'García', 'Martínez', 'López', 'González', 'Pérez', 'Sánchez', 'Ramírez']
+FARMS = ['Farm A', 'Farm B', 'Agrícola Los Pinos', 'Rancho El Vergel', 'Campo San Simón']
+
+
+def make_contracts(count: int, seed: int = 42) -> List[Tuple[Dict[str, Any], ...]]:
+    """Build `count` varied (contract, job, worker, grower) argument tuples."""
+    rng = random.Random(seed)
+    contracts = []
+    for i in range(count):
+        crop = rng.choice(['Tomato', 'Strawberry'])
+        contracts.append((
+            {'id': i + 1, 'status': 'signed'},
+            {
+                'title': f"{crop} Picker" if crop == 'Tomato' else f"{crop} Harvester",
+                'crop_type': crop,
+                'pay_rate_mxn': round(rng.uniform(5.0, 45.0), 2),
+                'unit_type': 'Buckets' if crop == 'Tomato' else 'Flats',
+                'start_date': f"2026-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+                'workers_requested': rng.randint(15, 40),
+                'description': f"{crop} harvesting job.",
+            },
+            {
+                'user_id': f"{rng.getrandbits(128):032x}",
+                'name': f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {rng.choice(LAST_NAMES)}",
+                'phone': f"+52{rng.randint(6000000000, 6999999999)}",
+            },
+            {'farm_name': rng.choice(FARMS), 'location': 'San Quintín, Baja California'},
+        ))
+    return contracts
+
+
+def run(contracts, compact: bool) -> Dict[str, float]:
+    sizes = []
+    timings = []
+    for contract, job, worker, grower in contracts:
+        start = time.perf_counter()
+        pdf = generate_contract_pdf(contract, job, worker, grower, compact=compact)
+        timings.append((time.perf_counter() - start) * 1000)
+        sizes.append(len(pdf.getvalue()))
+    timings.sort()
+    return {
+        'bytes_mean': statistics.mean(sizes),
+        'bytes_max': max(sizes),
+        'ms_mean': statistics.mean(timings),
+        'ms_p95': timings[int(len(timings) * 0.95) - 1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--count', type=int, default=1000, help='Number of contracts per mode')
+    args = parser.parse_args()
+
+    contracts = make_contracts(args.count)
+    # Warm up imports and style caches so the first mode isn't penalized
+    run(contracts[:5], compact=False)
+    run(contracts[:5], compact=True)
+
+    results = {'default': run(contracts, compact=False), 'compact': run(contracts, compact=True)}
+
+    print(f"Contract PDFs: {args.count} per mode")
+    print(f"{'mode':<10}{'bytes/PDF':>12}{'max bytes':>12}{'ms/PDF':>10}{'p95 ms':>10}")
+    for mode, r in results.items():
+        print(f"{mode:<10}{r['bytes_mean']:>12.0f}{r['bytes_max']:>12}{r['ms_mean']:>10.2f}{r['ms_p95']:>10.2f}")
+    saved = 1 - results['compact']['bytes_mean'] / results['default']['bytes_mean']
+    print(f"compact saves {saved:.1%} bytes/PDF")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Benchmark response formats: bytes on the wire (raw and gzipped) and
+encode/decode ms for JSON, MessagePack and the columnar layouts on
+`JobResponse` and `Contract` lists.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_response_formats --count 200
+"""
+import argparse
+import gzip
+import json
+import random
+import statistics
+import time
+from typing import Any, Callable, Dict, List
+
+from fastapi.encoders import jsonable_encoder
+
+from formats import MEDIA_TYPES, encode, from_columnar
+from models import Contract, JobResponse
+
+CROPS = {'Tomato': ('Tomato Picker', 'Buckets'), 'Strawberry': ('Strawberry Harvester', 'Flats')}
+STATUSES = ['pending', 'accepted', 'rejected', 'signed', 'completed']
+
+FORMATS = [
+    'application/json',
+    'application/vnd.columnar+json',
+    'application/msgpack',
+    'application/vnd.columnar+msgpack',
+]
+
+
+def make_jobs(count: int, seed: int = 42) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    jobs = []
+    for i in range(count):
+        crop = rng.choice(list(CROPS))
+        title, unit = CROPS[crop]
+        rate = round(rng.uniform(5.0, 45.0), 2)
+        quantity = rng.randint(200, 2000)
+        requested = rng.randint(15, 40)
+        accepted = rng.randint(0, requested)
+        jobs.append(JobResponse(
+            id=i + 1,
+            title=title,
+            pay=f"${rate:.2f} MXN per {unit.rstrip('s').lower()}",
+            location=rng.choice(['Farm A', 'Farm B', 'Rancho El Vergel']),
+            date=f"2026-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            description=f"{crop} harvesting job. {quantity} {unit.lower()} needed.",
+            crop_type=crop,
+            quantity=quantity,
+            workers_requested=requested,
+            pay_rate_mxn=rate,
+            total_value_mxn=round(rate * quantity, 2),
+            service_time_mins=round(rng.uniform(120, 480), 1),
+            applications_count=accepted + rng.randint(0, 20),
+            accepted_count=accepted,
+            has_openings=accepted < requested,
+        ))
+    return jsonable_encoder(jobs)
+
+
+def make_contracts(count: int, seed: int = 42) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    contracts = []
+    for i in range(count):
+        crop = rng.choice(list(CROPS))
+        title, unit = CROPS[crop]
+        contracts.append(Contract(
+            id=i + 1,
+            job_id=rng.randint(1, 500),
+            job_title=title,
+            pay=f"${rng.uniform(5.0, 45.0):.2f} MXN per {unit.rstrip('s').lower()}",
+            location='San Quintín, Baja California',
+            date=f"2026-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            status=rng.choice(STATUSES),
+            worker_id=f"{rng.getrandbits(128):032x}",
+            created_at=f"2026-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T08:00:00+00:00",
+        ))
+    return jsonable_encoder(contracts)
+
+
+def _decoder(media_type: str) -> Callable[[bytes], Any]:
+    encoding, columnar = MEDIA_TYPES[media_type]
+    if encoding == 'msgpack':
+        import msgpack
+
+        loads = msgpack.unpackb
+    else:
+        loads = json.loads
+    if columnar:
+        return lambda body: from_columnar(loads(body))
+    return loads
+
+
+def _ms(fn: Callable[[], Any], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def run(rows: List[Dict[str, Any]], media_type: str, repeat: int) -> Dict[str, float]:
+    body = encode(rows, media_type)
+    decode = _decoder(media_type)
+    # Decoding back to row objects must round-trip exactly
+    assert decode(body) == rows, media_type
+    return {
+        'bytes': len(body),
+        'gzip': len(gzip.compress(body)),
+        'encode_ms': _ms(lambda: encode(rows, media_type), repeat),
+        'decode_ms': _ms(lambda: decode(body), repeat),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--count', type=int, default=200, help='Rows per response')
+    parser.add_argument('--repeat', type=int, default=50, help='Timed runs per format (median reported)')
+    args = parser.parse_args()
+
+    try:
+        import msgpack  # noqa: F401
+        formats = FORMATS
+    except ImportError:
+        print("msgpack not installed; benchmarking JSON layouts only")
+        formats = [media_type for media_type in FORMATS if MEDIA_TYPES[media_type][0] == 'json']
+
+    for shape, rows in (('JobResponse', make_jobs(args.count)), ('Contract', make_contracts(args.count))):
+        results = {media_type: run(rows, media_type, args.repeat) for media_type in formats}
+        baseline = results['application/json']
+        print(f"\n{shape}: {args.count} rows")
+        print(f"{'format':<34}{'bytes':>9}{'gzip':>8}{'vs json':>9}{'enc ms':>9}{'dec ms':>9}")
+        for media_type, r in results.items():
+            ratio = r['bytes'] / baseline['bytes']
+            print(
+                f"{media_type:<34}{r['bytes']:>9}{r['gzip']:>8}{ratio:>9.0%}"
+                f"{r['encode_ms']:>9.2f}{r['decode_ms']:>9.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
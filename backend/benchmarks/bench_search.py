@@ -0,0 +1,105 @@
+"""
+Benchmark the job search index: build time for N synthetic jobs and query
+latency (p50/p95/max ms) for keyword, facet and combined searches, both on a
+result-cache miss and on a hit.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_search --count 1000000
+"""
+import argparse
+import random
+import statistics
+import time
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional
+
+from search import JobSearchIndex
+
+CROPS = {'Tomato': ('Tomato Picker', 'Buckets'), 'Strawberry': ('Strawberry Harvester', 'Flats')}
+FARMS = ['Rancho El Vergel', 'Agrícola San Simón', 'Campo Los Pinos', 'Rancho Santa Anita', 'Driscoll Camalú']
+WORDS = ['morning', 'shift', 'harvest', 'packing', 'greenhouse', 'field', 'weekend', 'experienced', 'crew', 'transport']
+
+QUERIES = [
+    ('keyword', 'tomato', {'status': 'open'}),
+    ('two keywords', 'greenhouse morning', {'status': 'open'}),
+    ('prefix', 'green', {'status': 'open'}),
+    ('facet only', None, {'status': 'open', 'crop_type': 'Strawberry'}),
+    ('keyword + facets', 'harvest', {'status': 'open', 'crop_type': 'Tomato', 'pay_bucket': '10-25'}),
+    ('farm facet', None, {'status': 'open', 'farm': 'Rancho El Vergel'}),
+    ('no match', 'zzzz', {'status': 'open'}),
+]
+
+
+def make_jobs(count: int, seed: int = 42) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    start = date.today() - timedelta(days=365)
+    jobs = []
+    for i in range(count):
+        crop = rng.choice(list(CROPS))
+        title, unit = CROPS[crop]
+        jobs.append({
+            'id': i + 1,
+            'title': title,
+            'description': f"{crop} harvesting job. {' '.join(rng.sample(WORDS, 3))}. {unit}.",
+            'crop_type': crop,
+            'pay_rate_mxn': round(rng.uniform(5.0, 45.0), 2),
+            'unit_type': unit,
+            'quantity_units': rng.randint(200, 2000),
+            'workers_requested': rng.randint(5, 40),
+            'start_date': (start + timedelta(days=rng.randint(0, 400))).isoformat(),
+            'status': 'open' if rng.random() < 0.3 else 'closed',
+            'growers': {'farm_name': rng.choice(FARMS)},
+        })
+    return jobs
+
+
+def _percentiles(timings: List[float]) -> Dict[str, float]:
+    timings = sorted(timings)
+    return {
+        'p50': statistics.median(timings),
+        'p95': timings[min(len(timings) - 1, int(0.95 * len(timings)))],
+        'max': timings[-1],
+    }
+
+
+def time_query(index: JobSearchIndex, query: Optional[str], filters: Dict[str, str], repeat: int, cached: bool) -> Dict[str, float]:
+    timings = []
+    for _ in range(repeat):
+        if not cached:
+            index._results.clear()
+        start = time.perf_counter()
+        result = index.search(query=query, filters=filters, limit=20)
+        timings.append((time.perf_counter() - start) * 1000)
+    return {**_percentiles(timings), 'total': result['total']}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--count', type=int, default=100000, help='Jobs in the index')
+    parser.add_argument('--repeat', type=int, default=50, help='Timed runs per query')
+    args = parser.parse_args()
+
+    jobs = make_jobs(args.count)
+    index = JobSearchIndex()
+    start = time.perf_counter()
+    index.add_many(jobs)
+    index.loaded = True
+    build_seconds = time.perf_counter() - start
+    print(f"Indexed {args.count:,} jobs in {build_seconds:.1f}s ({args.count / build_seconds:,.0f} jobs/s)")
+
+    # Token arrays are materialized on first use; warm them like a running server would
+    for _, query, filters in QUERIES:
+        index.search(query=query, filters=filters)
+
+    print(f"\n{'query':<20}{'matches':>10}{'miss p50':>10}{'miss p95':>10}{'miss max':>10}{'hit p50':>9}")
+    for label, query, filters in QUERIES:
+        miss = time_query(index, query, filters, args.repeat, cached=False)
+        hit = time_query(index, query, filters, args.repeat, cached=True)
+        print(
+            f"{label:<20}{miss['total']:>10,}{miss['p50']:>10.2f}{miss['p95']:>10.2f}"
+            f"{miss['max']:>10.2f}{hit['p50']:>9.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
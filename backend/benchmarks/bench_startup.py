@@ -0,0 +1,101 @@
+"""
+Startup-time report: `python -X importtime` breakdown for `import main` plus
+cold-start-to-first-response timings in fresh interpreters.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_startup --runs 5 --top 15
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Modules that should only load when a request actually needs them
+HEAVY_MODULES = ('pandas', 'numpy', 'reportlab', 'supabase')
+
+# Runs in a fresh interpreter: start the app (lifespan included), serve one
+# request that doesn't touch the database, and report which heavy modules loaded.
+FIRST_RESPONSE_SCRIPT = f"""
+import json, sys, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(main.app) as client:
+    started = time.perf_counter()
+    client.get("/")
+    responded = time.perf_counter()
+print(json.dumps({{
+    "import_ms": (imported - start) * 1000,
+    "startup_ms": (started - start) * 1000,
+    "first_response_ms": (responded - start) * 1000,
+    "heavy_loaded": [m for m in {HEAVY_MODULES!r} if m in sys.modules],
+}}))
+"""
+
+
+def _env():
+    env = dict(os.environ)
+    # The first request never reaches Supabase, so placeholder credentials are
+    # enough when real ones aren't configured
+    env.setdefault("SUPABASE_URL", "https://benchmark.supabase.co")
+    env.setdefault("SUPABASE_KEY", "eyJhbGciOiJIUzI1NiJ9.e30.benchmark")
+    return env
+
+
+def import_time_report(top: int):
+    """Parse `python -X importtime -c 'import main'` into (module, self µs, cumulative µs)."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=BACKEND_DIR, env=_env(), capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        # Nesting is shown as two spaces per level after the leading space
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((name.strip(), depth, int(self_us), int(cumulative_us)))
+    total = next((cum for name, depth, _, cum in rows if name == "main"), 0)
+    direct = sorted((r for r in rows if r[1] == 1), key=lambda r: r[3], reverse=True)[:top]
+    return total, direct
+
+
+def first_response_times(runs: int):
+    samples = []
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-c", FIRST_RESPONSE_SCRIPT],
+            cwd=BACKEND_DIR, env=_env(), capture_output=True, text=True, check=True,
+        )
+        samples.append(json.loads(result.stdout.strip().splitlines()[-1]))
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--runs', type=int, default=5, help='Fresh interpreters to time')
+    parser.add_argument('--top', type=int, default=15, help='Heaviest imports to list')
+    args = parser.parse_args()
+
+    total, direct = import_time_report(args.top)
+    print(f"import main: {total / 1000:.0f} ms (python -X importtime)")
+    print(f"{'module':<32}{'cumulative ms':>15}{'self ms':>10}")
+    for name, _, self_us, cumulative_us in direct:
+        print(f"{name:<32}{cumulative_us / 1000:>15.1f}{self_us / 1000:>10.1f}")
+
+    samples = first_response_times(args.runs)
+    print(f"\nCold start, median of {args.runs} fresh interpreters:")
+    for key in ('import_ms', 'startup_ms', 'first_response_ms'):
+        print(f"  {key:<20}{statistics.median(s[key] for s in samples):>10.0f}")
+    print(f"  heavy modules loaded by first response: {', '.join(samples[-1]['heavy_loaded']) or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
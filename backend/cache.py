@@ -0,0 +1,346 @@
+"""
+In-process response caches with cross-process invalidation.
+Each worker process keeps its own LRU caches (for `/jobs` and `/stats`), so a
+hit costs no I/O. Writes call `invalidate(...)`, which clears the affected
+caches locally and broadcasts the namespaces on an invalidation bus that every
+worker process listens on:
+
+- `unix` (default): datagram sockets in a shared directory, one per process.
+  Works for any number of uvicorn/gunicorn workers on one host, no services needed.
+- `postgres`: LISTEN/NOTIFY on a dedicated asyncpg connection to DATABASE_URL,
+  for workers spread across hosts. Needs a session-mode connection (the direct
+  Supabase connection string, not the transaction pooler).
+- `local`: no broadcast; for single-process deployments.
+
+Entries also expire after CACHE_TTL_SECONDS as a backstop for a lost message.
+Besides clearing namespaces, the bus carries small topic messages (`publish`)
+for updates that can be applied in place, such as changed job ids for the
+search index.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", "300"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "256"))
+CACHE_BUS = os.getenv("CACHE_BUS", "unix").strip().lower()
+
+# Sibling processes find each other through sockets in this directory. The
+# default is per user and per checkout, so two deployments on one host don't
+# hear each other; set CACHE_BUS_NAMESPACE (e.g. staging/prod) to separate
+# instances run from the same directory.
+CACHE_BUS_NAMESPACE = os.getenv("CACHE_BUS_NAMESPACE") or hashlib.sha1(
+    os.path.dirname(os.path.abspath(__file__)).encode()
+).hexdigest()[:12]
+CACHE_BUS_DIR = os.getenv("CACHE_BUS_DIR", os.path.join(
+    tempfile.gettempdir(), f"labor-api-cache-bus-{os.getuid() if hasattr(os, 'getuid') else 0}-{CACHE_BUS_NAMESPACE}"
+))
+
+PG_CHANNEL = "cache_invalidation"
+
+_MISSING = object()
+
+
+class LocalCache:
+    """
+    Thread-safe LRU cache with a TTL.
+
+    `generation` increases on every clear. Read it before computing a value
+    and pass it to `set()`: if an invalidation arrived while the value was
+    being computed, the (possibly stale) value is not stored.
+    """
+
+    def __init__(self, name: str, max_entries: int = CACHE_MAX_ENTRIES, ttl_seconds: float = CACHE_TTL_SECONDS):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is not _MISSING and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not _MISSING:
+                del self._entries[key]
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any, generation: Optional[int] = None) -> None:
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.generation += 1
+            self.invalidations += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'invalidations': self.invalidations,
+            }
+
+
+class _UnixSocketTransport:
+    """Broadcast over datagram sockets named <pid>-<origin>.sock in a shared directory."""
+
+    name = 'unix'
+
+    def __init__(self, directory: str, on_message: Callable[[bytes], None]):
+        self.directory = directory
+        self._on_message = on_message
+        self._socket: Optional[socket.socket] = None
+        self._path: Optional[str] = None
+        self._thread: Optional[threading.Thread] = None
+
+    async def start(self) -> None:
+        os.makedirs(self.directory, mode=0o700, exist_ok=True)
+        self._path = os.path.join(self.directory, f"{os.getpid()}-{uuid.uuid4().hex[:8]}.sock")
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        sock.bind(self._path)
+        self._socket = sock
+        self._thread = threading.Thread(target=self._receive, args=(sock,), name="cache-bus", daemon=True)
+        self._thread.start()
+
+    def _receive(self, sock: socket.socket) -> None:
+        while True:
+            try:
+                data = sock.recv(65536)
+            except OSError:
+                return  # socket closed on shutdown
+            if not data:
+                return
+            self._on_message(data)
+
+    def publish(self, data: bytes) -> None:
+        if self._socket is None:
+            return
+        try:
+            peers = os.listdir(self.directory)
+        except FileNotFoundError:
+            return
+        sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        sender.setblocking(False)
+        try:
+            for peer in peers:
+                path = os.path.join(self.directory, peer)
+                if not peer.endswith('.sock') or path == self._path:
+                    continue
+                try:
+                    sender.sendto(data, path)
+                except (ConnectionRefusedError, FileNotFoundError):
+                    # Left behind by a process that exited without cleaning up
+                    try:
+                        os.unlink(path)
+                    except OSError:
+                        pass
+                except BlockingIOError:
+                    print(f"Warning: cache invalidation dropped for busy peer {peer}")
+                except OSError as e:
+                    print(f"Warning: cache invalidation not sent to {peer}: {e}")
+        finally:
+            sender.close()
+
+    async def stop(self) -> None:
+        sock, self._socket = self._socket, None
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            sock.close()
+        if self._path:
+            try:
+                os.unlink(self._path)
+            except OSError:
+                pass
+
+
+class _PostgresTransport:
+    """Broadcast with NOTIFY and receive with LISTEN on one dedicated connection."""
+
+    name = 'postgres'
+
+    def __init__(self, database_url: str, on_message: Callable[[bytes], None]):
+        self.database_url = database_url
+        self._on_message = on_message
+        self._connection = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def start(self) -> None:
+        import asyncpg
+
+        self._loop = asyncio.get_running_loop()
+        self._connection = await asyncpg.connect(
+            self.database_url,
+            statement_cache_size=0,
+            server_settings={'application_name': 'labor-api-cache-bus'},
+        )
+        await self._connection.add_listener(PG_CHANNEL, self._listener)
+
+    def _listener(self, connection, pid, channel, payload: str) -> None:
+        self._on_message(payload.encode())
+
+    def publish(self, data: bytes) -> None:
+        if self._connection is None or self._loop is None:
+            return
+        coroutine = self._notify(data.decode())
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._loop.create_task(coroutine)
+        else:
+            asyncio.run_coroutine_threadsafe(coroutine, self._loop)
+
+    async def _notify(self, payload: str) -> None:
+        try:
+            await self._connection.execute("SELECT pg_notify($1, $2)", PG_CHANNEL, payload)
+        except Exception as e:
+            print(f"Warning: cache invalidation NOTIFY failed: {e}")
+
+    async def stop(self) -> None:
+        connection, self._connection = self._connection, None
+        if connection is not None:
+            await connection.close()
+
+
+class InvalidationBus:
+    """Registry of named caches plus the transport that keeps processes in sync."""
+
+    def __init__(self):
+        self._caches: Dict[str, List[LocalCache]] = {}
+        self._remote_callbacks: Dict[str, List[Callable[[], None]]] = {}
+        self._topic_callbacks: Dict[str, List[Callable[[Dict[str, Any]], None]]] = {}
+        self._transport = None
+        # Identifies our own messages (NOTIFY is delivered to the sender too)
+        self.origin = uuid.uuid4().hex
+        self.sent = 0
+        self.received = 0
+
+    def cache(self, namespace: str, **kwargs) -> LocalCache:
+        """Create a cache that is cleared whenever `namespace` is invalidated."""
+        local = LocalCache(namespace, **kwargs)
+        self._caches.setdefault(namespace, []).append(local)
+        return local
+
+    def on_remote_invalidate(self, namespace: str, callback: Callable[[], None]) -> None:
+        """Run `callback` when another process invalidates `namespace`."""
+        self._remote_callbacks.setdefault(namespace, []).append(callback)
+
+    def subscribe(self, topic: str, callback: Callable[[Dict[str, Any]], None]) -> None:
+        """Run `callback(data)` for each message another process publishes on `topic`."""
+        self._topic_callbacks.setdefault(topic, []).append(callback)
+
+    def publish(self, topic: str, data: Dict[str, Any]) -> None:
+        """Send `data` to every other process subscribed to `topic` (not delivered locally)."""
+        if self._transport is not None:
+            self.sent += 1
+            self._transport.publish(json.dumps({'origin': self.origin, 'topic': topic, 'data': data}).encode())
+
+    def invalidate(self, *namespaces: str) -> None:
+        """Clear the namespaces here and in every other worker process."""
+        self._clear(namespaces)
+        if self._transport is not None:
+            self.sent += 1
+            self._transport.publish(json.dumps({'origin': self.origin, 'namespaces': list(namespaces)}).encode())
+
+    def _clear(self, namespaces: Iterable[str]) -> None:
+        for namespace in namespaces:
+            for local in self._caches.get(namespace, ()):
+                local.clear()
+
+    def _handle_message(self, data: bytes) -> None:
+        try:
+            message = json.loads(data)
+        except ValueError:
+            return
+        if message.get('origin') == self.origin:
+            return
+        self.received += 1
+        if 'topic' in message:
+            for callback in self._topic_callbacks.get(message['topic'], ()):
+                try:
+                    callback(message.get('data') or {})
+                except Exception as e:
+                    print(f"Warning: {message['topic']} message handler failed: {e}")
+            return
+        namespaces = message.get('namespaces') or []
+        self._clear(namespaces)
+        for namespace in namespaces:
+            for callback in self._remote_callbacks.get(namespace, ()):
+                try:
+                    callback()
+                except Exception as e:
+                    print(f"Warning: cache invalidation callback for {namespace} failed: {e}")
+
+    async def start(self, mode: str = CACHE_BUS) -> None:
+        """Join the bus (called on app startup). Falls back to local-only on failure."""
+        if self._transport is not None or mode in ('', 'local', 'none'):
+            return
+        if mode == 'postgres':
+            database_url = os.getenv("DATABASE_URL", "").strip().strip('"').strip("'")
+            if not database_url:
+                print("Warning: CACHE_BUS=postgres but DATABASE_URL is not set; caches are not shared across processes")
+                return
+            transport = _PostgresTransport(database_url, self._handle_message)
+        elif mode == 'unix':
+            if not hasattr(socket, 'AF_UNIX'):
+                print("Warning: Unix sockets unavailable; caches are not shared across processes")
+                return
+            transport = _UnixSocketTransport(CACHE_BUS_DIR, self._handle_message)
+        else:
+            print(f"Warning: Unknown CACHE_BUS '{mode}'; caches are not shared across processes")
+            return
+        try:
+            await transport.start()
+        except Exception as e:
+            print(f"Warning: Could not start {mode} cache invalidation bus: {e}")
+            return
+        self._transport = transport
+
+    async def stop(self) -> None:
+        transport, self._transport = self._transport, None
+        if transport is not None:
+            await transport.stop()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            'transport': self._transport.name if self._transport is not None else 'local',
+            'sent': self.sent,
+            'received': self.received,
+            'caches': {
+                namespace: [local.snapshot() for local in caches]
+                for namespace, caches in self._caches.items()
+            },
+        }
+
+
+bus = InvalidationBus()
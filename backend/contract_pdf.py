@@ -8,16 +8,103 @@ from reportlab.lib.units import inch
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
 from reportlab.lib import colors
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_JUSTIFY
+from reportlab import rl_config
+from contextlib import contextmanager
 from datetime import datetime
+from functools import lru_cache
+import os
+import threading
 from io import BytesIO
 from typing import Dict, Any, Optional
 
+# Use the compact layout unless a caller asks otherwise (e.g. for stored PDFs)
+COMPACT_BY_DEFAULT = os.getenv("CONTRACT_PDF_COMPACT", "").strip().lower() in ("1", "true", "yes")
+
+# Layout for the default and compact modes. Compact mode tightens margins and
+# vertical spacing so the contract fits on a single page (fewer page objects,
+# fewer bytes over rural mobile links).
+LAYOUTS = {
+    False: {'margin': 0.75*inch, 'side_margin': inch, 'spacing': 1.0,
+            'heading_font_size': 14, 'heading_leading': 18, 'body_font_size': 11, 'leading': 14, 'signature_padding': 20},
+    True: {'margin': 0.4*inch, 'side_margin': 0.6*inch, 'spacing': 0.2,
+           'heading_font_size': 12, 'heading_leading': 14, 'body_font_size': 9.5, 'leading': 11.5, 'signature_padding': 2},
+}
+
+
+# rl_config is process-global, so builds that change it are serialized
+_rl_config_lock = threading.Lock()
+
+
+@contextmanager
+def _binary_streams():
+    """
+    Write page streams as raw Flate data instead of ASCII85-encoded text
+    (ASCII85 adds ~25% to every stream) and skip the generator comment.
+    """
+    with _rl_config_lock:
+        saved = rl_config.useA85, rl_config.pdfComments
+        rl_config.useA85, rl_config.pdfComments = 0, 0
+        try:
+            yield
+        finally:
+            rl_config.useA85, rl_config.pdfComments = saved
+
+
+@lru_cache(maxsize=None)
+def _get_styles(compact: bool = False) -> Dict[str, ParagraphStyle]:
+    """
+    Build the paragraph styles once per layout instead of on every contract.
+    Only the standard PDF fonts (Helvetica family) are used, so no font data
+    is embedded in the document.
+    """
+    layout = LAYOUTS[compact]
+    spacing = layout['spacing']
+    styles = getSampleStyleSheet()
+    return {
+        'title': ParagraphStyle(
+            'CustomTitle',
+            parent=styles['Heading1'],
+            fontSize=18,
+            textColor=colors.HexColor('#1e40af'),
+            spaceAfter=30 * spacing,
+            alignment=TA_CENTER,
+            fontName='Helvetica-Bold'
+        ),
+        'heading': ParagraphStyle(
+            'CustomHeading',
+            parent=styles['Heading2'],
+            fontSize=layout['heading_font_size'],
+            leading=layout['heading_leading'],
+            textColor=colors.HexColor('#1e40af'),
+            spaceAfter=12 * spacing,
+            spaceBefore=12 * spacing,
+            fontName='Helvetica-Bold'
+        ),
+        'normal': ParagraphStyle(
+            'CustomNormal',
+            parent=styles['Normal'],
+            fontSize=layout['body_font_size'],
+            leading=layout['leading'],
+            alignment=TA_JUSTIFY,
+            spaceAfter=10 * spacing
+        ),
+        'subtitle': styles['Normal'],
+        'footer': ParagraphStyle(
+            'Footer',
+            parent=styles['Normal'],
+            fontSize=9,
+            textColor=colors.grey,
+            alignment=TA_CENTER
+        ),
+    }
+
 
 def generate_contract_pdf(
     contract_data: Dict[str, Any],
     job_data: Dict[str, Any],
     worker_data: Dict[str, Any],
-    grower_data: Optional[Dict[str, Any]] = None
+    grower_data: Optional[Dict[str, Any]] = None,
+    compact: Optional[bool] = None
 ) -> BytesIO:
     """
     Generate a PDF contract document for a worker.
@@ -27,57 +114,46 @@ def generate_contract_pdf(
         job_data: Job details (title, pay_rate_mxn, start_date, description, etc.)
         worker_data: Worker information (name, phone, user_id)
         grower_data: Grower/farm information (farm_name, location, etc.)
+        compact: Single-page layout with tighter spacing and binary (non-ASCII85)
+            compressed streams, for smaller files. Defaults to CONTRACT_PDF_COMPACT.
     
     Returns:
         BytesIO object containing the PDF
     """
+    if compact is None:
+        compact = COMPACT_BY_DEFAULT
+    layout = LAYOUTS[compact]
+    spacing = layout['spacing']
     buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter, topMargin=0.75*inch, bottomMargin=0.75*inch)
+    doc = SimpleDocTemplate(
+        buffer,
+        pagesize=letter,
+        topMargin=layout['margin'],
+        bottomMargin=layout['margin'],
+        leftMargin=layout['side_margin'],
+        rightMargin=layout['side_margin'],
+        pageCompression=1
+    )
     
     # Container for the 'Flowable' objects
     elements = []
     
     # Define styles
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=18,
-        textColor=colors.HexColor('#1e40af'),
-        spaceAfter=30,
-        alignment=TA_CENTER,
-        fontName='Helvetica-Bold'
-    )
-    
-    heading_style = ParagraphStyle(
-        'CustomHeading',
-        parent=styles['Heading2'],
-        fontSize=14,
-        textColor=colors.HexColor('#1e40af'),
-        spaceAfter=12,
-        spaceBefore=12,
-        fontName='Helvetica-Bold'
-    )
-    
-    normal_style = ParagraphStyle(
-        'CustomNormal',
-        parent=styles['Normal'],
-        fontSize=11,
-        leading=14,
-        alignment=TA_JUSTIFY,
-        spaceAfter=10
-    )
+    styles = _get_styles(compact)
+    title_style = styles['title']
+    heading_style = styles['heading']
+    normal_style = styles['normal']
     
     # Title
     elements.append(Paragraph("CONTRATO DE TRABAJO AGRÍCOLA", title_style))
-    elements.append(Paragraph("AGRICULTURAL EMPLOYMENT CONTRACT", styles['Normal']))
-    elements.append(Spacer(1, 0.3*inch))
+    elements.append(Paragraph("AGRICULTURAL EMPLOYMENT CONTRACT", styles['subtitle']))
+    elements.append(Spacer(1, 0.3*inch*spacing))
     
     # Contract Information
     contract_date = datetime.now().strftime("%d de %B de %Y")
     elements.append(Paragraph(f"<b>Fecha del Contrato / Contract Date:</b> {contract_date}", normal_style))
     elements.append(Paragraph(f"<b>Número de Contrato / Contract Number:</b> {contract_data.get('id', 'N/A')}", normal_style))
-    elements.append(Spacer(1, 0.2*inch))
+    elements.append(Spacer(1, 0.2*inch*spacing))
     
     # Parties Section
     elements.append(Paragraph("<b>PARTES / PARTIES</b>", heading_style))
@@ -91,7 +167,7 @@ def generate_contract_pdf(
     elements.append(Paragraph(f"Nombre / Name: {worker_name}", normal_style))
     elements.append(Paragraph(f"Teléfono / Phone: {worker_phone}", normal_style))
     elements.append(Paragraph(f"ID: {worker_id}", normal_style))
-    elements.append(Spacer(1, 0.15*inch))
+    elements.append(Spacer(1, 0.15*inch*spacing))
     
     # Employer Information
     farm_name = grower_data.get('farm_name', 'Agricultural Employer') if grower_data else 'Agricultural Employer'
@@ -100,7 +176,7 @@ def generate_contract_pdf(
     elements.append(Paragraph("<b>EMPLEADOR / EMPLOYER:</b>", normal_style))
     elements.append(Paragraph(f"Nombre de la Granja / Farm Name: {farm_name}", normal_style))
     elements.append(Paragraph(f"Ubicación / Location: {location}", normal_style))
-    elements.append(Spacer(1, 0.2*inch))
+    elements.append(Spacer(1, 0.2*inch*spacing))
     
     # Job Details
     elements.append(Paragraph("<b>DETALLES DEL TRABAJO / JOB DETAILS</b>", heading_style))
@@ -137,7 +213,7 @@ def generate_contract_pdf(
         ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
     ]))
     elements.append(job_table)
-    elements.append(Spacer(1, 0.2*inch))
+    elements.append(Spacer(1, 0.2*inch*spacing))
     
     # Terms and Conditions
     elements.append(Paragraph("<b>TÉRMINOS Y CONDICIONES / TERMS AND CONDITIONS</b>", heading_style))
@@ -160,9 +236,9 @@ def generate_contract_pdf(
         if term:
             elements.append(Paragraph(term, normal_style))
         else:
-            elements.append(Spacer(1, 0.1*inch))
+            elements.append(Spacer(1, 0.1*inch*spacing))
     
-    elements.append(Spacer(1, 0.3*inch))
+    elements.append(Spacer(1, 0.3*inch*spacing))
     
     # Agreement Statement
     elements.append(Paragraph(
@@ -178,7 +254,7 @@ def generate_contract_pdf(
     )
     
     elements.append(Paragraph(agreement_text, normal_style))
-    elements.append(Spacer(1, 0.3*inch))
+    elements.append(Spacer(1, 0.3*inch*spacing))
     
     # Signatures Section
     signature_table_data = [
@@ -195,11 +271,12 @@ def generate_contract_pdf(
         ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
         ('FONTSIZE', (0, 0), (-1, -1), 10),
         ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ('TOPPADDING', (0, 0), (-1, -1), 20),
+        ('TOPPADDING', (0, 0), (-1, -1), layout['signature_padding']),
+        ('TOPPADDING', (0, 1), (-1, 1), 20),  # Room to sign above the line
     ]))
     elements.append(signature_table)
     
-    elements.append(Spacer(1, 0.2*inch))
+    elements.append(Spacer(1, 0.2*inch*spacing))
     
     # Footer
     footer_text = (
@@ -209,17 +286,14 @@ def generate_contract_pdf(
         "government benefits, and employment verification purposes."
     )
     
-    elements.append(Paragraph(footer_text, ParagraphStyle(
-        'Footer',
-        parent=styles['Normal'],
-        fontSize=9,
-        textColor=colors.grey,
-        alignment=TA_CENTER,
-        fontStyle='italic'
-    )))
+    elements.append(Paragraph(footer_text, styles['footer']))
     
     # Build PDF
-    doc.build(elements)
+    if compact:
+        with _binary_streams():
+            doc.build(elements)
+    else:
+        doc.build(elements)
     buffer.seek(0)
     return buffer
 
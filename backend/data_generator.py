@@ -3,6 +3,7 @@ import pandas as pd
 from datetime import datetime, timedelta
 from typing import List, Dict, Any, Optional
 from db import supabase
+from forecasts import detail_from_jobs, store_forecast
 
 
 def generate_baja_harvest_data(num_jobs=100, arrival_rate_minutes=30):
@@ -73,6 +74,46 @@ def generate_baja_harvest_data(num_jobs=100, arrival_rate_minutes=30):
     return df
 
 
+def sample_job_arrays(rng: np.random.Generator, replications: int = 1, num_jobs: int = 100,
+                      arrival_rate_minutes: float = 30.0) -> Dict[str, np.ndarray]:
+    """
+    Vectorized version of the generate_baja_harvest_data model for Monte Carlo runs.
+    Draws every replication at once, so there is no per-job Python loop.
+    
+    Args:
+        rng: NumPy random generator (seed it for reproducible runs)
+        replications: Number of independent job streams to draw
+        num_jobs: Number of jobs per stream
+        arrival_rate_minutes: Average time between job arrivals (for Poisson process)
+    
+    Returns:
+        Dictionary of (replications, num_jobs) arrays: crop_is_tomato,
+        quantity_units, workers_requested, pay_rate_mxn, service_time_mins,
+        arrival_time_poisson
+    """
+    shape = (replications, num_jobs)
+    is_tomato = rng.random(shape) < 0.6
+    
+    # Tomato: 1000-3000 buckets, crews of 20-40, ~22 buckets/worker/hr
+    # Strawberry: 500-1500 boxes, crews of 15-30, ~7 boxes/worker/hr
+    quantities = np.where(is_tomato, rng.integers(1000, 3000, shape), rng.integers(500, 1500, shape))
+    crews = np.where(is_tomato, rng.integers(20, 40, shape), rng.integers(15, 30, shape))
+    rates = np.round(np.where(is_tomato, rng.uniform(5.0, 8.0, shape), rng.uniform(30.0, 45.0, shape)), 2)
+    prod_rates = np.where(is_tomato, rng.normal(22, 3, shape), rng.normal(7, 1.5, shape))
+    
+    duration_minutes = quantities / (crews * np.maximum(0.1, prod_rates)) * 60
+    arrivals = np.cumsum(rng.exponential(scale=arrival_rate_minutes, size=shape), axis=1)
+    
+    return {
+        'crop_is_tomato': is_tomato,
+        'quantity_units': quantities,
+        'workers_requested': crews,
+        'pay_rate_mxn': rates,
+        'service_time_mins': np.round(duration_minutes, 1),
+        'arrival_time_poisson': arrivals,
+    }
+
+
 def convert_to_supabase_format(df: pd.DataFrame, base_date: datetime = None, grower_id: Optional[str] = None) -> List[Dict[str, Any]]:
     """
     Convert the generated DataFrame to Supabase jobs table format.
@@ -138,7 +179,8 @@ def convert_to_supabase_format(df: pd.DataFrame, base_date: datetime = None, gro
     return jobs
 
 
-def insert_jobs_to_supabase(num_jobs: int = 25, arrival_rate_minutes: float = 30.0, grower_id: Optional[str] = None) -> Dict[str, Any]:
+def insert_jobs_to_supabase(num_jobs: int = 25, arrival_rate_minutes: float = 30.0, grower_id: Optional[str] = None,
+                            store_detail: bool = True) -> Dict[str, Any]:
     """
     Generate jobs using Poisson process and insert them into Supabase.
     
@@ -146,6 +188,7 @@ def insert_jobs_to_supabase(num_jobs: int = 25, arrival_rate_minutes: float = 30
         num_jobs: Number of jobs to generate
         arrival_rate_minutes: Average time between job arrivals
         grower_id: Optional grower UUID
+        store_detail: Also save the generated job stream as forecast detail
     
     Returns:
         Dictionary with insertion results
@@ -160,24 +203,23 @@ def insert_jobs_to_supabase(num_jobs: int = 25, arrival_rate_minutes: float = 30
     try:
         response = supabase.table("jobs").insert(jobs).execute()
         
-        # Also save forecast data
-        forecast_data = {
-            'num_jobs': num_jobs,
-            'arrival_rate_minutes': float(arrival_rate_minutes),
-            'forecast_json': jobs,  # Store the generated jobs
-            'summary_json': {
-                'avg_workers': float(df['Workers_Requested'].mean()),
-                'avg_service_time': float(df['Service_Time_Mins'].mean()),
-                'total_jobs': len(jobs),
-                'tomato_jobs': int((df['Crop_Type'] == 'Tomato').sum()),
-                'strawberry_jobs': int((df['Crop_Type'] == 'Strawberry').sum()),
-            }
+        # Also save forecast data: a compact summary, plus column-wise detail if requested
+        summary = {
+            'avg_workers': float(df['Workers_Requested'].mean()),
+            'avg_service_time': float(df['Service_Time_Mins'].mean()),
+            'total_jobs': len(jobs),
+            'tomato_jobs': int((df['Crop_Type'] == 'Tomato').sum()),
+            'strawberry_jobs': int((df['Crop_Type'] == 'Strawberry').sum()),
         }
-        supabase.table("demand_forecast").insert(forecast_data).execute()
+        detail = None
+        if store_detail:
+            detail = detail_from_jobs(jobs, [row['id'] for row in response.data or []])
+        forecast_id = store_forecast(supabase, num_jobs, arrival_rate_minutes, summary, detail)
         
         return {
             'success': True,
             'jobs_inserted': len(response.data),
+            'forecast_id': forecast_id,
             'message': f'Successfully inserted {len(response.data)} jobs using Poisson process'
         }
     except Exception as e:
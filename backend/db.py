@@ -1,61 +1,247 @@
 """
 Supabase database client setup.
+
+The client is created on first use (or by the app lifespan at startup) rather
+than at import time, so importing this module is cheap and scripts that never
+touch the database don't pay for loading the Supabase SDK.
+
+PostgREST and Storage calls go through pooled keep-alive HTTP/2 connections
+with explicit limits and timeouts, behind a circuit breaker (see
+db_transport.py). All of it is configurable through SUPABASE_* environment
+variables; `pool_metrics()` reports saturation, latency and breaker state.
 """
-from supabase import create_client, Client
 import os
+import threading
 from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+
 from dotenv import load_dotenv
 
+if TYPE_CHECKING:
+    from supabase import Client
+
 # Load .env file from backend directory
 env_path = Path(__file__).parent / ".env"
 load_dotenv(dotenv_path=env_path)
 
-# Get Supabase credentials from environment
-SUPABASE_URL = os.getenv("SUPABASE_URL", "").strip()
-SUPABASE_KEY = os.getenv("SUPABASE_KEY", "").strip()
-
-# Remove quotes if present
-SUPABASE_URL = SUPABASE_URL.strip('"').strip("'")
-SUPABASE_KEY = SUPABASE_KEY.strip('"').strip("'")
-
-if not SUPABASE_URL or not SUPABASE_KEY:
-    raise ValueError(
-        f"SUPABASE_URL and SUPABASE_KEY must be set in .env file at {env_path}.\n"
-        "Get these from your Supabase project: Settings → API\n"
-        "Format:\n"
-        "SUPABASE_URL=https://your-project.supabase.co\n"
-        "SUPABASE_KEY=eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9...\n"
-        f"Current values: URL={'SET' if SUPABASE_URL else 'MISSING'}, KEY={'SET' if SUPABASE_KEY else 'MISSING'}"
-    )
+_client: Optional["Client"] = None
+_client_lock = threading.Lock()
 
-# Validate URL format
-if not SUPABASE_URL.startswith("https://") or ".supabase.co" not in SUPABASE_URL:
-    raise ValueError(
-        f"Invalid SUPABASE_URL format. Should be: https://your-project.supabase.co\n"
-        f"Got: {SUPABASE_URL[:50]}..."
-    )
+# One instrumented transport per Supabase service, shared by every session
+# the SDK creates (it recreates its sub-clients on auth state changes)
+_transports: Dict[str, Any] = {}
+
+# Hosts accepted over plain http, for a local `supabase start` stack
+LOCAL_HOSTS = ("localhost", "127.0.0.1", "host.docker.internal")
+
+
+def _env_number(name: str, default: float) -> float:
+    value = os.getenv(name, "").strip()
+    return float(value) if value else default
+
+
+def load_pool_settings() -> Dict[str, Any]:
+    """Connection pool, timeout and circuit breaker settings from the environment."""
+    return {
+        'max_connections': int(_env_number("SUPABASE_MAX_CONNECTIONS", 20)),
+        'max_keepalive_connections': int(_env_number("SUPABASE_MAX_KEEPALIVE", 10)),
+        'keepalive_expiry': _env_number("SUPABASE_KEEPALIVE_EXPIRY", 30.0),
+        'http2': os.getenv("SUPABASE_HTTP2", "1").strip().lower() not in ("0", "false", "no"),
+        'connect_timeout': _env_number("SUPABASE_CONNECT_TIMEOUT", 5.0),
+        'timeout': _env_number("SUPABASE_TIMEOUT", 15.0),
+        'pool_timeout': _env_number("SUPABASE_POOL_TIMEOUT", 2.0),
+        'connect_retries': int(_env_number("SUPABASE_CONNECT_RETRIES", 1)),
+        'circuit_failures': int(_env_number("SUPABASE_CIRCUIT_FAILURES", 5)),
+        'circuit_reset_seconds': _env_number("SUPABASE_CIRCUIT_RESET_SECONDS", 30.0),
+    }
+
+
+def load_settings() -> Tuple[str, str]:
+    """Read and validate SUPABASE_URL and SUPABASE_KEY from the environment."""
+    # Get Supabase credentials from environment
+    supabase_url = os.getenv("SUPABASE_URL", "").strip()
+    supabase_key = os.getenv("SUPABASE_KEY", "").strip()
+
+    # Remove quotes if present
+    supabase_url = supabase_url.strip('"').strip("'")
+    supabase_key = supabase_key.strip('"').strip("'")
+
+    if not supabase_url or not supabase_key:
+        raise ValueError(
+            f"SUPABASE_URL and SUPABASE_KEY must be set in .env file at {env_path}.\n"
+            "Get these from your Supabase project: Settings → API\n"
+            "Format:\n"
+            "SUPABASE_URL=https://your-project.supabase.co\n"
+            "SUPABASE_KEY=eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9...\n"
+            f"Current values: URL={'SET' if supabase_url else 'MISSING'}, KEY={'SET' if supabase_key else 'MISSING'}"
+        )
+
+    # Validate URL format (hosted project, or a local stack over http)
+    is_hosted = supabase_url.startswith("https://") and ".supabase.co" in supabase_url
+    is_local = any(supabase_url.startswith(f"{scheme}://{host}") for scheme in ("http", "https") for host in LOCAL_HOSTS)
+    if not (is_hosted or is_local):
+        raise ValueError(
+            f"Invalid SUPABASE_URL format. Should be: https://your-project.supabase.co "
+            f"(or http://127.0.0.1:54321 for a local stack)\n"
+            f"Got: {supabase_url[:50]}..."
+        )
+
+    # Validate key format (should start with eyJ for JWT, or be a valid Supabase key)
+    if not (supabase_key.startswith("eyJ") or supabase_key.startswith("sb_")):
+        raise ValueError(
+            f"Invalid SUPABASE_KEY format.\n"
+            f"Expected: JWT token starting with 'eyJ' OR Supabase key starting with 'sb_'\n"
+            f"Make sure you're using the 'anon public' key from Settings → API\n"
+            f"Got: {supabase_key[:30]}...\n"
+            f"Full key length: {len(supabase_key)} characters"
+        )
+
+    return supabase_url, supabase_key
+
+
+def _transport(name: str, settings: Dict[str, Any]):
+    """Return the shared instrumented transport for a service, creating it once."""
+    if name not in _transports:
+        import httpx
+        from db_transport import CircuitBreaker, InstrumentedTransport
+
+        pooled = httpx.HTTPTransport(
+            http2=settings['http2'],
+            limits=httpx.Limits(
+                max_connections=settings['max_connections'],
+                max_keepalive_connections=settings['max_keepalive_connections'],
+                keepalive_expiry=settings['keepalive_expiry'],
+            ),
+            retries=settings['connect_retries'],
+        )
+        breaker = CircuitBreaker(
+            name,
+            failure_threshold=settings['circuit_failures'],
+            reset_seconds=settings['circuit_reset_seconds'],
+        )
+        on_complete = None
+        if name == 'postgrest':
+            from query_log import observe_postgrest
+            on_complete = observe_postgrest
+        _transports[name] = InstrumentedTransport(
+            name, pooled, breaker, settings['max_connections'], on_complete=on_complete
+        )
+    return _transports[name]
 
-# Validate key format (should start with eyJ for JWT, or be a valid Supabase key)
-if not (SUPABASE_KEY.startswith("eyJ") or SUPABASE_KEY.startswith("sb_")):
-    raise ValueError(
-        f"Invalid SUPABASE_KEY format.\n"
-        f"Expected: JWT token starting with 'eyJ' OR Supabase key starting with 'sb_'\n"
-        f"Make sure you're using the 'anon public' key from Settings → API\n"
-        f"Got: {SUPABASE_KEY[:30]}...\n"
-        f"Full key length: {len(SUPABASE_KEY)} characters"
-    )
 
-# Create Supabase client
-try:
-    supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-except Exception as e:
-    raise ValueError(
-        f"Failed to create Supabase client. Error: {str(e)}\n"
-        "Please verify:\n"
-        "1. Your SUPABASE_URL is correct (https://your-project.supabase.co)\n"
-        "2. Your SUPABASE_KEY is the 'anon public' key (starts with eyJ)\n"
-        "3. Both values in .env have no extra spaces or quotes\n"
-        f"URL: {SUPABASE_URL[:30]}...\n"
-        f"KEY: {SUPABASE_KEY[:30]}..."
+def create_pooled_client(supabase_url: str, supabase_key: str, settings: Optional[Dict[str, Any]] = None) -> "Client":
+    """
+    Build a Supabase client whose PostgREST and Storage sessions use pooled,
+    instrumented transports.
+
+    Args:
+        supabase_url: Project URL
+        supabase_key: API key
+        settings: Pool settings (defaults to load_pool_settings())
+
+    Returns:
+        Supabase client
+    """
+    import httpx
+    from postgrest import SyncPostgrestClient
+    from postgrest.utils import SyncClient as SessionClient
+    from storage3._sync.client import SyncStorageClient
+    from supabase import Client
+
+    settings = settings or load_pool_settings()
+    timeout = httpx.Timeout(
+        settings['timeout'],
+        connect=settings['connect_timeout'],
+        pool=settings['pool_timeout'],
     )
 
+    def session(name: str, base_url: str, headers: Dict[str, str], verify: bool = True):
+        return SessionClient(
+            base_url=base_url,
+            headers=headers,
+            timeout=timeout,
+            verify=verify,
+            follow_redirects=True,
+            transport=_transport(name, settings),
+        )
+
+    class PooledPostgrestClient(SyncPostgrestClient):
+        def create_session(self, base_url, headers, timeout, verify=True, proxy=None):
+            return session('postgrest', base_url, headers, verify)
+
+    class PooledStorageClient(SyncStorageClient):
+        def _create_session(self, base_url, headers, timeout, verify=True, proxy=None):
+            return session('storage', base_url, headers, verify)
+
+    class PooledClient(Client):
+        @staticmethod
+        def _init_postgrest_client(rest_url, headers, schema, timeout=None, verify=True):
+            return PooledPostgrestClient(rest_url, headers=headers, schema=schema, verify=verify)
+
+        @staticmethod
+        def _init_storage_client(storage_url, headers, storage_client_timeout=None, verify=True):
+            return PooledStorageClient(storage_url, headers, verify=verify)
+
+    return PooledClient.create(supabase_url, supabase_key)
+
+
+def pool_metrics() -> Dict[str, Any]:
+    """Saturation, latency and circuit breaker state per Supabase service."""
+    return {name: transport.snapshot() for name, transport in _transports.items()}
+
+
+def get_client() -> "Client":
+    """Return the shared Supabase client, creating it on first call."""
+    global _client
+    if _client is not None:
+        return _client
+
+    with _client_lock:
+        if _client is not None:
+            return _client
+
+        supabase_url, supabase_key = load_settings()
+
+        # Create Supabase client
+        try:
+            _client = create_pooled_client(supabase_url, supabase_key)
+        except Exception as e:
+            raise ValueError(
+                f"Failed to create Supabase client. Error: {str(e)}\n"
+                "Please verify:\n"
+                "1. Your SUPABASE_URL is correct (https://your-project.supabase.co)\n"
+                "2. Your SUPABASE_KEY is the 'anon public' key (starts with eyJ)\n"
+                "3. Both values in .env have no extra spaces or quotes\n"
+                f"URL: {supabase_url[:30]}...\n"
+                f"KEY: {supabase_key[:30]}..."
+            )
+        return _client
+
+
+def close_client() -> None:
+    """Close the client's HTTP connections (called on app shutdown)."""
+    global _client
+    with _client_lock:
+        client, _client = _client, None
+    if client is None:
+        return
+    for name in ('_postgrest', '_storage'):
+        sub_client = getattr(client, name, None)
+        session = getattr(sub_client, 'session', None)
+        if session is not None:
+            try:
+                session.close()
+            except Exception as e:
+                print(f"Warning: Could not close {name} connections: {e}")
+    _transports.clear()
+
+
+class _LazyClient:
+    """Stand-in for the client that creates it on first attribute access."""
+
+    def __getattr__(self, name):
+        return getattr(get_client(), name)
+
+
+# Shared client used as `supabase.table(...)` throughout the backend
+supabase: "Client" = _LazyClient()
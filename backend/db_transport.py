@@ -0,0 +1,243 @@
+"""
+HTTP transport for the Supabase client.
+Wraps httpx's pooled transport with a circuit breaker and latency / pool
+metrics. After repeated connection errors, timeouts or gateway errors the
+breaker opens and calls fail immediately with CircuitOpenError (mapped to a
+503 by the API) instead of queueing behind a struggling backend; after a
+cool-down one trial request is let through to probe for recovery.
+httpx is only imported once a client is created, keeping app import cheap.
+"""
+import contextvars
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+# Responses that mean the backend (or its gateway) is unhealthy
+FAILURE_STATUS_CODES = frozenset({502, 503, 504})
+
+# Recent request latencies kept per transport for percentiles
+LATENCY_WINDOW = 1000
+
+_call_timeout: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar(
+    "supabase_call_timeout", default=None
+)
+
+
+@contextmanager
+def call_timeout(seconds: float, connect: Optional[float] = None):
+    """
+    Override the client timeout for Supabase calls made inside the block.
+
+    Example:
+        with call_timeout(60):
+            supabase.table("jobs").insert(rows).execute()
+    """
+    token = _call_timeout.set({
+        'connect': connect if connect is not None else seconds,
+        'read': seconds,
+        'write': seconds,
+        'pool': seconds,
+    })
+    try:
+        yield
+    finally:
+        _call_timeout.reset(token)
+
+
+class CircuitOpenError(Exception):
+    """Raised without contacting the backend while the circuit is open."""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} circuit open; retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker (closed -> open -> half-open -> closed)."""
+
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_seconds: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self.times_opened = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_seconds:
+                return self.HALF_OPEN
+            return self._state
+
+    def retry_after(self) -> float:
+        with self._lock:
+            return max(0.0, self.reset_seconds - (time.monotonic() - self._opened_at))
+
+    def before_call(self) -> None:
+        """Raise CircuitOpenError unless a call may go through."""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_seconds:
+                self._state = self.HALF_OPEN
+            if self._state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return
+            self.rejected += 1
+            retry_after = max(1.0, self.reset_seconds - (time.monotonic() - self._opened_at))
+        raise CircuitOpenError(self.name, retry_after)
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_neutral(self) -> None:
+        """A call ended without telling us anything about backend health."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self.times_opened += 1
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def snapshot(self) -> Dict[str, Any]:
+        state = self.state
+        return {
+            'state': state,
+            'consecutive_failures': self._failures,
+            'times_opened': self.times_opened,
+            'rejected_calls': self.rejected,
+            'retry_after_seconds': round(self.retry_after(), 1) if state != self.CLOSED else 0.0,
+        }
+
+
+class InstrumentedTransport:
+    """httpx transport that adds a circuit breaker, per-call timeouts and metrics."""
+
+    def __init__(self, name: str, transport, breaker: CircuitBreaker, max_connections: int,
+                 on_complete: Optional[Callable[[Any, Any, Optional[int], float], None]] = None):
+        self.name = name
+        self._transport = transport
+        self.breaker = breaker
+        self.max_connections = max_connections
+        # Called as on_complete(transport, request, status_code or None, seconds) after each call
+        self.on_complete = on_complete
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self.requests = 0
+        self.errors = 0
+        self.pool_timeouts = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    def handle_request(self, request):
+        import httpx
+
+        self.breaker.before_call()
+
+        timeout = _call_timeout.get()
+        if timeout is not None:
+            request.extensions["timeout"] = dict(timeout)
+
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        start = time.perf_counter()
+        status_code = None
+        try:
+            response = self._transport.handle_request(request)
+            status_code = response.status_code
+        except httpx.PoolTimeout:
+            # Our own pool is saturated; that's load, not a backend failure
+            with self._lock:
+                self.pool_timeouts += 1
+                self.errors += 1
+            self.breaker.record_neutral()
+            raise
+        except httpx.TransportError:
+            with self._lock:
+                self.errors += 1
+            self.breaker.record_failure()
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.in_flight -= 1
+                self._latencies.append(elapsed)
+            if self.on_complete is not None:
+                try:
+                    self.on_complete(self._transport, request, status_code, elapsed)
+                except Exception as e:
+                    print(f"Warning: {self.name} query observer failed: {e}")
+
+        if response.status_code in FAILURE_STATUS_CODES:
+            with self._lock:
+                self.errors += 1
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return response
+
+    def close(self) -> None:
+        self._transport.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _pool_connections(self) -> Dict[str, int]:
+        pool = getattr(self._transport, '_pool', None)
+        connections = list(getattr(pool, 'connections', []) or [])
+        idle = sum(1 for connection in connections if connection.is_idle())
+        return {'open': len(connections), 'idle': idle, 'active': len(connections) - idle}
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            latencies = sorted(self._latencies)
+            metrics = {
+                'requests': self.requests,
+                'errors': self.errors,
+                'pool_timeouts': self.pool_timeouts,
+                'in_flight': self.in_flight,
+                'peak_in_flight': self.peak_in_flight,
+            }
+
+        def percentile(p: float) -> float:
+            if not latencies:
+                return 0.0
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 1)
+
+        metrics['pool'] = {
+            'max_connections': self.max_connections,
+            'saturation': round(metrics['in_flight'] / self.max_connections, 3) if self.max_connections else 0.0,
+            'connections': self._pool_connections(),
+        }
+        metrics['latency_ms'] = {
+            'samples': len(latencies),
+            'p50': percentile(0.50),
+            'p95': percentile(0.95),
+            'p99': percentile(0.99),
+            'max': round(latencies[-1] * 1000, 1) if latencies else 0.0,
+        }
+        metrics['circuit'] = self.breaker.snapshot()
+        return metrics
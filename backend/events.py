@@ -0,0 +1,185 @@
+"""
+Pub/sub for live updates.
+Write endpoints publish small delta events (job created/closed, application
+status changed, contract PDF ready) and `GET /stream` fans them out to every
+subscribed client as server-sent events.
+
+With several worker processes, a client is connected to only one of them, so
+the broker relays each event over the cache bus (EVENTS_TOPIC) and every
+other process delivers it to its own clients. Event ids are microsecond
+timestamps taken by the publishing process, so they are ordered across
+processes and `Last-Event-ID` replay works on whichever worker a client
+reconnects to.
+"""
+import asyncio
+import json
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, AsyncIterator, Deque, Dict, Iterable, Optional, Set
+
+# Topics a client can subscribe to
+TOPICS = ('jobs', 'applications', 'contracts')
+
+# Events buffered per subscriber before the oldest are dropped
+SUBSCRIBER_QUEUE_SIZE = 100
+
+# Recent events kept for clients reconnecting with Last-Event-ID
+REPLAY_BUFFER_SIZE = 500
+
+# Seconds between keep-alive comments on idle connections
+HEARTBEAT_SECONDS = 15.0
+
+# Cache bus topic carrying events between worker processes
+EVENTS_TOPIC = 'events'
+# Relayed events larger than this (e.g. job.bulk_created with thousands of ids)
+# lose their list fields and are marked truncated; NOTIFY payloads max out at 8000 bytes
+RELAY_MAX_BYTES = 7000
+
+
+class Subscriber:
+    """A single SSE connection: its topic/worker filters and pending events."""
+
+    __slots__ = ('topics', 'worker_id', 'queue')
+
+    def __init__(self, topics: Set[str], worker_id: Optional[str]):
+        self.topics = topics
+        self.worker_id = worker_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+    def wants(self, event: Dict[str, Any]) -> bool:
+        if event['topic'] not in self.topics:
+            return False
+        # Application/contract events carrying a worker_id only go to that worker
+        # (or to unfiltered subscribers such as the grower dashboard)
+        event_worker = event['data'].get('worker_id')
+        return self.worker_id is None or event_worker is None or event_worker == self.worker_id
+
+    def offer(self, event: Dict[str, Any]) -> None:
+        """Queue an event without blocking; slow clients lose their oldest events."""
+        if self.queue.full():
+            try:
+                self.queue.get_nowait()
+            except asyncio.QueueEmpty:
+                pass
+        self.queue.put_nowait(event)
+
+
+class EventBroker:
+    """
+    Fan-out of events to subscribers.
+
+    Each idle connection costs one small queue and a suspended coroutine, so a
+    worker can hold thousands of them. Publishing is non-blocking and safe to
+    call from sync code running in the threadpool.
+    """
+
+    def __init__(self):
+        self._subscribers: Set[Subscriber] = set()
+        self._last_id = 0
+        self._id_lock = threading.Lock()
+        self._recent: Deque[Dict[str, Any]] = deque(maxlen=REPLAY_BUFFER_SIZE)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._bus = None
+
+    def attach(self, bus) -> None:
+        """Relay events through `bus` (the cache bus) to and from other worker processes."""
+        self._bus = bus
+        bus.subscribe(EVENTS_TOPIC, self._deliver)
+
+    def _next_id(self) -> int:
+        with self._id_lock:
+            self._last_id = max(self._last_id + 1, time.time_ns() // 1000)
+            return self._last_id
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def publish(self, event_type: str, data: Dict[str, Any]) -> None:
+        """
+        Publish an event such as 'job.created' or 'application.status_changed'.
+        The topic is the part before the dot, pluralized ('job' -> 'jobs').
+        """
+        event = {
+            'id': self._next_id(),
+            'type': event_type,
+            'topic': event_type.split('.')[0] + 's',
+            'data': {**data, 'timestamp': datetime.now().isoformat()},
+        }
+        self._deliver(event)
+        if self._bus is not None:
+            self._bus.publish(EVENTS_TOPIC, _relay_copy(event))
+
+    def _deliver(self, event: Dict[str, Any]) -> None:
+        """Buffer an event for replay and hand it to this process's subscribers."""
+        self._recent.append(event)
+
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._dispatch(event)
+        else:
+            loop.call_soon_threadsafe(self._dispatch, event)
+
+    def _dispatch(self, event: Dict[str, Any]) -> None:
+        for subscriber in list(self._subscribers):
+            if subscriber.wants(event):
+                subscriber.offer(event)
+
+    def subscribe(self, topics: Iterable[str], worker_id: Optional[str] = None,
+                  last_event_id: Optional[int] = None) -> Subscriber:
+        self._loop = asyncio.get_running_loop()
+        subscriber = Subscriber(set(topics), worker_id)
+        if last_event_id is not None:
+            for event in self._recent:
+                if event['id'] > last_event_id and subscriber.wants(event):
+                    subscriber.offer(event)
+        self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        self._subscribers.discard(subscriber)
+
+
+def _relay_copy(event: Dict[str, Any]) -> Dict[str, Any]:
+    if len(json.dumps(event, default=str)) <= RELAY_MAX_BYTES:
+        return event
+    data = {key: value for key, value in event['data'].items() if not isinstance(value, (list, dict))}
+    return {**event, 'data': {**data, 'truncated': True}}
+
+
+def format_sse(event: Dict[str, Any]) -> str:
+    """Serialize an event in text/event-stream format."""
+    return (
+        f"id: {event['id']}\n"
+        f"event: {event['type']}\n"
+        f"data: {json.dumps(event['data'], default=str)}\n\n"
+    )
+
+
+async def event_stream(broker: EventBroker, subscriber: Subscriber, request) -> AsyncIterator[str]:
+    """Yield SSE frames for a subscriber until the client disconnects."""
+    try:
+        # Tell the browser how long to wait before reconnecting
+        yield "retry: 5000\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(subscriber.queue.get(), timeout=HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    break
+                yield ": keep-alive\n\n"
+                continue
+            yield format_sse(event)
+    finally:
+        broker.unsubscribe(subscriber)
+
+
+broker = EventBroker()
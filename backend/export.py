@@ -0,0 +1,231 @@
+"""
+Columnar export of jobs, applications and contracts for research analysis.
+Rows are read from Supabase in keyset-paginated pages and written straight to
+a Parquet or Arrow IPC writer as they arrive, so a season of data streams out
+as a single file without the whole table being held in memory. Arrow IPC files
+are written uncompressed so pandas/pyarrow can memory-map them on load.
+"""
+import itertools
+from datetime import date, timedelta
+from typing import Any, Dict, Iterator, List, Optional
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Rows per PostgREST request (PostgREST caps responses at 1000 rows)
+PAGE_SIZE = 1000
+
+# Rows per Parquet row group / Arrow record batch written to the response
+ROW_GROUP_SIZE = 50_000
+
+FORMATS = {
+    'parquet': 'application/vnd.apache.parquet',
+    'arrow': 'application/vnd.apache.arrow.file',
+}
+
+TIMESTAMP = pa.timestamp('us', tz='UTC')
+
+# Per table: column schema, the column date-range filters apply to, and how
+# to reach the grower (jobs carry grower_id; the others go through their job)
+EXPORT_TABLES: Dict[str, Dict[str, Any]] = {
+    'jobs': {
+        'schema': pa.schema([
+            ('id', pa.int64()),
+            ('grower_id', pa.string()),
+            ('title', pa.string()),
+            ('crop_type', pa.string()),
+            ('pay_rate_mxn', pa.float64()),
+            ('quantity_units', pa.int64()),
+            ('unit_type', pa.string()),
+            ('workers_requested', pa.int64()),
+            ('start_date', pa.date32()),
+            ('description', pa.string()),
+            ('status', pa.string()),
+            ('service_time_mins', pa.float64()),
+            ('arrival_time_poisson', pa.float64()),
+            ('applications_count', pa.int64()),
+            ('accepted_count', pa.int64()),
+            ('deleted_at', TIMESTAMP),
+            ('created_at', TIMESTAMP),
+        ]),
+        'date_column': 'start_date',
+        'grower_column': 'grower_id',
+    },
+    'applications': {
+        'schema': pa.schema([
+            ('id', pa.int64()),
+            ('job_id', pa.int64()),
+            ('worker_id', pa.string()),
+            ('status', pa.string()),
+            ('audio_url', pa.string()),
+            ('submitted_at', TIMESTAMP),
+            ('notes', pa.string()),
+        ]),
+        'date_column': 'submitted_at',
+        'grower_column': 'jobs.grower_id',
+    },
+    'contracts': {
+        'schema': pa.schema([
+            ('id', pa.int64()),
+            ('job_id', pa.int64()),
+            ('worker_id', pa.string()),
+            ('application_id', pa.int64()),
+            ('signed_at', TIMESTAMP),
+            ('benefit_enrolled', pa.bool_()),
+            ('contract_pdf_url', pa.string()),
+            ('status', pa.string()),
+            ('created_at', TIMESTAMP),
+        ]),
+        'date_column': 'created_at',
+        'grower_column': 'jobs.grower_id',
+    },
+}
+
+
+class _ChunkSink:
+    """Write-only file object that collects bytes until the caller drains them."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def fetch_pages(
+    client,
+    table: str,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    grower_id: Optional[str] = None,
+) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Yield pages of rows ordered by id, filtered by date range and grower.
+    Uses keyset pagination (id > last id) so deep pages cost the same as the first.
+    """
+    config = EXPORT_TABLES[table]
+    columns = ', '.join(config['schema'].names)
+    date_column = config['date_column']
+    end_filter = 'lte'
+    if end_date and pa.types.is_timestamp(config['schema'].field(date_column).type):
+        # Include the whole end day for timestamp columns
+        end_date = (date.fromisoformat(end_date) + timedelta(days=1)).isoformat()
+        end_filter = 'lt'
+    grower_column = config['grower_column']
+    if grower_id and '.' in grower_column:
+        # Filter on the embedded job; !inner drops rows whose job doesn't match
+        columns += f", {grower_column.split('.')[0]}!inner(grower_id)"
+
+    last_id = 0
+    while True:
+        query = client.table(table).select(columns).gt('id', last_id)
+        if start_date:
+            query = query.gte(date_column, start_date)
+        if end_date:
+            query = getattr(query, end_filter)(date_column, end_date)
+        if grower_id:
+            query = query.eq(grower_column, grower_id)
+        rows = query.order('id').limit(PAGE_SIZE).execute().data or []
+        if rows:
+            yield rows
+        if len(rows) < PAGE_SIZE:
+            return
+        last_id = rows[-1]['id']
+
+
+def rows_to_batch(rows: List[Dict[str, Any]], schema: pa.Schema) -> pa.RecordBatch:
+    """Convert PostgREST rows to a record batch; ISO date/time strings are parsed by Arrow."""
+    arrays = []
+    for field in schema:
+        values = [row.get(field.name) for row in rows]
+        if pa.types.is_timestamp(field.type) or pa.types.is_date(field.type):
+            arrays.append(pa.array(values, type=pa.string()).cast(field.type))
+        else:
+            arrays.append(pa.array(values, type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def _row_groups(pages: Iterator[List[Dict[str, Any]]], schema: pa.Schema) -> Iterator[pa.Table]:
+    """Group pages into tables of about ROW_GROUP_SIZE rows."""
+    batches: List[pa.RecordBatch] = []
+    buffered = 0
+    for rows in pages:
+        batches.append(rows_to_batch(rows, schema))
+        buffered += len(rows)
+        if buffered >= ROW_GROUP_SIZE:
+            yield pa.Table.from_batches(batches, schema=schema)
+            batches, buffered = [], 0
+    if batches:
+        yield pa.Table.from_batches(batches, schema=schema)
+
+
+def stream_export(
+    client,
+    table: str,
+    fmt: str,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    grower_id: Optional[str] = None,
+) -> Iterator[bytes]:
+    """
+    Stream a table as a Parquet or Arrow IPC file.
+
+    The first page is fetched before this returns, so a failing query raises
+    here (where the caller can still send an error status) rather than
+    midway through the response.
+
+    Args:
+        client: Supabase client
+        table: One of EXPORT_TABLES
+        fmt: 'parquet' (zstd-compressed) or 'arrow' (uncompressed, memory-mappable)
+        start_date: Earliest date (inclusive) on the table's date column
+        end_date: Latest date (inclusive) on the table's date column
+        grower_id: Only rows belonging to this grower's jobs
+
+    Returns:
+        Iterator of file chunks, one per row group
+    """
+    pages = fetch_pages(client, table, start_date, end_date, grower_id)
+    first = next(pages, None)
+    if first is not None:
+        pages = itertools.chain([first], pages)
+    return _write_file(pages, EXPORT_TABLES[table]['schema'], fmt)
+
+
+def _write_file(pages: Iterator[List[Dict[str, Any]]], schema: pa.Schema, fmt: str) -> Iterator[bytes]:
+    sink = _ChunkSink()
+    if fmt == 'parquet':
+        writer = pq.ParquetWriter(sink, schema, compression='zstd')
+    else:
+        writer = pa.ipc.new_file(sink, schema)
+
+    try:
+        for group in _row_groups(pages, schema):
+            if fmt == 'parquet':
+                writer.write_table(group, row_group_size=len(group))
+            else:
+                # One record batch per row group keeps memory-mapped reads zero-copy
+                writer.write_batch(group.combine_chunks().to_batches()[0])
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
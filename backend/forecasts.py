@@ -0,0 +1,138 @@
+"""
+Demand forecast storage.
+Each generation run writes one small summary row to `demand_forecast` and,
+optionally, the generated job stream to `demand_forecast_detail`. Detail is
+stored column-wise (one array per field plus the inserted job IDs) rather than
+as a list of full job rows, and is only read when explicitly requested.
+`compact_forecasts` drops old detail and expired summaries.
+"""
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+# Columns kept in forecast detail; everything else is derivable from the jobs table
+DETAIL_FIELDS = (
+    'arrival_time_poisson',
+    'crop_type',
+    'workers_requested',
+    'service_time_mins',
+    'pay_rate_mxn',
+    'quantity_units',
+)
+
+SUMMARY_COLUMNS = "id, generated_at, num_jobs, arrival_rate_minutes, summary_json"
+
+# Detail is kept for the newest N forecasts; summaries for this many days
+DETAIL_RETENTION_COUNT = int(os.getenv("FORECAST_DETAIL_RETENTION", "10"))
+SUMMARY_RETENTION_DAYS = int(os.getenv("FORECAST_RETENTION_DAYS", "365"))
+
+
+def detail_from_jobs(jobs: List[Dict[str, Any]], job_ids: Optional[List[int]] = None) -> Dict[str, Any]:
+    """Pack generated job rows into column arrays."""
+    detail = {field: [job.get(field) for job in jobs] for field in DETAIL_FIELDS}
+    detail['job_ids'] = job_ids or []
+    return detail
+
+
+def store_forecast(
+    client,
+    num_jobs: int,
+    arrival_rate_minutes: float,
+    summary: Dict[str, Any],
+    detail: Optional[Dict[str, Any]] = None,
+) -> Optional[int]:
+    """
+    Save a forecast summary and, if given, its detail.
+
+    Returns:
+        ID of the demand_forecast row
+    """
+    response = client.table("demand_forecast").insert({
+        'num_jobs': num_jobs,
+        'arrival_rate_minutes': float(arrival_rate_minutes),
+        'summary_json': summary,
+    }).execute()
+    forecast_id = response.data[0]['id'] if response.data else None
+
+    if detail is not None and forecast_id is not None:
+        client.table("demand_forecast_detail").insert({
+            'forecast_id': forecast_id,
+            'detail_json': detail,
+        }).execute()
+    return forecast_id
+
+
+def latest_summary(client) -> Optional[Dict[str, Any]]:
+    """Return the newest forecast's summary row (no detail)."""
+    response = (
+        client.table("demand_forecast")
+        .select(SUMMARY_COLUMNS)
+        .order("generated_at", desc=True)
+        .limit(1)
+        .execute()
+    )
+    return response.data[0] if response.data else None
+
+
+def list_summaries(client, limit: int = 20) -> List[Dict[str, Any]]:
+    response = (
+        client.table("demand_forecast")
+        .select(SUMMARY_COLUMNS)
+        .order("generated_at", desc=True)
+        .limit(limit)
+        .execute()
+    )
+    return response.data or []
+
+
+def get_detail(client, forecast_id: int) -> Optional[Dict[str, Any]]:
+    response = (
+        client.table("demand_forecast_detail")
+        .select("detail_json")
+        .eq("forecast_id", forecast_id)
+        .execute()
+    )
+    return response.data[0]['detail_json'] if response.data else None
+
+
+def compact_forecasts(
+    client,
+    keep_detail: int = DETAIL_RETENTION_COUNT,
+    retention_days: int = SUMMARY_RETENTION_DAYS,
+) -> Dict[str, int]:
+    """
+    Apply forecast retention with two range deletes.
+
+    Args:
+        client: Supabase client
+        keep_detail: Number of newest forecasts whose detail is kept
+        retention_days: Summaries older than this are deleted (their detail cascades)
+
+    Returns:
+        Dictionary with the number of detail and summary rows removed
+    """
+    details_deleted = 0
+    delete_detail = client.table("demand_forecast_detail").delete(count="exact", returning="minimal")
+    if keep_detail <= 0:
+        details_deleted = delete_detail.gte("forecast_id", 0).execute().count or 0
+    else:
+        # forecast_id of the oldest detail row we keep; everything older goes
+        oldest_kept = (
+            client.table("demand_forecast_detail")
+            .select("forecast_id")
+            .order("forecast_id", desc=True)
+            .range(keep_detail - 1, keep_detail - 1)
+            .execute()
+        )
+        if oldest_kept.data:
+            details_deleted = delete_detail.lt("forecast_id", oldest_kept.data[0]['forecast_id']).execute().count or 0
+
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=retention_days)).isoformat()
+    summaries_deleted = (
+        client.table("demand_forecast")
+        .delete(count="exact", returning="minimal")
+        .lt("generated_at", cutoff)
+        .execute()
+    ).count or 0
+
+    return {'details_deleted': details_deleted, 'summaries_deleted': summaries_deleted}
@@ -0,0 +1,142 @@
+"""
+Response format negotiation for low-bandwidth clients.
+Endpoints return data as usual; the default response class encodes it in the
+format the client's Accept header asks for:
+
+- `application/json` (default): the usual row-per-object JSON
+- `application/msgpack`: the same structure as MessagePack
+- `application/vnd.columnar+json`: lists of objects become
+  `{"count": n, "columns": {"field": [values...]}}`, so each key is sent once
+- `application/vnd.columnar+msgpack`: columnar layout as MessagePack
+
+MessagePack needs the optional `msgpack` package; without it those types are
+not offered and clients get JSON. Responses built explicitly (errors,
+streams, exports) are unaffected.
+"""
+import contextvars
+import importlib.util
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from starlette.responses import JSONResponse
+
+# media type -> (encoding, columnar)
+MEDIA_TYPES: Dict[str, Tuple[str, bool]] = {
+    'application/json': ('json', False),
+    'application/msgpack': ('msgpack', False),
+    'application/x-msgpack': ('msgpack', False),
+    'application/vnd.columnar+json': ('json', True),
+    'application/vnd.columnar+msgpack': ('msgpack', True),
+}
+
+DEFAULT_MEDIA_TYPE = 'application/json'
+
+_MSGPACK_AVAILABLE = importlib.util.find_spec('msgpack') is not None
+
+_response_media_type: contextvars.ContextVar[str] = contextvars.ContextVar(
+    "response_media_type", default=DEFAULT_MEDIA_TYPE
+)
+
+
+def negotiate(accept: Optional[str]) -> str:
+    """
+    Pick the response media type for an Accept header.
+    Honors q-values; ties go to the earlier entry. Unsupported or missing
+    types fall back to JSON rather than failing with 406.
+    """
+    if not accept:
+        return DEFAULT_MEDIA_TYPE
+    best, best_q = DEFAULT_MEDIA_TYPE, 0.0
+    for entry in accept.split(','):
+        media_type, *params = [part.strip() for part in entry.split(';')]
+        media_type = media_type.lower()
+        q = 1.0
+        for param in params:
+            if param.startswith('q='):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        if media_type not in MEDIA_TYPES or q <= best_q:
+            continue
+        if MEDIA_TYPES[media_type][0] == 'msgpack' and not _MSGPACK_AVAILABLE:
+            continue
+        best, best_q = media_type, q
+    return best
+
+
+def to_columnar(value: Any) -> Any:
+    """Turn lists of objects (at any depth) into one array per field."""
+    if isinstance(value, dict):
+        return {key: to_columnar(item) for key, item in value.items()}
+    if isinstance(value, list) and value and all(isinstance(row, dict) for row in value):
+        fields: Dict[str, None] = {}
+        for row in value:
+            for key in row:
+                fields.setdefault(key, None)
+        return {
+            'count': len(value),
+            'columns': {field: [to_columnar(row.get(field)) for row in value] for field in fields},
+        }
+    return value
+
+
+def from_columnar(value: Any) -> Any:
+    """Inverse of to_columnar, for clients and tests."""
+    if isinstance(value, dict):
+        if set(value) == {'count', 'columns'} and isinstance(value['columns'], dict):
+            columns = value['columns']
+            rows: List[Dict[str, Any]] = [{} for _ in range(value['count'])]
+            for field, values in columns.items():
+                for row, item in zip(rows, values):
+                    row[field] = from_columnar(item)
+            return rows
+        return {key: from_columnar(item) for key, item in value.items()}
+    return value
+
+
+def encode(content: Any, media_type: str) -> bytes:
+    """Serialize JSON-compatible content (already run through jsonable_encoder) as `media_type`."""
+    encoding, columnar = MEDIA_TYPES[media_type]
+    if columnar:
+        content = to_columnar(content)
+    if encoding == 'msgpack':
+        import msgpack
+
+        return msgpack.packb(content, use_bin_type=True)
+    # Same settings as starlette's JSONResponse
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+class NegotiatedResponse(JSONResponse):
+    """Default response class: renders in the media type chosen for the current request."""
+
+    def __init__(self, content: Any, *args, **kwargs):
+        self.media_type = _response_media_type.get()
+        super().__init__(content, *args, **kwargs)
+        self.headers.add_vary_header('Accept')
+
+    def render(self, content: Any) -> bytes:
+        return encode(content, self.media_type)
+
+
+class ResponseFormatMiddleware:
+    """Pure ASGI middleware recording the negotiated media type for the request."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        accept = None
+        for name, value in scope['headers']:
+            if name == b'accept':
+                accept = value.decode('latin-1')
+                break
+        token = _response_media_type.set(negotiate(accept))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _response_media_type.reset(token)
@@ -0,0 +1,163 @@
+"""
+Idempotency keys and per-worker rate limiting for application submission.
+Mobile clients on flaky connections retry `POST /contracts`. A retry carrying
+the same `Idempotency-Key` is answered from an in-memory TTL store with the
+original response, without touching the database; a token bucket per worker
+caps how fast new submissions are accepted. Both are per process; the
+(job_id, worker_id) unique constraint in the database is the backstop across
+processes and for clients that don't send a key.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+IDEMPOTENCY_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", 24 * 60 * 60))
+IDEMPOTENCY_MAX_KEYS = int(os.getenv("IDEMPOTENCY_MAX_KEYS", 100_000))
+
+# Submissions per worker: bursts of RATE_LIMIT_BURST, refilled at RATE_LIMIT_PER_MINUTE
+RATE_LIMIT_BURST = int(os.getenv("RATE_LIMIT_BURST", 5))
+RATE_LIMIT_PER_MINUTE = float(os.getenv("RATE_LIMIT_PER_MINUTE", 10))
+RATE_LIMIT_MAX_BUCKETS = 100_000
+
+_IN_PROGRESS = object()
+
+
+class IdempotencyError(Exception):
+    """Raised for conflicting key reuse; carries the HTTP status to return."""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def fingerprint(payload: Dict[str, Any]) -> str:
+    """Stable hash of a request body, to detect a key reused for a different request."""
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class IdempotencyStore:
+    """
+    TTL + LRU map of idempotency key -> stored response.
+
+    A key is reserved while its first request runs, so a concurrent retry gets
+    a 409 instead of creating a second row. Reserved keys are never evicted;
+    the store may briefly exceed max_keys while many requests are in flight.
+    """
+
+    def __init__(self, ttl_seconds: float = IDEMPOTENCY_TTL_SECONDS, max_keys: int = IDEMPOTENCY_MAX_KEYS):
+        self.ttl_seconds = ttl_seconds
+        self.max_keys = max_keys
+        self._entries: "OrderedDict[str, Tuple[float, str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def reserve(self, key: str, request_fingerprint: str) -> Optional[Any]:
+        """
+        Claim a key, or return the stored response if it already completed.
+
+        Returns:
+            The original response for a completed key, or None if the caller
+            now owns the key and must call complete() or release()
+
+        Raises:
+            IdempotencyError: 409 while the first request is still running,
+                422 if the key was used with a different request body
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= now:
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                _, stored_fingerprint, result = entry
+                if stored_fingerprint != request_fingerprint:
+                    raise IdempotencyError(422, "Idempotency-Key was already used with a different request")
+                if result is _IN_PROGRESS:
+                    raise IdempotencyError(409, "A request with this Idempotency-Key is still being processed")
+                self._entries.move_to_end(key)
+                return result
+
+            self._entries[key] = (now + self.ttl_seconds, request_fingerprint, _IN_PROGRESS)
+            self._evict(now)
+            return None
+
+    def complete(self, key: str, result: Any) -> None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries[key] = (entry[0], entry[1], result)
+
+    def release(self, key: str) -> None:
+        """Forget a reserved key after its request failed, so it can be retried."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] is _IN_PROGRESS:
+                del self._entries[key]
+
+    def _evict(self, now: float) -> None:
+        excess = len(self._entries) - self.max_keys
+        if excess > 0:
+            # Least recently used first, but never a key whose request is still
+            # running: dropping it would let a retry create a second row
+            evictable = []
+            for key, (_, _, result) in self._entries.items():
+                if result is not _IN_PROGRESS:
+                    evictable.append(key)
+                    if len(evictable) == excess:
+                        break
+            for key in evictable:
+                del self._entries[key]
+        # Entries share one TTL, so expired ones are at the old end
+        while self._entries:
+            oldest_key, (expires, _, result) = next(iter(self._entries.items()))
+            if expires > now or result is _IN_PROGRESS:
+                break
+            del self._entries[oldest_key]
+
+
+class TokenBucketLimiter:
+    """In-memory token bucket per key (refill_per_second tokens up to capacity)."""
+
+    def __init__(
+        self,
+        capacity: int = RATE_LIMIT_BURST,
+        refill_per_second: float = RATE_LIMIT_PER_MINUTE / 60.0,
+        max_buckets: int = RATE_LIMIT_MAX_BUCKETS,
+    ):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.max_buckets = max_buckets
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()  # key -> (tokens, updated)
+        self._lock = threading.Lock()
+
+    def acquire(self, key: str) -> Tuple[bool, float]:
+        """
+        Take one token for `key`.
+
+        Returns:
+            (allowed, seconds until a token is available when not allowed)
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (float(self.capacity), now))
+            tokens = min(self.capacity, tokens + (now - updated) * self.refill_per_second)
+            allowed = tokens >= 1.0
+            if allowed:
+                tokens -= 1.0
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_buckets:
+                # Least recently used buckets have refilled long ago
+                self._buckets.popitem(last=False)
+
+        if allowed:
+            return True, 0.0
+        return False, (1.0 - tokens) / self.refill_per_second if self.refill_per_second > 0 else float('inf')
+
+
+idempotency_store = IdempotencyStore()
+submission_limiter = TokenBucketLimiter()
@@ -0,0 +1,217 @@
+"""
+Parsing and validation of job postings.
+Growers write pay the way they'd say it ("$12/hr", "$18.50 MXN per bucket",
+"15 pesos por cubeta"); `parse_pay` turns that into the `pay_rate_mxn` and
+`unit_type` columns. `prepare_jobs` does the same for a whole batch of rows
+(from CSV or JSON) in one vectorized pandas pass, checking quantity, crew size,
+date and crop, and returns insertable rows plus per-row errors.
+pandas is only imported when a batch is prepared.
+"""
+import os
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+CROP_TYPES = ('Tomato', 'Strawberry', 'Other')
+
+# Upper bounds that catch typos like a missing decimal point
+MAX_PAY_RATE_MXN = float(os.getenv("MAX_PAY_RATE_MXN", "10000"))
+MAX_WORKERS_REQUESTED = int(os.getenv("MAX_WORKERS_REQUESTED", "500"))
+MAX_QUANTITY_UNITS = int(os.getenv("MAX_QUANTITY_UNITS", "1000000"))
+
+# "$12/hr", "MX$12.50 per flat", "$1,200 MXN/day", "15 pesos por cubeta", "12.5"
+PAY_PATTERN = (
+    r'^\s*(?:mxn|mx\$|\$)?\s*'
+    r'(?P<rate>\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d+(?:\.\d+)?)'
+    r'\s*(?:mxn|pesos?)?\s*'
+    r'(?:(?:/|\bper\b|\bpor\b|\beach\b|\ba\b|\ban\b)\s*(?P<unit>[^\d\s/][^\d/]*?))?'
+    r'\s*\.?\s*$'
+)
+_PAY_RE = re.compile(PAY_PATTERN, re.IGNORECASE)
+
+# Spellings of pay units, mapped to the unit_type values the generator uses
+UNIT_ALIASES = {
+    'bucket': 'Buckets', 'buckets': 'Buckets', 'cubeta': 'Buckets', 'cubetas': 'Buckets', 'bote': 'Buckets', 'botes': 'Buckets',
+    'flat': 'Flats', 'flats': 'Flats', 'caja': 'Flats', 'cajas': 'Flats', 'box': 'Flats', 'boxes': 'Flats',
+    'hr': 'Hour', 'hrs': 'Hour', 'hour': 'Hour', 'hours': 'Hour', 'h': 'Hour', 'hora': 'Hour', 'horas': 'Hour',
+    'day': 'Day', 'days': 'Day', 'dia': 'Day', 'día': 'Day', 'jornada': 'Day',
+    'unit': 'unit', 'units': 'unit',
+}
+
+# Column names accepted in bulk uploads besides the JobCreate field names
+COLUMN_ALIASES = {
+    'start_date': 'date',
+    'quantity_units': 'quantity',
+    'workers': 'workers_requested',
+    'crew': 'workers_requested',
+    'crew_size': 'workers_requested',
+    'crop': 'crop_type',
+    'unit': 'unit_type',
+}
+
+_UUID_PATTERN = r'^[0-9a-fA-F]{8}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{12}$'
+
+
+def normalize_unit(unit: Optional[str]) -> str:
+    """Map a pay unit as written ("hr", "cubeta", "Flats") to a unit_type."""
+    if not unit:
+        return 'unit'
+    unit = unit.strip().lower()
+    return UNIT_ALIASES.get(unit, unit.title())
+
+
+def parse_pay(pay: str) -> Tuple[float, str]:
+    """
+    Parse a pay string into a rate in MXN and a unit type.
+
+    Args:
+        pay: Pay as entered, e.g. "$12/hr" or "$18.50 MXN per bucket"
+
+    Returns:
+        (pay_rate_mxn, unit_type), e.g. (18.5, 'Buckets')
+
+    Raises:
+        ValueError: If no positive rate can be read, or it exceeds MAX_PAY_RATE_MXN
+    """
+    match = _PAY_RE.match(pay or '')
+    if not match:
+        raise ValueError(f"Could not read a pay rate from {pay!r} (expected e.g. '$12/hr' or '$18.50 MXN per bucket')")
+    rate = float(match.group('rate').replace(',', ''))
+    if not 0 < rate <= MAX_PAY_RATE_MXN:
+        raise ValueError(f"Pay rate must be between 0 and {MAX_PAY_RATE_MXN:g} MXN")
+    return round(rate, 2), normalize_unit(match.group('unit'))
+
+
+def infer_crop(title: str, description: str = '') -> str:
+    """Crop type named in a job title (or description), else 'Other'."""
+    text = f"{title} {description or ''}".lower()
+    if 'tomat' in text or 'jitomate' in text:
+        return 'Tomato'
+    if 'strawberr' in text or 'fresa' in text:
+        return 'Strawberry'
+    return 'Other'
+
+
+def prepare_jobs(rows: List[Dict[str, Any]], grower_id: Optional[str] = None) -> Tuple[List[Tuple[int, Dict[str, Any]]], List[Dict[str, Any]]]:
+    """
+    Validate and convert uploaded job rows to jobs table rows.
+
+    Each row needs `title`, `date` (YYYY-MM-DD) and either `pay` (a pay string)
+    or `pay_rate_mxn`; `quantity` (default 0), `workers_requested` (default 1),
+    `unit_type`, `crop_type` (inferred from the title if missing), `description`
+    and `grower_id` are optional. `location` is accepted but, as with
+    `POST /jobs`, not stored.
+
+    Args:
+        rows: Uploaded rows (dicts of column name to value, e.g. from a CSV)
+        grower_id: Grower for rows that don't name one
+
+    Returns:
+        (valid, errors): `valid` is a list of (row index, jobs row) pairs, and
+        `errors` has one {'row', 'errors'} entry per rejected row
+    """
+    import numpy as np
+    import pandas as pd
+
+    if not rows:
+        return [], []
+    df = pd.DataFrame.from_records(rows)
+    for old, new in COLUMN_ALIASES.items():
+        if old in df.columns:
+            df[new] = df[new].fillna(df[old]) if new in df.columns else df[old]
+    for column in ('title', 'pay', 'pay_rate_mxn', 'unit_type', 'date', 'description', 'crop_type', 'quantity', 'workers_requested', 'grower_id'):
+        if column not in df.columns:
+            df[column] = None
+
+    def text(column: str) -> 'pd.Series':
+        # Missing, NaN and blank cells all become ''
+        return df[column].astype('string').fillna('').str.strip()
+
+    problems = pd.DataFrame(index=df.index)
+
+    title = text('title')
+    problems['title'] = np.where(title == '', 'title is required', None)
+
+    # Pay: an explicit pay_rate_mxn column wins over the pay string
+    pay = text('pay')
+    parsed = pay.str.extract(PAY_PATTERN, flags=re.IGNORECASE)
+    explicit_rate = pd.to_numeric(text('pay_rate_mxn').str.replace(',', '', regex=False).replace('', pd.NA), errors='coerce')
+    parsed_rate = pd.to_numeric(parsed['rate'].str.replace(',', '', regex=False), errors='coerce')
+    rate = explicit_rate.fillna(parsed_rate).astype(float).round(2)
+    unreadable = rate.isna() & (pay != '')
+    problems['pay'] = np.select(
+        [rate.isna() & (pay == ''), unreadable, (rate <= 0) | (rate > MAX_PAY_RATE_MXN)],
+        ['pay (or pay_rate_mxn) is required',
+         "pay must look like '$12/hr' or '$18.50 MXN per bucket'",
+         f"pay rate must be between 0 and {MAX_PAY_RATE_MXN:g} MXN"],
+        default=None,
+    )
+    unit = text('unit_type').where(text('unit_type') != '', parsed['unit'].astype('string').fillna('').str.strip())
+    unit_type = unit.str.lower().map(UNIT_ALIASES).fillna(unit.str.title()).replace('', 'unit')
+
+    def integer(column: str, default: int, low: int, high: int) -> 'pd.Series':
+        raw = text(column)
+        values = pd.to_numeric(raw.replace('', pd.NA), errors='coerce').astype(float)
+        filled = values.fillna(default)
+        bad = (values.isna() & (raw != '')) | (filled != filled.round()) | (filled < low) | (filled > high)
+        problems[column] = np.where(bad, f"{column} must be a whole number from {low} to {high}", None)
+        return filled
+
+    quantity = integer('quantity', 0, 0, MAX_QUANTITY_UNITS)
+    workers = integer('workers_requested', 1, 1, MAX_WORKERS_REQUESTED)
+
+    raw_date = text('date')
+    start_date = pd.to_datetime(raw_date, format='%Y-%m-%d', errors='coerce')
+    problems['date'] = np.select(
+        [raw_date == '', start_date.isna()],
+        ['date is required', 'date must be YYYY-MM-DD'],
+        default=None,
+    )
+
+    description = text('description')
+    crop = text('crop_type').str.title()
+    lowered = title.str.lower() + ' ' + description.str.lower()
+    inferred = np.select(
+        [lowered.str.contains('tomat|jitomate'), lowered.str.contains('strawberr|fresa')],
+        ['Tomato', 'Strawberry'],
+        default='Other',
+    )
+    crop = crop.where(crop != '', pd.Series(inferred, index=df.index))
+    problems['crop_type'] = np.where(crop.isin(CROP_TYPES), None, f"crop_type must be one of {', '.join(CROP_TYPES)}")
+
+    grower = text('grower_id').replace('', grower_id or '')
+    problems['grower_id'] = np.where((grower != '') & ~grower.str.match(_UUID_PATTERN), 'grower_id must be a UUID', None)
+
+    valid: List[Tuple[int, Dict[str, Any]]] = []
+    errors: List[Dict[str, Any]] = []
+    messages = problems.to_numpy()
+    columns = {
+        'title': title.to_numpy(),
+        'crop_type': crop.to_numpy(),
+        'pay_rate_mxn': rate.to_numpy(),
+        'quantity_units': quantity.to_numpy(),
+        'unit_type': unit_type.to_numpy(),
+        'workers_requested': workers.to_numpy(),
+        'start_date': start_date.dt.strftime('%Y-%m-%d').to_numpy(),
+        'description': description.to_numpy(),
+        'grower_id': grower.to_numpy(),
+    }
+    for i in range(len(df)):
+        row_errors = [message for message in messages[i] if message is not None]
+        if row_errors:
+            errors.append({'row': i, 'errors': row_errors})
+            continue
+        job = {
+            'title': str(columns['title'][i]),
+            'crop_type': str(columns['crop_type'][i]),
+            'pay_rate_mxn': float(columns['pay_rate_mxn'][i]),
+            'quantity_units': int(columns['quantity_units'][i]),
+            'unit_type': str(columns['unit_type'][i]),
+            'workers_requested': int(columns['workers_requested'][i]),
+            'start_date': str(columns['start_date'][i]),
+            'description': str(columns['description'][i]),
+            'status': 'open',
+        }
+        if columns['grower_id'][i]:
+            job['grower_id'] = str(columns['grower_id'][i])
+        valid.append((i, job))
+    return valid, errors
@@ -0,0 +1,190 @@
+"""
+Job lifecycle sweep.
+Jobs stay 'open' after their start date unless something closes them, so the
+open set (what GET /jobs and /stats scan) would keep growing. The sweep closes
+jobs whose start date has passed and completes signed contracts once the
+job's service time is over, using the close_expired_jobs and
+complete_finished_contracts database functions: set-based updates of
+LIFECYCLE_BATCH_SIZE rows per call.
+
+It runs every LIFECYCLE_INTERVAL_SECONDS inside the app (started by the
+lifespan), or as a standalone worker:
+    python -m lifecycle            # loop
+    python -m lifecycle --once     # one sweep, e.g. from cron
+
+Every replica may run it; a lease row (acquire_lease) lets only one of them
+sweep at a time, and another takes over once the holder's lease expires.
+"""
+import argparse
+import asyncio
+import os
+import socket
+from typing import Any, Callable, Dict, Optional
+
+# Seconds between sweeps; 0 disables the in-app sweep (e.g. when the standalone worker runs)
+LIFECYCLE_INTERVAL_SECONDS = float(os.getenv("LIFECYCLE_INTERVAL_SECONDS", "300"))
+LIFECYCLE_BATCH_SIZE = int(os.getenv("LIFECYCLE_BATCH_SIZE", "1000"))
+# A holder that stops renewing loses the lease after this long
+LIFECYCLE_LEASE_SECONDS = int(os.getenv("LIFECYCLE_LEASE_SECONDS", str(int(max(LIFECYCLE_INTERVAL_SECONDS, 60) * 2))))
+
+LEASE_NAME = 'job_lifecycle'
+HOLDER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _renew_lease(client, holder: str, lease_seconds: int) -> bool:
+    return bool(client.rpc('acquire_lease', {
+        'lease_name': LEASE_NAME,
+        'holder_id': holder,
+        'ttl_seconds': lease_seconds,
+    }).execute().data)
+
+
+def run_once(
+    client,
+    batch_size: int = LIFECYCLE_BATCH_SIZE,
+    lease_seconds: int = LIFECYCLE_LEASE_SECONDS,
+    holder: str = HOLDER_ID
+) -> Dict[str, Any]:
+    """
+    Run one sweep if this process holds (or can take) the lease.
+
+    Args:
+        client: Supabase client
+        batch_size: Rows updated per database call
+        lease_seconds: Lease length; renewed before every batch
+        holder: Lease holder id (host:pid by default)
+
+    Returns:
+        Dict with jobs_closed, closed job_ids, contracts_completed, and
+        skipped=True when another replica holds the lease
+    """
+    result = {'skipped': False, 'jobs_closed': 0, 'job_ids': [], 'contracts_completed': 0}
+    if not _renew_lease(client, holder, lease_seconds):
+        result['skipped'] = True
+        return result
+
+    while True:
+        batch = client.rpc('close_expired_jobs', {'batch_size': batch_size}).execute().data or {}
+        result['jobs_closed'] += batch.get('closed', 0)
+        result['job_ids'].extend(batch.get('job_ids', []))
+        if batch.get('closed', 0) < batch_size:
+            break
+        if not _renew_lease(client, holder, lease_seconds):
+            return result
+
+    while True:
+        batch = client.rpc('complete_finished_contracts', {'batch_size': batch_size}).execute().data or {}
+        result['contracts_completed'] += batch.get('completed', 0)
+        if batch.get('completed', 0) < batch_size:
+            break
+        if not _renew_lease(client, holder, lease_seconds):
+            break
+    return result
+
+
+def release(client, holder: str = HOLDER_ID) -> None:
+    """Give up the lease so another replica can take over without waiting for it to expire."""
+    client.rpc('release_lease', {'lease_name': LEASE_NAME, 'holder_id': holder}).execute()
+
+
+class LifecycleScheduler:
+    """Runs the sweep periodically on the app's event loop."""
+
+    def __init__(self, interval_seconds: float = LIFECYCLE_INTERVAL_SECONDS):
+        self.interval_seconds = interval_seconds
+        self._task: Optional[asyncio.Task] = None
+        self._client = None
+        self.last_result: Optional[Dict[str, Any]] = None
+
+    def start(self, client, on_change: Optional[Callable[[Dict[str, Any]], None]] = None) -> None:
+        """Start sweeping; `on_change(result)` runs after sweeps that closed or completed anything."""
+        if self._task is not None or self.interval_seconds <= 0:
+            return
+        self._client = client
+        self._task = asyncio.create_task(self._loop(on_change))
+
+    async def _loop(self, on_change) -> None:
+        from fastapi.concurrency import run_in_threadpool
+
+        while True:
+            try:
+                result = await run_in_threadpool(run_once, self._client)
+                self.last_result = result
+                if on_change is not None and (result['jobs_closed'] or result['contracts_completed']):
+                    on_change(result)
+            except Exception as e:
+                print(f"Warning: Job lifecycle sweep failed: {e}")
+            await asyncio.sleep(self.interval_seconds)
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is None:
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        from fastapi.concurrency import run_in_threadpool
+
+        try:
+            await run_in_threadpool(release, self._client)
+        except Exception as e:
+            print(f"Warning: Could not release job lifecycle lease: {e}")
+
+
+scheduler = LifecycleScheduler()
+
+
+async def _main(args) -> None:
+    from cache import bus as cache_bus
+    from db import close_client, get_client
+    from search import publish_job_changes
+
+    client = get_client()
+    # API processes drop their cached job lists and refresh closed jobs' search
+    # entries when told over the bus
+    await cache_bus.start()
+    try:
+        while True:
+            try:
+                result = await asyncio.to_thread(run_once, client, args.batch_size)
+            except Exception as e:
+                if args.once:
+                    raise
+                print(f"Warning: Job lifecycle sweep failed: {e}")
+            else:
+                if result['skipped']:
+                    print("Another replica holds the lifecycle lease; skipped")
+                else:
+                    print(f"Closed {result['jobs_closed']} jobs, completed {result['contracts_completed']} contracts")
+                if result['jobs_closed'] or result['contracts_completed']:
+                    cache_bus.invalidate('jobs', 'stats', 'grower_dashboards')
+                if result['jobs_closed']:
+                    publish_job_changes(cache_bus, upserted=result['job_ids'])
+            if args.once:
+                break
+            await asyncio.sleep(args.interval)
+    finally:
+        try:
+            release(client)
+        except Exception as e:
+            print(f"Warning: Could not release job lifecycle lease: {e}")
+        await cache_bus.stop()
+        close_client()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--once', action='store_true', help='Run one sweep and exit')
+    parser.add_argument('--interval', type=float, default=LIFECYCLE_INTERVAL_SECONDS or 300, help='Seconds between sweeps')
+    parser.add_argument('--batch-size', type=int, default=LIFECYCLE_BATCH_SIZE, help='Rows updated per database call')
+    args = parser.parse_args()
+    try:
+        asyncio.run(_main(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
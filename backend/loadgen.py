@@ -0,0 +1,525 @@
+"""
+Seed and load-generation CLI for production-scale test datasets.
+Generates growers, workers and a season of jobs, applications and contracts:
+
+- Each grower posts jobs as a Poisson process (the same job model as
+  `data_generator`), with posting rates skewed across growers the way a few
+  large farms dominate real demand.
+- Applicants arrive after a job is posted, drawn from workers with skewed
+  activity; growers accept them first come, first served until the crew is
+  full. Past jobs are closed and their contracts completed (which fills the
+  earnings ledger); jobs starting soon are still open with pending applicants.
+
+Rows can be written three ways:
+
+- `--target supabase` (default): chunked PostgREST inserts, one grower per
+  task, spread over a multiprocessing pool.
+- `--target csv --out DIR`: one COPY-ready CSV per table plus `load.sql` for
+  `psql -f`, e.g. for a local Postgres. Row ids are assigned from `--id-start`.
+- `--target postgres`: COPY straight into DATABASE_URL with asyncpg, appending
+  after the current max ids.
+
+Usage (from the backend directory):
+    python -m loadgen --growers 50 --workers 5000 --days 120 --processes 8
+    python -m loadgen --target csv --out seed_data && psql "$DATABASE_URL" -f seed_data/load.sql
+"""
+import argparse
+import csv
+import math
+import multiprocessing
+import os
+import time
+import uuid
+from datetime import date, datetime, time as dt_time, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+FIRST_NAMES = ['Juan', 'María', 'José', 'Guadalupe', 'Francisco', 'Rosa', 'Miguel', 'Ana', 'Luis', 'Carmen']
+LAST_NAMES = ['Hernández', 'García', 'Martínez', 'López', 'González', 'Pérez', 'Sánchez', 'Ramírez', 'Cruz', 'Flores']
+FARM_PREFIXES = ['Agrícola', 'Rancho', 'Campo', 'Productora', 'Huertos']
+FARM_NAMES = ['Los Pinos', 'El Vergel', 'San Simón', 'Santa Rosa', 'La Esperanza', 'Vicente Guerrero', 'El Milagro']
+LOCATIONS = ['San Quintín', 'Vicente Guerrero', 'Camalú', 'El Rosario', 'Lázaro Cárdenas']
+LANGUAGES = ['es', 'mix', 'tri', 'zap']
+
+# Columns written per table, in COPY order (local keys are resolved to ids first)
+COLUMNS: Dict[str, List[str]] = {
+    'users': ['id', 'role', 'name', 'phone', 'created_at'],
+    'growers': ['user_id', 'farm_name', 'location', 'contact_person'],
+    'workers': ['user_id', 'literacy_level', 'preferred_language', 'prefers_voice_input', 'age', 'gender'],
+    'jobs': [
+        'id', 'grower_id', 'title', 'crop_type', 'pay_rate_mxn', 'quantity_units', 'unit_type',
+        'workers_requested', 'start_date', 'description', 'status', 'service_time_mins',
+        'arrival_time_poisson', 'created_at',
+    ],
+    'applications': ['id', 'job_id', 'worker_id', 'status', 'submitted_at', 'notes'],
+    'contracts': ['id', 'job_id', 'worker_id', 'application_id', 'signed_at', 'benefit_enrolled', 'status', 'created_at'],
+}
+
+# Tables with SERIAL ids, in dependency order
+SERIAL_TABLES = ('jobs', 'applications', 'contracts')
+
+DEFAULTS: Dict[str, Any] = {
+    'growers': 20,
+    'workers': 2000,
+    'days': 120,
+    'season_start': None,  # defaults to end the season a week from today
+    'jobs_per_day': 10.0,
+    'applicant_ratio': 1.4,  # applicants per requested worker
+    'accept_prob': 0.85,
+    'cancel_prob': 0.02,
+    'seed': 42,
+}
+
+# Set in each pool process by _init_process
+_shared: Dict[str, Any] = {}
+
+
+def _uuid(rng: np.random.Generator) -> str:
+    return str(uuid.UUID(bytes=rng.bytes(16), version=4))
+
+
+def _activity_weights(rng: np.random.Generator, count: int, sigma: float) -> np.ndarray:
+    """Lognormal activity levels normalized to probabilities (a few accounts do most of the work)."""
+    weights = rng.lognormal(0.0, sigma, count)
+    return weights / weights.sum()
+
+
+def make_people(settings: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Users plus grower and worker profiles.
+
+    Returns:
+        Dictionary with `users`, `growers` and `workers` rows, and the grower
+        and worker activity weights used to distribute jobs and applications
+    """
+    rng = np.random.default_rng([settings['seed'], 0])
+    joined = datetime.combine(settings['season_start'], dt_time(), tzinfo=timezone.utc) - timedelta(days=30)
+    users, growers, workers = [], [], []
+    for i in range(settings['growers']):
+        user_id = _uuid(rng)
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        users.append({
+            'id': user_id,
+            'role': 'grower',
+            'name': name,
+            'phone': f"+52{rng.integers(6000000000, 6999999999)}",
+            'created_at': joined - timedelta(days=int(rng.integers(0, 365))),
+        })
+        growers.append({
+            'user_id': user_id,
+            'farm_name': f"{rng.choice(FARM_PREFIXES)} {rng.choice(FARM_NAMES)} {i + 1}",
+            'location': f"{rng.choice(LOCATIONS)}, Baja California",
+            'contact_person': name,
+        })
+    for _ in range(settings['workers']):
+        user_id = _uuid(rng)
+        users.append({
+            'id': user_id,
+            'role': 'worker',
+            'name': f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {rng.choice(LAST_NAMES)}",
+            'phone': f"+52{rng.integers(6000000000, 6999999999)}",
+            'created_at': joined - timedelta(days=int(rng.integers(0, 365))),
+        })
+        literacy = rng.choice(['low', 'medium', 'high'], p=[0.4, 0.4, 0.2])
+        workers.append({
+            'user_id': user_id,
+            'literacy_level': str(literacy),
+            'preferred_language': str(rng.choice(LANGUAGES, p=[0.7, 0.15, 0.1, 0.05])),
+            'prefers_voice_input': bool(literacy == 'low' or rng.random() < 0.2),
+            'age': int(rng.integers(16, 65)),
+            'gender': str(rng.choice(['F', 'M'])),
+        })
+    return {
+        'users': users,
+        'growers': growers,
+        'workers': workers,
+        'grower_weights': _activity_weights(rng, settings['growers'], 1.0),
+        'worker_weights': _activity_weights(rng, settings['workers'], 0.8),
+    }
+
+
+def generate_grower_season(grower_index: int, grower_id: str, grower_weight: float) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    One grower's jobs with their applications and contracts.
+
+    Rows carry local keys instead of ids: jobs have `_key`, applications
+    `_key` and `_job`, contracts `_job` and `_application`. Seeded per grower,
+    so the output doesn't depend on how growers are spread over processes.
+    """
+    from data_generator import convert_to_supabase_format, sample_job_arrays
+
+    settings = _shared['settings']
+    worker_ids = _shared['worker_ids']
+    worker_weights = _shared['worker_weights']
+    rng = np.random.default_rng([settings['seed'], 1, grower_index])
+    now = _shared['now']
+    season_start = datetime.combine(settings['season_start'], dt_time(), tzinfo=timezone.utc)
+    horizon_mins = settings['days'] * 1440
+
+    # Poisson arrivals over the season: draw enough for the horizon and keep those inside it
+    rate_per_day = settings['jobs_per_day'] * grower_weight
+    expected = rate_per_day * settings['days']
+    if expected <= 0:
+        return {'jobs': [], 'applications': [], 'contracts': []}
+    draws = int(expected + 6 * math.sqrt(expected) + 10)
+    arrays = sample_job_arrays(rng, 1, draws, arrival_rate_minutes=1440 / rate_per_day)
+    keep = arrays['arrival_time_poisson'][0] < horizon_mins
+    is_tomato = arrays['crop_is_tomato'][0][keep]
+    frame = pd.DataFrame({
+        'Job_ID': np.arange(1, int(keep.sum()) + 1),
+        'Crop_Type': np.where(is_tomato, 'Tomato', 'Strawberry'),
+        'Quantity_Units': arrays['quantity_units'][0][keep],
+        'Unit_Type': np.where(is_tomato, 'Buckets', 'Flats'),
+        'Workers_Requested': arrays['workers_requested'][0][keep],
+        'Pay_Rate_MXN': arrays['pay_rate_mxn'][0][keep],
+        'Service_Time_Mins': arrays['service_time_mins'][0][keep],
+        'Arrival_Time_Poisson': np.round(arrays['arrival_time_poisson'][0][keep], 2),
+    })
+    jobs = convert_to_supabase_format(frame, base_date=season_start, grower_id=grower_id)
+
+    job_rows, applications, contracts = [], [], []
+    for job in jobs:
+        job['start_date'] = date.fromisoformat(job['start_date'])
+        start = datetime.combine(job['start_date'], dt_time(6, 0), tzinfo=timezone.utc)
+        posted = start - timedelta(days=float(rng.uniform(1.0, 7.0)))
+        if posted > now:
+            continue  # not posted yet
+        started = start <= now
+        finished = start + timedelta(minutes=float(job['service_time_mins'])) <= now
+        cancelled = rng.random() < settings['cancel_prob']
+        job_key = len(job_rows)
+        job['_key'] = job_key
+        job['created_at'] = posted
+        job['status'] = 'cancelled' if cancelled else ('closed' if started else 'open')
+        job_rows.append(job)
+
+        # Applicants arrive as a Poisson process between posting and start
+        requested = job['workers_requested']
+        wanted = rng.poisson(requested * settings['applicant_ratio'])
+        if wanted == 0:
+            continue
+        drawn = rng.choice(len(worker_ids), size=wanted, p=worker_weights)
+        applicants = pd.unique(drawn)
+        window = (start - posted).total_seconds()
+        offsets = np.sort(rng.uniform(0.0, window, len(applicants)))
+        accepted = 0
+        for applicant, offset in zip(applicants, offsets):
+            submitted = posted + timedelta(seconds=float(offset))
+            if submitted > now:
+                break
+            if cancelled:
+                status = 'rejected'
+            elif not started and rng.random() < 0.4:
+                status = 'pending'  # grower hasn't decided yet
+            elif accepted < requested and rng.random() < settings['accept_prob']:
+                status = 'accepted'
+                accepted += 1
+            else:
+                status = 'rejected'
+            application_key = len(applications)
+            applications.append({
+                '_key': application_key,
+                '_job': job_key,
+                'worker_id': worker_ids[applicant],
+                'status': status,
+                'submitted_at': submitted,
+                'notes': None,
+            })
+            if status != 'accepted':
+                continue
+            created = submitted + timedelta(hours=float(rng.exponential(6.0)))
+            if finished:
+                contract_status = 'completed' if rng.random() < 0.95 else 'signed'
+            else:
+                contract_status = 'signed' if rng.random() < 0.6 else 'pending'
+            contracts.append({
+                '_job': job_key,
+                '_application': application_key,
+                'worker_id': worker_ids[applicant],
+                'signed_at': created + timedelta(hours=float(rng.exponential(12.0))) if contract_status != 'pending' else None,
+                'benefit_enrolled': bool(rng.random() < 0.3),
+                'status': contract_status,
+                'created_at': created,
+            })
+    return {'jobs': job_rows, 'applications': applications, 'contracts': contracts}
+
+
+def _init_process(settings: Dict[str, Any], worker_ids: List[str], worker_weights: np.ndarray, now: datetime) -> None:
+    _shared.update(settings=settings, worker_ids=worker_ids, worker_weights=worker_weights, now=now)
+
+
+def _json_row(row: Dict[str, Any], columns: List[str]) -> Dict[str, Any]:
+    """Keep the table's columns, formatting dates for PostgREST."""
+    out = {}
+    for column in columns:
+        if column not in row:
+            continue
+        value = row[column]
+        out[column] = value.isoformat() if isinstance(value, (date, datetime)) else value
+    return out
+
+
+def _chunks(rows: List[Any], size: int) -> Iterator[List[Any]]:
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def _insert_rows(client, table: str, rows: List[Dict[str, Any]], chunk_size: int, returning: bool = False) -> List[Dict[str, Any]]:
+    """Insert in chunks; returns the inserted rows (with ids) when `returning` is set."""
+    # Serial ids are assigned by the database
+    columns = [column for column in COLUMNS[table] if not (column == 'id' and table in SERIAL_TABLES)]
+    inserted: List[Dict[str, Any]] = []
+    for chunk in _chunks([_json_row(row, columns) for row in rows], chunk_size):
+        response = client.table(table).insert(chunk, returning="representation" if returning else "minimal").execute()
+        if returning:
+            inserted.extend(response.data or [])
+    return inserted
+
+
+def _insert_people_task(task: Tuple[str, List[Dict[str, Any]], int]) -> Tuple[str, int]:
+    from db import get_client
+
+    table, rows, chunk_size = task
+    _insert_rows(get_client(), table, rows, chunk_size)
+    return table, len(rows)
+
+
+def _insert_grower_task(task: Tuple[int, str, float]) -> Dict[str, int]:
+    """Generate one grower's season and insert it through PostgREST."""
+    from db import get_client
+
+    client = get_client()
+    chunk_size = _shared['settings']['chunk_size']
+    season = generate_grower_season(*task)
+    if not season['jobs']:
+        return {table: 0 for table in SERIAL_TABLES}
+
+    # PostgREST returns inserted rows in request order
+    job_ids = [row['id'] for row in _insert_rows(client, 'jobs', season['jobs'], chunk_size, returning=True)]
+    for application in season['applications']:
+        application['job_id'] = job_ids[application['_job']]
+    inserted = _insert_rows(client, 'applications', season['applications'], chunk_size, returning=True)
+    application_ids = {(row['job_id'], row['worker_id']): row['id'] for row in inserted}
+    for contract in season['contracts']:
+        contract['job_id'] = job_ids[contract['_job']]
+        contract['application_id'] = application_ids.get((contract['job_id'], contract['worker_id']))
+    _insert_rows(client, 'contracts', season['contracts'], chunk_size)
+    return {table: len(season[table]) for table in SERIAL_TABLES}
+
+
+def _generate_grower_task(task: Tuple[int, str, float]) -> Dict[str, List[Dict[str, Any]]]:
+    return generate_grower_season(*task)
+
+
+def _number_rows(season: Dict[str, List[Dict[str, Any]]], next_ids: Dict[str, int]) -> None:
+    """Replace local keys with ids allocated from `next_ids` (advanced in place)."""
+    job_base, application_base = next_ids['jobs'], next_ids['applications']
+    for job in season['jobs']:
+        job['id'] = job_base + job['_key']
+    for application in season['applications']:
+        application['id'] = application_base + application['_key']
+        application['job_id'] = job_base + application['_job']
+    for offset, contract in enumerate(season['contracts']):
+        contract['id'] = next_ids['contracts'] + offset
+        contract['job_id'] = job_base + contract['_job']
+        contract['application_id'] = application_base + contract['_application']
+    for table in SERIAL_TABLES:
+        next_ids[table] += len(season[table])
+
+
+def _record(row: Dict[str, Any], columns: List[str]) -> tuple:
+    return tuple(row.get(column) for column in columns)
+
+
+class _CsvSink:
+    """One CSV file per table plus a psql script that loads them in order."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._files = {}
+        self._writers = {}
+        for table, columns in COLUMNS.items():
+            handle = open(os.path.join(directory, f"{table}.csv"), 'w', newline='', encoding='utf-8')
+            writer = csv.writer(handle)
+            writer.writerow(columns)
+            self._files[table] = handle
+            self._writers[table] = writer
+
+    def write(self, table: str, rows: List[Dict[str, Any]]) -> None:
+        columns = COLUMNS[table]
+        self._writers[table].writerows(
+            tuple(value.isoformat() if isinstance(value, (date, datetime)) else value for value in _record(row, columns))
+            for row in rows
+        )
+
+    def close(self) -> None:
+        for handle in self._files.values():
+            handle.close()
+        lines = ["-- Generated by `python -m loadgen`; run with psql -f from this directory", "BEGIN;"]
+        for table, columns in COLUMNS.items():
+            lines.append(f"\\copy {table} ({', '.join(columns)}) FROM '{table}.csv' WITH (FORMAT csv, HEADER true)")
+        for table in SERIAL_TABLES:
+            lines.append(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT max(id) FROM {table}));")
+        lines.append("COMMIT;")
+        with open(os.path.join(self.directory, 'load.sql'), 'w', encoding='utf-8') as handle:
+            handle.write('\n'.join(lines) + '\n')
+
+
+def _write_numbered(people: Dict[str, Any], seasons: Iterator[Dict[str, List[Dict[str, Any]]]],
+                    next_ids: Dict[str, int], write) -> Dict[str, int]:
+    """Number each grower's rows and pass them to `write(table, rows)`; returns row counts."""
+    counts = {table: 0 for table in COLUMNS}
+    for table in ('users', 'growers', 'workers'):
+        write(table, people[table])
+        counts[table] = len(people[table])
+    for season in seasons:
+        _number_rows(season, next_ids)
+        # Parents before children, so foreign keys and fill-count triggers see their rows
+        for table in SERIAL_TABLES:
+            if season[table]:
+                write(table, season[table])
+                counts[table] += len(season[table])
+    return counts
+
+
+async def _copy_to_postgres(database_url: str, people: Dict[str, Any], seasons) -> Dict[str, int]:
+    """COPY everything in one transaction, appending after the current max ids."""
+    import asyncpg
+
+    connection = await asyncpg.connect(database_url, server_settings={'application_name': 'labor-loadgen'})
+    try:
+        async with connection.transaction():
+            next_ids = {}
+            for table in SERIAL_TABLES:
+                # Keep concurrent inserts from taking ids in the block being loaded
+                await connection.execute(f"LOCK TABLE {table} IN SHARE ROW EXCLUSIVE MODE")
+                next_ids[table] = await connection.fetchval(f"SELECT COALESCE(max(id), 0) + 1 FROM {table}")
+
+            async def copy(table: str, rows: List[Dict[str, Any]]) -> None:
+                records = [_record(row, COLUMNS[table]) for row in rows]
+                await connection.copy_records_to_table(table, records=records, columns=COLUMNS[table])
+
+            counts = {table: 0 for table in COLUMNS}
+            for table in ('users', 'growers', 'workers'):
+                await copy(table, people[table])
+                counts[table] = len(people[table])
+            for season in seasons:
+                _number_rows(season, next_ids)
+                for table in SERIAL_TABLES:
+                    if season[table]:
+                        await copy(table, season[table])
+                        counts[table] += len(season[table])
+            for table in SERIAL_TABLES:
+                await connection.execute(
+                    f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT max(id) FROM {table}))"
+                )
+    finally:
+        await connection.close()
+    return counts
+
+
+def run(settings: Dict[str, Any], target: str = 'supabase', out: Optional[str] = None,
+        processes: Optional[int] = None, id_start: int = 1) -> Dict[str, int]:
+    """
+    Generate a dataset and write it to `target`.
+
+    Args:
+        settings: DEFAULTS overrides plus `chunk_size`
+        target: 'supabase', 'csv' or 'postgres'
+        out: Output directory for 'csv'
+        processes: Pool size (defaults to the CPU count)
+        id_start: First job/application/contract id for 'csv'
+
+    Returns:
+        Row counts per table
+    """
+    settings = {**DEFAULTS, 'chunk_size': 500, **settings}
+    if settings['season_start'] is None:
+        # Jobs are posted up to a week ahead, so the last week's are still open
+        settings['season_start'] = date.today() - timedelta(days=settings['days'] - 7)
+    now = datetime.now(timezone.utc)
+    people = make_people(settings)
+    worker_ids = [worker['user_id'] for worker in people['workers']]
+    grower_tasks = [
+        (index, grower['user_id'], float(weight))
+        for index, (grower, weight) in enumerate(zip(people['growers'], people['grower_weights']))
+    ]
+    initargs = (settings, worker_ids, people['worker_weights'], now)
+
+    with multiprocessing.Pool(processes, initializer=_init_process, initargs=initargs) as pool:
+        if target == 'supabase':
+            counts = {table: 0 for table in COLUMNS}
+            chunk_size = settings['chunk_size']
+            # Users first, then profiles, then each grower's jobs and their children
+            for tables in (('users',), ('growers', 'workers')):
+                tasks = [(table, chunk, chunk_size) for table in tables for chunk in _chunks(people[table], chunk_size * 4)]
+                for table, inserted in pool.imap_unordered(_insert_people_task, tasks):
+                    counts[table] += inserted
+            for grower_counts in pool.imap_unordered(_insert_grower_task, grower_tasks):
+                for table, inserted in grower_counts.items():
+                    counts[table] += inserted
+            return counts
+        if target == 'csv':
+            sink = _CsvSink(out or 'seed_data')
+            try:
+                next_ids = {table: id_start for table in SERIAL_TABLES}
+                return _write_numbered(people, pool.imap(_generate_grower_task, grower_tasks), next_ids, sink.write)
+            finally:
+                sink.close()
+        if target == 'postgres':
+            import asyncio
+
+            database_url = os.getenv("DATABASE_URL", "").strip().strip('"').strip("'")
+            if not database_url:
+                raise ValueError("DATABASE_URL must be set for --target postgres")
+            return asyncio.run(_copy_to_postgres(database_url, people, pool.imap(_generate_grower_task, grower_tasks)))
+    raise ValueError(f"Unknown target: {target}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--growers', type=int, default=DEFAULTS['growers'])
+    parser.add_argument('--workers', type=int, default=DEFAULTS['workers'])
+    parser.add_argument('--days', type=int, default=DEFAULTS['days'], help='Season length in days')
+    parser.add_argument('--season-start', type=date.fromisoformat, default=None,
+                        help='First day of the season (YYYY-MM-DD; default: ends a week from today)')
+    parser.add_argument('--jobs-per-day', type=float, default=DEFAULTS['jobs_per_day'], help='Mean jobs posted per day, all growers')
+    parser.add_argument('--applicant-ratio', type=float, default=DEFAULTS['applicant_ratio'], help='Mean applicants per requested worker')
+    parser.add_argument('--accept-prob', type=float, default=DEFAULTS['accept_prob'])
+    parser.add_argument('--seed', type=int, default=DEFAULTS['seed'])
+    parser.add_argument('--target', choices=['supabase', 'csv', 'postgres'], default='supabase')
+    parser.add_argument('--out', default='seed_data', help='Output directory for --target csv')
+    parser.add_argument('--id-start', type=int, default=1, help='First job/application/contract id for --target csv')
+    parser.add_argument('--processes', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--chunk-size', type=int, default=500, help='Rows per PostgREST insert')
+    args = parser.parse_args()
+
+    settings = {
+        'growers': args.growers,
+        'workers': args.workers,
+        'days': args.days,
+        'season_start': args.season_start,
+        'jobs_per_day': args.jobs_per_day,
+        'applicant_ratio': args.applicant_ratio,
+        'accept_prob': args.accept_prob,
+        'seed': args.seed,
+        'chunk_size': args.chunk_size,
+    }
+    start = time.perf_counter()
+    counts = run(settings, target=args.target, out=args.out, processes=args.processes, id_start=args.id_start)
+    elapsed = time.perf_counter() - start
+
+    print(f"Generated for {args.target} in {elapsed:.1f}s")
+    print(f"{'table':<14}{'rows':>10}")
+    for table, count in counts.items():
+        print(f"{table:<14}{count:>10}")
+    print(f"{'total':<14}{sum(counts.values()):>10}  ({sum(counts.values()) / elapsed:,.0f} rows/s)")
+    if args.target == 'csv':
+        print(f"Load with: cd {args.out} && psql \"$DATABASE_URL\" -f load.sql")
+
+
+if __name__ == "__main__":
+    main()
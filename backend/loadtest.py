@@ -0,0 +1,390 @@
+"""
+Load-testing harness that replays hiring-day peak traffic against a running API.
+The 5-7am burst is a mix of three kinds of session, each started as a Poisson
+process (inter-arrival times from `data_generator`'s arrival model):
+
+- browsing workers: `GET /jobs`, then one job's detail
+- applying workers: browse, upload a voice note (`POST /voice-uploads` plus
+  `PATCH` chunks), poll `GET /voice-uploads/{id}` until it is processed, then
+  apply with `POST /contracts` carrying its `audio_url`
+- growers: list a job's pending applicants and accept a crew's worth of them
+  concurrently with `PATCH /applications/{id}` (each generates a contract PDF)
+
+Sessions start on schedule whether or not earlier ones have finished (an open
+loop), so a slow server shows up as latency rather than as reduced load. The
+report gives throughput, error rate and latency percentiles per endpoint.
+
+Worker ids come from the load generator, so seed the target first with the
+same `--seed`, `--growers` and `--workers`, e.g.:
+    python -m loadgen --target postgres --growers 20 --workers 2000
+    uvicorn main:app --port 8000 --workers 4
+    python -m loadtest --base-url http://127.0.0.1:8000 --duration 120 --worker-rate 20
+"""
+import argparse
+import asyncio
+import base64
+import io
+import json
+import random
+import time
+import wave
+from collections import defaultdict
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+DEFAULTS: Dict[str, Any] = {
+    'duration': 60.0,  # seconds of traffic to generate
+    'worker_rate': 10.0,  # worker sessions started per second
+    'grower_rate': 0.5,  # grower sessions started per second
+    'apply_prob': 0.3,  # share of worker sessions that apply
+    'voice_seconds': 16.0,  # length of each application's voice note
+    'voice_wait': 30.0,  # seconds to wait for a voice note to be processed
+    'max_accepts': 10,  # most applicants a grower accepts in one session
+    'max_sessions': 500,  # sessions in flight before new arrivals are dropped
+    'timeout': 30.0,
+}
+
+PERCENTILES = (50, 90, 95, 99)
+
+# Phone-call quality PCM; small, and every server-side decoder reads it
+VOICE_SAMPLE_RATE = 8000
+VOICE_POLL_SECONDS = 0.5
+
+
+class Stats:
+    """Latency samples and outcomes per endpoint."""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self.started = 0
+        self.dropped = 0
+        # Voice notes by outcome: 'linked', 'failed', 'timeout'
+        self.voice_notes: Dict[str, int] = defaultdict(int)
+
+    def record(self, endpoint: str, status: str, seconds: float) -> None:
+        self.latencies[endpoint].append(seconds * 1000)
+        self.statuses[endpoint][status] += 1
+
+    def report(self, elapsed: float) -> List[Dict[str, Any]]:
+        """One row per endpoint (plus a total) with req/s, error rate and percentiles."""
+        rows = []
+        everything: List[float] = []
+        total_errors = 0
+        for endpoint in sorted(self.latencies):
+            samples = np.array(self.latencies[endpoint])
+            everything.extend(samples)
+            errors = sum(count for status, count in self.statuses[endpoint].items() if not status.startswith('2'))
+            total_errors += errors
+            rows.append(_summary_row(endpoint, samples, errors, elapsed, dict(self.statuses[endpoint])))
+        if everything:
+            rows.append(_summary_row('total', np.array(everything), total_errors, elapsed, {}))
+        return rows
+
+
+def _summary_row(endpoint: str, samples: np.ndarray, errors: int, elapsed: float, statuses: Dict[str, int]) -> Dict[str, Any]:
+    row = {
+        'endpoint': endpoint,
+        'requests': len(samples),
+        'rps': len(samples) / elapsed if elapsed else 0.0,
+        'error_rate': errors / len(samples),
+        'max_ms': float(samples.max()),
+        'statuses': statuses,
+    }
+    for p, value in zip(PERCENTILES, np.percentile(samples, PERCENTILES)):
+        row[f'p{p}_ms'] = float(value)
+    return row
+
+
+def arrival_stream(rng: np.random.Generator, rate_per_second: float, duration: float) -> Dict[str, np.ndarray]:
+    """
+    Poisson arrivals within `duration`, drawn from the job-arrival model.
+
+    Returns:
+        Dictionary with `offsets` (seconds from the start) and the model's
+        `workers_requested` for each arrival
+    """
+    from data_generator import sample_job_arrays
+
+    if rate_per_second <= 0:
+        return {'offsets': np.empty(0), 'workers_requested': np.empty(0, dtype=int)}
+    expected = rate_per_second * duration
+    draws = int(expected + 6 * np.sqrt(expected) + 10)
+    # The model works in minutes; scale so the mean gap is 1 / rate seconds
+    arrays = sample_job_arrays(rng, 1, draws, arrival_rate_minutes=1 / (rate_per_second * 60))
+    seconds = arrays['arrival_time_poisson'][0] * 60
+    keep = seconds < duration
+    return {'offsets': seconds[keep], 'workers_requested': arrays['workers_requested'][0][keep]}
+
+
+def voice_sample(seconds: float, seed: int = 0) -> bytes:
+    """A mono 16-bit WAV of `seconds` length: a wavering tone with noise, standing in for speech."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * VOICE_SAMPLE_RATE)) / VOICE_SAMPLE_RATE
+    pitch = 160 + 40 * np.sin(2 * np.pi * 0.5 * t)
+    signal = 0.4 * np.sin(2 * np.pi * np.cumsum(pitch) / VOICE_SAMPLE_RATE) + 0.05 * rng.standard_normal(len(t))
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(VOICE_SAMPLE_RATE)
+        wav.writeframes((np.clip(signal, -1, 1) * 32767).astype('<i2').tobytes())
+    return buffer.getvalue()
+
+
+def worker_token(worker_id: str) -> str:
+    """
+    Bearer token naming the worker, like the app's Supabase session token.
+    The API reads `sub` without checking the signature, and rate limits
+    per token user (requests without one share a per-address bucket).
+    """
+    def segment(data: bytes) -> str:
+        return base64.urlsafe_b64encode(data).rstrip(b'=').decode()
+
+    header = segment(json.dumps({'alg': 'HS256', 'typ': 'JWT'}).encode())
+    payload = segment(json.dumps({'sub': worker_id, 'role': 'authenticated'}).encode())
+    return f"Bearer {header}.{payload}.{segment(b'loadtest')}"
+
+
+class LoadTest:
+    """Schedules sessions against one base URL and collects their request timings."""
+
+    def __init__(self, client, settings: Dict[str, Any], worker_ids: List[str], rng: random.Random):
+        self.client = client
+        self.settings = settings
+        self.worker_ids = worker_ids
+        self.rng = rng
+        self.stats = Stats()
+        self.job_ids: List[int] = []
+        self._in_flight = 0
+        self.voice_note = voice_sample(settings['voice_seconds']) if settings.get('voice_seconds') else b''
+
+    async def request(self, endpoint: str, method: str, url: str, **kwargs):
+        """Send one request, recording its latency and status (or exception name) under `endpoint`."""
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except Exception as e:
+            self.stats.record(endpoint, type(e).__name__, time.perf_counter() - start)
+            return None
+        self.stats.record(endpoint, str(response.status_code), time.perf_counter() - start)
+        return response
+
+    async def load_jobs(self) -> None:
+        """Job ids to target (also warms up connections before the clock starts)."""
+        response = await self.client.get('/jobs', params={'status': 'open', 'limit': 200})
+        response.raise_for_status()
+        self.job_ids = [job['id'] for job in response.json()]
+
+    async def browse(self) -> Optional[int]:
+        params = {'status': 'open', 'limit': 50}
+        if self.rng.random() < 0.5:
+            params['crop_type'] = self.rng.choice(['Tomato', 'Strawberry'])
+        response = await self.request('GET /jobs', 'GET', '/jobs', params=params)
+        listed = [job['id'] for job in response.json()] if response is not None and response.status_code == 200 else []
+        job_id = self.rng.choice(listed or self.job_ids) if (listed or self.job_ids) else None
+        if job_id is not None:
+            await self.request('GET /jobs/{job_id}', 'GET', f'/jobs/{job_id}')
+        return job_id
+
+    async def upload_voice_note(self, worker_id: str) -> Optional[str]:
+        """Upload the voice note in chunks and wait for processing; returns its audio_url."""
+        audio = self.voice_note
+        response = await self.request(
+            'POST /voice-uploads', 'POST', '/voice-uploads',
+            json={'total_size': len(audio), 'content_type': 'audio/wav', 'worker_id': worker_id},
+            headers={'Authorization': worker_token(worker_id)},
+        )
+        if response is None or response.status_code != 200:
+            return None
+        upload = response.json()
+        url = f"/voice-uploads/{upload['upload_id']}"
+        chunk_size = upload.get('chunk_size') or len(audio)
+        for offset in range(0, len(audio), chunk_size):
+            chunk = await self.request(
+                'PATCH /voice-uploads/{upload_id}', 'PATCH', url,
+                content=audio[offset:offset + chunk_size],
+                headers={'Upload-Offset': str(offset), 'Content-Type': 'application/offset+octet-stream'},
+            )
+            if chunk is None or chunk.status_code != 200:
+                return None
+        deadline = time.perf_counter() + self.settings['voice_wait']
+        while time.perf_counter() < deadline:
+            await asyncio.sleep(VOICE_POLL_SECONDS)
+            status = await self.request('GET /voice-uploads/{upload_id}', 'GET', url)
+            if status is None or status.status_code != 200:
+                return None
+            session = status.json()
+            if session['status'] == 'complete':
+                self.stats.voice_notes['linked'] += 1
+                return session['audio_url']
+            if session['status'] == 'failed':
+                self.stats.voice_notes['failed'] += 1
+                return None
+        self.stats.voice_notes['timeout'] += 1
+        return None
+
+    async def worker_session(self, worker_id: str, apply: bool) -> None:
+        job_id = await self.browse()
+        if not apply or job_id is None:
+            return
+        contract = {'job_id': job_id, 'worker_id': worker_id, 'notes': 'load test'}
+        if self.voice_note:
+            # Apply even if the voice note didn't make it, as the app does
+            audio_url = await self.upload_voice_note(worker_id)
+            if audio_url:
+                contract['audio_url'] = audio_url
+        await self.request(
+            'POST /contracts', 'POST', '/contracts',
+            json=contract,
+            headers={'Idempotency-Key': f"loadtest-{worker_id}-{job_id}", 'Authorization': worker_token(worker_id)},
+        )
+
+    async def grower_session(self, accepts: int) -> None:
+        if not self.job_ids:
+            return
+        job_id = self.rng.choice(self.job_ids)
+        response = await self.request(
+            'GET /jobs/{job_id}/applications', 'GET', f'/jobs/{job_id}/applications',
+            params={'status': 'pending', 'limit': accepts},
+        )
+        if response is None or response.status_code != 200:
+            return
+        # Bulk accept: the grower ticks a crew's worth of applicants at once
+        await asyncio.gather(*(
+            self.request(
+                'PATCH /applications/{application_id}', 'PATCH', f"/applications/{application['id']}",
+                json={'status': 'accepted'},
+            )
+            for application in response.json()
+        ))
+
+    async def _run_session(self, session) -> None:
+        self._in_flight += 1
+        try:
+            await session
+        finally:
+            self._in_flight -= 1
+
+    async def run(self, seed: int) -> float:
+        """Start every scheduled session and wait for them; returns elapsed seconds."""
+        settings = self.settings
+        rng = np.random.default_rng(seed)
+        schedule = []
+        for offset in arrival_stream(rng, settings['worker_rate'], settings['duration'])['offsets']:
+            schedule.append((float(offset), 'worker'))
+        growers = arrival_stream(rng, settings['grower_rate'], settings['duration'])
+        # Each grower accepts up to their job's crew size, capped at max_accepts
+        for offset, crew in zip(growers['offsets'], growers['workers_requested']):
+            schedule.append((float(offset), int(min(crew, settings['max_accepts']))))
+        schedule.sort(key=lambda item: item[0])
+
+        tasks = []
+        start = time.perf_counter()
+        for offset, kind in schedule:
+            delay = offset - (time.perf_counter() - start)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if self._in_flight >= settings['max_sessions']:
+                self.stats.dropped += 1
+                continue
+            if kind == 'worker':
+                session = self.worker_session(self.rng.choice(self.worker_ids), self.rng.random() < settings['apply_prob'])
+            else:
+                session = self.grower_session(kind)
+            self.stats.started += 1
+            tasks.append(asyncio.create_task(self._run_session(session)))
+        await asyncio.gather(*tasks)
+        return time.perf_counter() - start
+
+
+async def run(base_url: str, settings: Dict[str, Any], worker_ids: List[str], seed: int = 42) -> Dict[str, Any]:
+    """
+    Replay the traffic mix against `base_url`.
+
+    Args:
+        base_url: Root URL of the API
+        settings: DEFAULTS overrides
+        worker_ids: Worker UUIDs that exist in the target database
+        seed: Seed for arrivals and choices
+
+    Returns:
+        Dictionary with elapsed seconds, sessions started/dropped, voice note
+        outcomes and per-endpoint rows
+    """
+    import httpx
+
+    settings = {**DEFAULTS, **settings}
+    limits = httpx.Limits(max_connections=settings['max_sessions'], max_keepalive_connections=settings['max_sessions'])
+    async with httpx.AsyncClient(base_url=base_url, timeout=settings['timeout'], limits=limits) as client:
+        test = LoadTest(client, settings, worker_ids, random.Random(seed))
+        await test.load_jobs()
+        elapsed = await test.run(seed)
+    return {
+        'elapsed': elapsed,
+        'sessions': test.stats.started,
+        'dropped': test.stats.dropped,
+        'voice_notes': dict(test.stats.voice_notes),
+        'endpoints': test.stats.report(elapsed),
+    }
+
+
+def main():
+    import loadgen
+
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+    parser.add_argument('--duration', type=float, default=DEFAULTS['duration'], help='Seconds of traffic')
+    parser.add_argument('--worker-rate', type=float, default=DEFAULTS['worker_rate'], help='Worker sessions per second')
+    parser.add_argument('--grower-rate', type=float, default=DEFAULTS['grower_rate'], help='Grower sessions per second')
+    parser.add_argument('--apply-prob', type=float, default=DEFAULTS['apply_prob'], help='Share of worker sessions that apply')
+    parser.add_argument('--voice-seconds', type=float, default=DEFAULTS['voice_seconds'], help='Voice note length per application (0 applies without one)')
+    parser.add_argument('--voice-wait', type=float, default=DEFAULTS['voice_wait'], help='Seconds to wait for a voice note to be processed')
+    parser.add_argument('--max-accepts', type=int, default=DEFAULTS['max_accepts'], help='Most applicants accepted per grower session')
+    parser.add_argument('--max-sessions', type=int, default=DEFAULTS['max_sessions'], help='Concurrent sessions before arrivals are dropped')
+    parser.add_argument('--timeout', type=float, default=DEFAULTS['timeout'], help='Per-request timeout in seconds')
+    parser.add_argument('--seed', type=int, default=loadgen.DEFAULTS['seed'], help='Same as the loadgen run that seeded the target')
+    parser.add_argument('--growers', type=int, default=loadgen.DEFAULTS['growers'], help='Same as the loadgen run that seeded the target')
+    parser.add_argument('--workers', type=int, default=loadgen.DEFAULTS['workers'], help='Same as the loadgen run that seeded the target')
+    args = parser.parse_args()
+
+    people = loadgen.make_people({**loadgen.DEFAULTS, 'seed': args.seed, 'growers': args.growers,
+                                  'workers': args.workers, 'season_start': date.today()})
+    worker_ids = [worker['user_id'] for worker in people['workers']]
+    settings = {
+        'duration': args.duration,
+        'worker_rate': args.worker_rate,
+        'grower_rate': args.grower_rate,
+        'apply_prob': args.apply_prob,
+        'voice_seconds': args.voice_seconds,
+        'voice_wait': args.voice_wait,
+        'max_accepts': args.max_accepts,
+        'max_sessions': args.max_sessions,
+        'timeout': args.timeout,
+    }
+    result = asyncio.run(run(args.base_url, settings, worker_ids, seed=args.seed))
+
+    print(f"{result['sessions']} sessions in {result['elapsed']:.1f}s against {args.base_url}"
+          f" ({result['dropped']} dropped at --max-sessions)")
+    if result['voice_notes']:
+        print("Voice notes: " + ', '.join(f"{outcome} {count}" for outcome, count in sorted(result['voice_notes'].items())))
+    header = f"{'endpoint':<36}{'reqs':>7}{'req/s':>8}{'err %':>7}"
+    header += ''.join(f"{f'p{p} ms':>9}" for p in PERCENTILES) + f"{'max ms':>9}"
+    print(header)
+    for row in result['endpoints']:
+        line = f"{row['endpoint']:<36}{row['requests']:>7}{row['rps']:>8.1f}{row['error_rate']:>7.1%}"
+        line += ''.join(f"{row[f'p{p}_ms']:>9.1f}" for p in PERCENTILES) + f"{row['max_ms']:>9.1f}"
+        print(line)
+    failures = {
+        row['endpoint']: {status: count for status, count in row['statuses'].items() if not status.startswith('2')}
+        for row in result['endpoints']
+    }
+    for endpoint, statuses in failures.items():
+        if statuses:
+            print(f"  {endpoint}: " + ', '.join(f"{status} x{count}" for status, count in sorted(statuses.items())))
+
+
+if __name__ == "__main__":
+    main()
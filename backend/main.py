@@ -1,20 +1,142 @@
 from fastapi import FastAPI, HTTPException, Depends, Request, Response, Header
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
-from datetime import datetime, timedelta
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.exception_handlers import http_exception_handler
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from datetime import date, datetime, timedelta
 from typing import List, Optional
+import csv
+import io
+import json
+import math
+import uuid
+import os
+import sys
+import threading
 try:
     import jwt
 except ImportError:
     # Fallback if PyJWT not installed
     jwt = None
 
-from models import Job, JobCreate, JobResponse, Contract, ContractCreate, ContractUpdate, StatsResponse, ApplicationResponse, ApplicationStatusUpdate
-from db import supabase
-from data_generator import insert_jobs_to_supabase
-from contract_pdf import generate_contract_pdf
+from models import Job, JobCreate, JobResponse, Contract, ContractCreate, ContractUpdate, StatsResponse, ApplicationResponse, ApplicationStatusUpdate, JobSearchResponse, VoiceUploadCreate, VoiceUploadStatus, SimulationRequest, SimulationResponse, ForecastSummary, WorkerEarnings, WorkerHome, GrowerDashboard, SyncPush
+from db import supabase, get_client, close_client, pool_metrics
+from db_transport import CircuitOpenError, call_timeout
+from search import INDEX_TOPIC, apply_job_changes, index_jobs, job_index, publish_job_changes, reset_index
+from search import ensure_loaded as ensure_search_index, location_from_description as _location_from_description
+from events import broker, event_stream, TOPICS as EVENT_TOPICS
+import voice_uploads
+import forecasts
+import pg
+import sync
+import lifecycle
+from idempotency import IdempotencyError, fingerprint, idempotency_store, submission_limiter
+from cache import bus as cache_bus
+from formats import NegotiatedResponse, ResponseFormatMiddleware
+from profiler import PROFILER_CONTINUOUS, ProfileMiddleware, continuous_profiler
+from query_log import registry as query_registry
+from job_parsing import MAX_QUANTITY_UNITS, MAX_WORKERS_REQUESTED, infer_crop, parse_pay, prepare_jobs
 
-app = FastAPI(title="Mexico Labor Project API", version="1.0.0")
+# Heavy modules (pandas/numpy in data_generator, reportlab in contract_pdf) are
+# imported where they are first used so cold starts only pay for what a request
+# needs. Set WARM_START=1 to import them in the background once the app is up.
+WARM_START = os.getenv("WARM_START", "").strip().lower() in ("1", "true", "yes")
+
+# Days worked in a season for a worker to qualify for benefits enrollment
+BENEFITS_MIN_DAYS_WORKED = int(os.getenv("BENEFITS_MIN_DAYS_WORKED", "30"))
+
+# Closed jobs (by start date) and deleted jobs (by deletion date) older than
+# this are moved to the archive tables by POST /jobs/archive
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "30"))
+
+# Rows accepted per POST /jobs/bulk call, and rows per insert request
+BULK_JOBS_MAX_ROWS = int(os.getenv("BULK_JOBS_MAX_ROWS", "5000"))
+BULK_INSERT_CHUNK_SIZE = int(os.getenv("BULK_INSERT_CHUNK_SIZE", "500"))
+
+# Jobs drawn per POST /simulations (replications x num_jobs); each costs ~50 bytes across the sampled arrays
+SIMULATION_MAX_JOBS = int(os.getenv("SIMULATION_MAX_JOBS", "1000000"))
+
+# Per-process response caches, cleared in every worker process on writes
+jobs_cache = cache_bus.cache('jobs')
+stats_cache = cache_bus.cache('stats')
+grower_dashboard_cache = cache_bus.cache('grower_dashboards')
+# Search index updates from other processes re-read the changed jobs off the event loop
+_index_updates = ThreadPoolExecutor(max_workers=1, thread_name_prefix="search-index")
+
+
+def _invalidate_job_views() -> None:
+    """Drop cached job lists and dashboards here and in sibling workers."""
+    cache_bus.invalidate('jobs', 'stats', 'grower_dashboards')
+
+
+def _on_remote_job_changes(data) -> None:
+    """Another process created, changed or deleted jobs; update this process's search index."""
+    if data.get('reload'):
+        reset_index()
+        return
+    _index_updates.submit(apply_job_changes, get_client(), data.get('upserted', []), data.get('removed', []))
+
+
+cache_bus.subscribe(INDEX_TOPIC, _on_remote_job_changes)
+# /stream clients connected to other workers get this process's events, and vice versa
+broker.attach(cache_bus)
+
+
+def _on_lifecycle_sweep(result) -> None:
+    """Drop views of jobs the lifecycle sweep closed or whose contracts it completed."""
+    _invalidate_job_views()
+    if result['jobs_closed']:
+        # Refresh the closed jobs' search entries here and in sibling workers
+        _index_updates.submit(apply_job_changes, get_client(), result['job_ids'])
+        publish_job_changes(cache_bus, upserted=result['job_ids'])
+        broker.publish('job.expired', {'count': result['jobs_closed'], 'job_ids': result['job_ids']})
+
+
+def _warm_heavy_modules():
+    import data_generator  # noqa: F401
+    import contract_pdf
+    contract_pdf._get_styles()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Create (and validate) the Supabase client before serving requests
+    get_client()
+    await pg.init_pool()
+    await cache_bus.start()
+    if PROFILER_CONTINUOUS:
+        continuous_profiler.start()
+    if WARM_START:
+        threading.Thread(target=_warm_heavy_modules, name="warm-start", daemon=True).start()
+    # Closes past jobs and completes finished contracts (one replica at a time)
+    lifecycle.scheduler.start(get_client(), on_change=_on_lifecycle_sweep)
+    # Build the search index in the background so the first search doesn't wait for it
+    ensure_search_index(get_client())
+    # Resume uploads interrupted mid-processing and expire abandoned ones
+    await voice_uploads.start()
+    yield
+    await voice_uploads.stop()
+    await lifecycle.scheduler.stop()
+    if 'simulation' in sys.modules:
+        sys.modules['simulation'].shutdown_pool()
+    await cache_bus.stop()
+    continuous_profiler.stop()
+    await pg.close_pool()
+    close_client()
+
+
+app = FastAPI(
+    title="Mexico Labor Project API",
+    version="1.0.0",
+    lifespan=lifespan,
+    # Serves JSON, MessagePack or columnar layouts depending on the Accept header
+    default_response_class=NegotiatedResponse,
+)
+app.add_middleware(ResponseFormatMiddleware)
+# Admin-only `?profile=1` sampling; a no-op unless PROFILER_TOKEN is set
+app.add_middleware(ProfileMiddleware)
 
 # CORS middleware to allow frontend requests
 app.add_middleware(
@@ -26,6 +148,27 @@ app.add_middleware(
 )
 
 
+def _service_unavailable(error: CircuitOpenError) -> JSONResponse:
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Database temporarily unavailable, please retry"},
+        headers={"Retry-After": str(int(error.retry_after) or 1)},
+    )
+
+
+@app.exception_handler(CircuitOpenError)
+async def circuit_open_handler(request: Request, exc: CircuitOpenError):
+    return _service_unavailable(exc)
+
+
+@app.exception_handler(HTTPException)
+async def database_error_handler(request: Request, exc: HTTPException):
+    # Endpoints wrap unexpected errors in a 500; report an open circuit as a 503 instead
+    if exc.status_code >= 500 and isinstance(exc.__context__, CircuitOpenError):
+        return _service_unavailable(exc.__context__)
+    return await http_exception_handler(request, exc)
+
+
 @app.get("/")
 async def root():
     return {
@@ -33,8 +176,11 @@ async def root():
         "version": "1.0.0",
         "endpoints": {
             "jobs": "/jobs",
+            "job_search": "/jobs/search",
             "contracts": "/contracts",
             "stats": "/stats",
+            "export": "/export/{table}.parquet",
+            "stream": "/stream",
             "health": "/health"
         }
     }
@@ -60,20 +206,53 @@ async def health():
         }
 
 
+@app.get("/metrics/db")
+async def database_metrics():
+    """Connection pool saturation, request latency and circuit breaker state for Supabase calls."""
+    return pool_metrics()
+
+
+@app.get("/metrics/cache")
+async def cache_metrics():
+    """Hit rates of this process's response caches and invalidation bus traffic."""
+    return cache_bus.snapshot()
+
+
+@app.get("/metrics/queries")
+async def query_metrics(limit: int = 50, plans: bool = False):
+    """
+    Query shapes (PostgREST and direct Postgres) by total time spent, with latency
+    percentiles, slow-call counts and plan findings, plus the most recent slow calls.
+    `plans=true` includes the captured EXPLAIN ANALYZE plans.
+    """
+    return query_registry.snapshot(limit=limit, include_plans=plans)
+
+
 @app.get("/jobs", response_model=List[JobResponse])
 async def get_jobs(
     crop_type: Optional[str] = None,
     status: Optional[str] = None,
-    limit: Optional[int] = None
+    limit: Optional[int] = None,
+    has_openings: Optional[bool] = None
 ):
     """
     Get all available jobs, optionally filtered by crop type or status.
+    `has_openings=true` keeps only open jobs with fewer accepted workers than requested.
     """
-    query = supabase.table("jobs").select("*")
+    cache_key = (crop_type, status, limit, has_openings)
+    cached = jobs_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    generation = jobs_cache.generation
+    
+    query = supabase.table("jobs").select("*").is_("deleted_at", "null")
     
     if crop_type:
         query = query.eq("crop_type", crop_type)
     
+    if has_openings is not None:
+        query = query.eq("has_openings", has_openings)
+    
     if status:
         query = query.eq("status", status)
     else:
@@ -98,7 +277,7 @@ async def get_jobs(
             'id': job['id'],
             'title': job['title'],
             'pay': pay_str,
-            'location': job.get('description', '').split('Farm')[1].split('.')[0].strip() if 'Farm' in job.get('description', '') else 'San Quintín',
+            'location': _location_from_description(job.get('description')),
             'date': job['start_date'],
             'description': job.get('description', ''),
             'crop_type': job['crop_type'],
@@ -107,15 +286,83 @@ async def get_jobs(
             'pay_rate_mxn': float(job['pay_rate_mxn']),
             'service_time_mins': float(job['service_time_mins']) if job.get('service_time_mins') else None,
             'arrival_time_poisson': float(job['arrival_time_poisson']) if job.get('arrival_time_poisson') else None,
+            'applications_count': job.get('applications_count'),
+            'accepted_count': job.get('accepted_count'),
+            'has_openings': job.get('has_openings'),
         })
     
+    jobs_cache.set(cache_key, jobs, generation)
     return jobs
 
 
+@app.get("/jobs/search", response_model=JobSearchResponse)
+async def search_jobs(
+    q: Optional[str] = None,
+    crop_type: Optional[str] = None,
+    farm: Optional[str] = None,
+    pay_bucket: Optional[str] = None,
+    status: Optional[str] = "open",
+    limit: int = 20,
+    offset: int = 0
+):
+    """
+    Full-text search over job titles, descriptions, crops and farm names.
+    Returns the requested page plus facet counts by crop, farm and pay bucket
+    for the whole match set. Served from the in-process index; while that is
+    being built (after startup or a reload) this returns 503 with Retry-After.
+    """
+    if limit < 1 or limit > 100:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 100")
+    if offset < 0:
+        raise HTTPException(status_code=400, detail="offset must be >= 0")
+    
+    if not ensure_search_index(supabase):
+        # The index is being built in the background (first search after startup or a reload)
+        raise HTTPException(status_code=503, detail="Search index is loading, please retry", headers={"Retry-After": "5"})
+    result = job_index.search(
+        query=q,
+        filters={
+            'crop_type': crop_type,
+            'farm': farm,
+            'pay_bucket': pay_bucket,
+            'status': status,
+        },
+        limit=limit,
+        offset=offset,
+    )
+    
+    return {
+        'total': result['total'],
+        'jobs': [_job_to_response(job, location=job['farm_name']) for job in result['jobs']],
+        'facets': result['facets'],
+    }
+
+
+def _job_to_response(job: dict, location: str = 'San Quintín') -> dict:
+    """Format a jobs row as a JobResponse dict."""
+    return {
+        'id': job['id'],
+        'title': job['title'],
+        'pay': f"${float(job['pay_rate_mxn']):.2f} MXN/{job['unit_type'].lower()}",
+        'location': location,
+        'date': job['start_date'],
+        'description': job.get('description', ''),
+        'crop_type': job['crop_type'],
+        'quantity': job['quantity_units'],
+        'workers_requested': job['workers_requested'],
+        'pay_rate_mxn': float(job['pay_rate_mxn']),
+        'service_time_mins': float(job['service_time_mins']) if job.get('service_time_mins') else None,
+        'arrival_time_poisson': float(job['arrival_time_poisson']) if job.get('arrival_time_poisson') else None,
+        'applications_count': job.get('applications_count'),
+        'accepted_count': job.get('accepted_count'),
+        'has_openings': job.get('has_openings'),
+    }
+
+
 @app.get("/jobs/{job_id}", response_model=JobResponse)
 async def get_job(job_id: int):
     """Get a specific job by ID."""
-    response = supabase.table("jobs").select("*").eq("id", job_id).execute()
+    response = supabase.table("jobs").select("*").eq("id", job_id).is_("deleted_at", "null").execute()
     
     if not response.data:
         raise HTTPException(status_code=404, detail="Job not found")
@@ -136,37 +383,60 @@ async def get_job(job_id: int):
         'pay_rate_mxn': float(job['pay_rate_mxn']),
         'service_time_mins': float(job['service_time_mins']) if job.get('service_time_mins') else None,
         'arrival_time_poisson': float(job['arrival_time_poisson']) if job.get('arrival_time_poisson') else None,
+        'applications_count': job.get('applications_count'),
+        'accepted_count': job.get('accepted_count'),
+        'has_openings': job.get('has_openings'),
     }
 
 
 @app.post("/jobs", response_model=JobResponse)
 async def create_job(job: JobCreate):
-    """Create a new job posting."""
-    # Parse job data
+    """
+    Create a new job posting.
+    The pay string ("$12/hr", "$18.50 MXN per bucket") is parsed into the pay
+    rate and unit; unreadable pay is rejected with a 422, as are `quantity`
+    and `workers_requested` outside the bounds bulk uploads use.
+    """
+    try:
+        pay_rate, unit_type = parse_pay(job.pay)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    quantity = 0 if job.quantity is None else job.quantity
+    workers_requested = 1 if job.workers_requested is None else job.workers_requested
+    if not 0 <= quantity <= MAX_QUANTITY_UNITS:
+        raise HTTPException(status_code=422, detail=f"quantity must be a whole number from 0 to {MAX_QUANTITY_UNITS}")
+    if not 1 <= workers_requested <= MAX_WORKERS_REQUESTED:
+        raise HTTPException(status_code=422, detail=f"workers_requested must be a whole number from 1 to {MAX_WORKERS_REQUESTED}")
+    
     job_data = {
         'title': job.title,
-        'crop_type': 'Other',  # Default, can be extracted from title
-        'pay_rate_mxn': 0.0,  # Parse from pay string if needed
-        'quantity_units': 0,
-        'unit_type': 'unit',
-        'workers_requested': 1,
+        'crop_type': infer_crop(job.title, job.description or ''),
+        'pay_rate_mxn': pay_rate,
+        'quantity_units': quantity,
+        'unit_type': unit_type,
+        'workers_requested': workers_requested,
         'start_date': job.date,
         'description': job.description or '',
         'status': 'open',
     }
     
-    # Try to extract crop type from title
-    if 'tomato' in job.title.lower():
-        job_data['crop_type'] = 'Tomato'
-    elif 'strawberry' in job.title.lower():
-        job_data['crop_type'] = 'Strawberry'
-    
     response = supabase.table("jobs").insert(job_data).execute()
     
     if not response.data:
         raise HTTPException(status_code=500, detail="Failed to create job")
     
     new_job = response.data[0]
+    index_jobs([new_job])
+    publish_job_changes(cache_bus, upserted=[new_job['id']])
+    _invalidate_job_views()
+    
+    broker.publish('job.created', {
+        'job_id': new_job['id'],
+        'title': new_job['title'],
+        'crop_type': new_job['crop_type'],
+        'date': new_job['start_date'],
+    })
+    
     return {
         'id': new_job['id'],
         'title': new_job['title'],
@@ -180,17 +450,105 @@ async def create_job(job: JobCreate):
         'pay_rate_mxn': float(new_job['pay_rate_mxn']),
         'service_time_mins': None,
         'arrival_time_poisson': None,
+        'applications_count': new_job.get('applications_count'),
+        'accepted_count': new_job.get('accepted_count'),
+        'has_openings': new_job.get('has_openings'),
     }
 
 
+@app.post("/jobs/bulk")
+async def create_jobs_bulk(
+    request: Request,
+    grower_id: Optional[str] = None,
+    dry_run: bool = False,
+    all_or_nothing: bool = False
+):
+    """
+    Create many job postings from a CSV upload (`Content-Type: text/csv`) or a
+    JSON array of rows. Columns are those of `POST /jobs` plus optional
+    `quantity`, `workers_requested`, `crop_type`, `unit_type`, `pay_rate_mxn`
+    and `grower_id` (`grower_id` query param for the whole upload).
+    Rows are validated together and valid ones inserted in chunks; invalid rows
+    are reported by index (0-based, header excluded) without stopping the rest.
+    With `all_or_nothing=true` any invalid row stops the upload, and the rows
+    go in as one insert statement, so a database error creates none of them.
+    `dry_run=true` only validates.
+    """
+    body = await request.body()
+    content_type = request.headers.get('content-type', '').split(';')[0].strip().lower()
+    try:
+        if content_type in ('text/csv', 'application/csv'):
+            rows = list(csv.DictReader(io.StringIO(body.decode('utf-8-sig'))))
+        else:
+            rows = json.loads(body or b'[]')
+            if isinstance(rows, dict):
+                rows = rows.get('jobs')
+            if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+                raise ValueError("expected a JSON array of job objects")
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=f"Could not read upload: {str(e)}")
+    if not rows:
+        raise HTTPException(status_code=400, detail="No job rows in upload")
+    if len(rows) > BULK_JOBS_MAX_ROWS:
+        raise HTTPException(status_code=413, detail=f"At most {BULK_JOBS_MAX_ROWS} jobs per upload")
+    
+    valid, errors = prepare_jobs(rows, grower_id=grower_id)
+    result = {'received': len(rows), 'valid': len(valid), 'created': 0, 'job_ids': [], 'errors': errors}
+    if dry_run or not valid or (all_or_nothing and errors):
+        return result
+    
+    created = []
+    # One request is one statement (and one transaction) in PostgREST
+    chunk_size = len(valid) if all_or_nothing else BULK_INSERT_CHUNK_SIZE
+    with call_timeout(60):
+        for start in range(0, len(valid), chunk_size):
+            chunk = valid[start:start + chunk_size]
+            try:
+                created.extend(supabase.table("jobs").insert([job for _, job in chunk]).execute().data or [])
+            except CircuitOpenError:
+                if not created:
+                    raise
+                errors.extend({'row': index, 'errors': ["Database unavailable"]} for index, _ in valid[start:])
+                break
+            except Exception as e:
+                # One bad row (e.g. an unknown grower_id) fails its whole chunk
+                errors.extend({'row': index, 'errors': [f"Database error: {str(e)}"]} for index, _ in chunk)
+    errors.sort(key=lambda error: error['row'])
+    
+    if created:
+        index_jobs(created)
+        publish_job_changes(cache_bus, upserted=[new_job['id'] for new_job in created])
+        _invalidate_job_views()
+        # One event for the batch rather than thousands of job.created events
+        broker.publish('job.bulk_created', {'count': len(created), 'job_ids': [new_job['id'] for new_job in created]})
+    result['created'] = len(created)
+    result['job_ids'] = [new_job['id'] for new_job in created]
+    return result
+
+
 @app.delete("/jobs/{job_id}")
 async def delete_job(job_id: int):
-    """Delete a job posting."""
-    response = supabase.table("jobs").delete().eq("id", job_id).execute()
+    """
+    Delete a job posting.
+    The job is marked cancelled rather than removed, so its applications and
+    contracts stay intact until the archiver moves them to the archive tables.
+    """
+    response = (
+        supabase.table("jobs")
+        .update({'status': 'cancelled', 'deleted_at': datetime.now().isoformat()})
+        .eq("id", job_id)
+        .is_("deleted_at", "null")
+        .execute()
+    )
     
     if not response.data:
         raise HTTPException(status_code=404, detail="Job not found")
     
+    index_jobs(removed=[job_id])
+    publish_job_changes(cache_bus, removed=[job_id])
+    _invalidate_job_views()
+    broker.publish('job.deleted', {'job_id': job_id})
+    
     return {"message": "Job deleted successfully"}
 
 
@@ -287,9 +645,17 @@ async def get_contract(contract_id: int):
     }
 
 
-@app.post("/contracts", response_model=Contract)
-async def create_contract(contract: ContractCreate):
-    """Create a new contract (job application)."""
+def _is_unique_violation(error: Exception) -> bool:
+    """True for a PostgREST error caused by a unique constraint (Postgres 23505)."""
+    return getattr(error, 'code', None) == '23505'
+
+
+def _create_contract_record(contract: ContractCreate) -> dict:
+    """
+    Create the application and pending contract for a submission.
+    A repeat submission for the same (job_id, worker_id) hits the unique
+    constraints and returns the existing contract instead of a duplicate.
+    """
     worker_id = contract.worker_id
     
     # If worker_id is provided and not the default UUID, ensure worker record exists
@@ -344,7 +710,13 @@ async def create_contract(contract: ContractCreate):
     if contract.notes:
         application_data['notes'] = contract.notes
     
-    app_response = supabase.table("applications").insert(application_data).execute()
+    try:
+        app_response = supabase.table("applications").insert(application_data).execute()
+    except Exception as e:
+        if not (worker_id and _is_unique_violation(e)):
+            raise
+        # Retried submission: the worker already applied to this job
+        app_response = supabase.table("applications").select("*").eq("job_id", contract.job_id).eq("worker_id", worker_id).execute()
     
     if not app_response.data:
         raise HTTPException(status_code=500, detail="Failed to create application")
@@ -370,13 +742,31 @@ async def create_contract(contract: ContractCreate):
     if worker_id:
         contract_data['worker_id'] = worker_id
     
-    contract_response = supabase.table("contracts").insert(contract_data).execute()
+    created = True
+    try:
+        contract_response = supabase.table("contracts").insert(contract_data).execute()
+    except Exception as e:
+        if not (worker_id and _is_unique_violation(e)):
+            raise
+        # Return the contract created by the original request
+        contract_response = supabase.table("contracts").select("*").eq("job_id", contract.job_id).eq("worker_id", worker_id).execute()
+        created = False
     
     if not contract_response.data:
         raise HTTPException(status_code=500, detail="Failed to create contract")
     
     new_contract = contract_response.data[0]
     
+    if created:
+        # The new application changes the job's applications_count
+        _invalidate_job_views()
+        broker.publish('application.created', {
+            'application_id': application['id'],
+            'contract_id': new_contract['id'],
+            'job_id': new_contract['job_id'],
+            'worker_id': new_contract.get('worker_id'),
+        })
+    
     return {
         'id': new_contract['id'],
         'job_id': new_contract['job_id'],
@@ -390,6 +780,198 @@ async def create_contract(contract: ContractCreate):
     }
 
 
+def _submitter_id(request: Request) -> str:
+    """
+    Rate-limit scope for a submission: the token's user, else the client address.
+    A worker_id in the body is never used on its own; anyone can send a fresh one.
+    """
+    token_worker_id = get_user_id_from_token(request.headers.get('authorization'))
+    if token_worker_id:
+        return token_worker_id
+    return f"ip:{request.client.host if request.client else 'anonymous'}"
+
+
+@app.post("/contracts", response_model=Contract)
+async def create_contract(
+    contract: ContractCreate,
+    request: Request,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None)
+):
+    """
+    Create a new contract (job application).
+    Send an `Idempotency-Key` header to make retries safe: a repeat with the
+    same key returns the original contract without touching the database.
+    Submissions are rate limited per worker (429 with Retry-After): the
+    token's user, or the client address for requests without a token.
+    """
+    client_id = _submitter_id(request)
+    key = None
+    if idempotency_key:
+        if len(idempotency_key) > 255:
+            raise HTTPException(status_code=400, detail="Idempotency-Key must be at most 255 characters")
+        # Keys are scoped to the submitter (and, behind one address, the worker)
+        key = f"{client_id}:{contract.worker_id or ''}:{idempotency_key}"
+        try:
+            stored = idempotency_store.reserve(key, fingerprint(contract.model_dump()))
+        except IdempotencyError as e:
+            raise HTTPException(status_code=e.status_code, detail=e.detail)
+        if stored is not None:
+            response.headers["Idempotent-Replayed"] = "true"
+            return stored
+    
+    allowed, retry_after = submission_limiter.acquire(client_id)
+    if not allowed:
+        if key:
+            idempotency_store.release(key)
+        raise HTTPException(
+            status_code=429,
+            detail="Too many applications, please wait before trying again",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+        )
+    
+    try:
+        result = _create_contract_record(contract)
+    except BaseException:
+        if key:
+            idempotency_store.release(key)
+        raise
+    
+    if key:
+        idempotency_store.complete(key, result)
+    return result
+
+
+def _sync_worker_id(worker_id: Optional[str], authorization: Optional[str]) -> Optional[str]:
+    """Resolve the syncing worker from the token or parameter (they must agree)."""
+    token_worker_id = get_user_id_from_token(authorization) if authorization else None
+    if token_worker_id and worker_id and token_worker_id != worker_id:
+        raise HTTPException(status_code=403, detail="You can only sync your own data")
+    worker_id = worker_id or token_worker_id
+    if worker_id:
+        try:
+            uuid.UUID(worker_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="worker_id must be a UUID")
+    return worker_id
+
+
+@app.get("/sync")
+async def get_sync(
+    since: Optional[str] = None,
+    worker_id: Optional[str] = None,
+    authorization: Optional[str] = Header(None)
+):
+    """
+    Changes since a previous sync, for devices that work offline.
+    Returns open jobs plus the caller's applications and contracts that were
+    created, updated or deleted after `since` (the `token` of the previous
+    response), as `upserted` rows and `deleted` ids per table. Without a
+    token, or with one older than the change log keeps, the full current
+    state is returned with `reset: true`. Call again while `has_more` is true.
+    """
+    worker_id = _sync_worker_id(worker_id, authorization)
+    
+    since_id = None
+    if since:
+        try:
+            since_id, issued_at = sync.decode_token(since)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid sync token")
+        if sync.token_expired(issued_at):
+            since_id = None
+    
+    try:
+        if since_id is None:
+            result = sync.snapshot(supabase, worker_id)
+        else:
+            result = sync.changes_since(supabase, since_id, worker_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    
+    result['jobs']['upserted'] = [
+        {**_job_to_response(job, location=_location_from_description(job.get('description'))), 'status': job['status']}
+        for job in result['jobs']['upserted']
+    ]
+    return result
+
+
+@app.post("/sync")
+async def push_sync(
+    push: SyncPush,
+    request: Request,
+    authorization: Optional[str] = Header(None)
+):
+    """
+    Submit applications queued while the device was offline.
+    Each item is applied like `POST /contracts`, keyed by its `client_id` so
+    sending the same queue again returns the original results, and takes a
+    token from the same per-worker limiter: once it runs out, the remaining
+    items get a 429 result with `retry_after` and can be sent again later.
+    Returns one result per item in order; a failed item doesn't stop the rest.
+    """
+    limiter_id = _submitter_id(request)
+    worker_id = _sync_worker_id(push.worker_id, authorization)
+    if not worker_id:
+        raise HTTPException(status_code=401, detail="Worker ID or authorization token required")
+    if len(push.applications) > sync.SYNC_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"At most {sync.SYNC_PAGE_SIZE} queued applications per request")
+    
+    results = []
+    for item in push.applications:
+        contract = ContractCreate(job_id=item.job_id, worker_id=worker_id, audio_url=item.audio_url, notes=item.notes)
+        key = f"{worker_id}:sync:{item.client_id}"
+        try:
+            stored = idempotency_store.reserve(key, fingerprint(contract.model_dump()))
+        except IdempotencyError as e:
+            results.append({'client_id': item.client_id, 'status': 'error', 'status_code': e.status_code, 'detail': e.detail})
+            continue
+        if stored is not None:
+            results.append({'client_id': item.client_id, 'status': 'ok', 'contract': stored})
+            continue
+        
+        allowed, retry_after = submission_limiter.acquire(limiter_id)
+        if not allowed:
+            idempotency_store.release(key)
+            results.append({
+                'client_id': item.client_id, 'status': 'error', 'status_code': 429,
+                'detail': "Too many applications, please wait before trying again",
+                'retry_after': max(1, math.ceil(retry_after)),
+            })
+            continue
+        
+        try:
+            record = _create_contract_record(contract)
+        except HTTPException as e:
+            idempotency_store.release(key)
+            results.append({'client_id': item.client_id, 'status': 'error', 'status_code': e.status_code, 'detail': e.detail})
+            continue
+        except CircuitOpenError:
+            # The database is unavailable; the device should retry the whole queue later
+            idempotency_store.release(key)
+            raise
+        except Exception as e:
+            idempotency_store.release(key)
+            results.append({'client_id': item.client_id, 'status': 'error', 'status_code': 500, 'detail': f"Database error: {str(e)}"})
+            continue
+        idempotency_store.complete(key, record)
+        results.append({'client_id': item.client_id, 'status': 'ok', 'contract': record})
+    
+    return {'results': results}
+
+
+@app.post("/sync/compact")
+async def compact_sync_log(retention_days: int = sync.CHANGE_LOG_RETENTION_DAYS):
+    """Drop change log entries older than `retention_days`; devices with older tokens get a full resync."""
+    if retention_days < 1:
+        raise HTTPException(status_code=400, detail="retention_days must be >= 1")
+    
+    try:
+        return {'changes_deleted': sync.compact_change_log(supabase, retention_days=retention_days)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error compacting change log: {str(e)}")
+
+
 @app.patch("/contracts/{contract_id}", response_model=Contract)
 async def update_contract(contract_id: int, update: ContractUpdate):
     """Update contract status (accept/reject)."""
@@ -437,6 +1019,7 @@ async def update_contract(contract_id: int, update: ContractUpdate):
                     pass
             
             # Generate PDF
+            from contract_pdf import generate_contract_pdf
             pdf_buffer = generate_contract_pdf(
                 contract_data=existing_contract,
                 job_data=job,
@@ -478,6 +1061,19 @@ async def update_contract(contract_id: int, update: ContractUpdate):
     
     contract = response.data[0]
     
+    broker.publish('contract.status_changed', {
+        'contract_id': contract['id'],
+        'job_id': contract['job_id'],
+        'worker_id': contract.get('worker_id'),
+        'status': contract['status'],
+    })
+    if update_data.get('contract_pdf_url'):
+        broker.publish('contract.pdf_ready', {
+            'contract_id': contract['id'],
+            'worker_id': contract.get('worker_id'),
+            'contract_pdf_url': update_data['contract_pdf_url'],
+        })
+    
     # Get job details
     job_response = supabase.table("jobs").select("*").eq("id", contract['job_id']).execute()
     job = job_response.data[0] if job_response.data else {}
@@ -529,6 +1125,165 @@ async def get_my_applications(
         return {"job_ids": [], "count": 0}
 
 
+@app.get("/workers/me/home", response_model=WorkerHome)
+async def get_worker_home(
+    worker_id: Optional[str] = None,
+    crop_type: Optional[str] = None,
+    limit: int = 20,
+    offset: int = 0,
+    authorization: Optional[str] = Header(None)
+):
+    """
+    Everything the worker's job list needs in one request: a page of open jobs,
+    newest first, each marked with whether the worker applied and the status of
+    their application and contract.
+    If worker_id is not provided, extracts it from the authorization token;
+    without either, jobs are returned unannotated.
+    """
+    token_worker_id = get_user_id_from_token(authorization) if authorization else None
+    if token_worker_id and worker_id and token_worker_id != worker_id:
+        raise HTTPException(status_code=403, detail="You can only view your own jobs")
+    worker_id = worker_id or token_worker_id
+    if worker_id:
+        try:
+            uuid.UUID(worker_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="worker_id must be a UUID")
+    limit = max(1, min(limit, 100))
+    offset = max(0, offset)
+    
+    pool = pg.get_pool()
+    if pool is not None:
+        try:
+            # Fetch one extra row to know whether another page exists
+            rows = await pg.worker_home_jobs(pool, worker_id, crop_type, limit + 1, offset)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    else:
+        columns = "*"
+        if worker_id:
+            # Embed only this worker's application and contract (one each per job at most)
+            columns += ", applications!applications_job_id_fkey(status), contracts!contracts_job_id_fkey(id, status)"
+        query = (
+            supabase.table("jobs")
+            .select(columns)
+            .eq("status", "open")
+            .is_("deleted_at", "null")
+        )
+        if worker_id:
+            query = query.eq("applications.worker_id", worker_id).eq("contracts.worker_id", worker_id)
+        if crop_type:
+            query = query.eq("crop_type", crop_type)
+        try:
+            response = (
+                query.order("start_date", desc=True)
+                .order("id", desc=True)
+                .range(offset, offset + limit)
+                .execute()
+            )
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+        rows = []
+        for job in response.data or []:
+            application = (job.pop('applications', None) or [None])[0] or {}
+            contract = (job.pop('contracts', None) or [None])[0] or {}
+            rows.append({
+                **job,
+                'application_status': application.get('status'),
+                'contract_id': contract.get('id'),
+                'contract_status': contract.get('status'),
+            })
+    
+    jobs = []
+    for row in rows[:limit]:
+        jobs.append({
+            **_job_to_response(row, location=_location_from_description(row.get('description'))),
+            'applied': row.get('application_status') is not None,
+            'application_status': row.get('application_status'),
+            'contract_id': row.get('contract_id'),
+            'contract_status': row.get('contract_status'),
+        })
+    
+    return {
+        'worker_id': worker_id,
+        'jobs': jobs,
+        'offset': offset,
+        'limit': limit,
+        'has_more': len(rows) > limit,
+    }
+
+
+@app.get("/workers/me/earnings", response_model=WorkerEarnings)
+async def get_my_earnings(
+    worker_id: Optional[str] = None,
+    season: Optional[int] = None,
+    weeks: int = 12,
+    authorization: Optional[str] = Header(None)
+):
+    """
+    Season totals, recent weekly earnings and benefits eligibility for a worker.
+    Reads the rollups the database maintains from the earnings ledger as
+    contracts are completed, so this is two primary-key lookups regardless of
+    how many contracts the worker has.
+    If worker_id is not provided, extracts it from the authorization token.
+    """
+    if not worker_id and authorization:
+        worker_id = get_user_id_from_token(authorization)
+    if not worker_id:
+        raise HTTPException(status_code=401, detail="Worker ID or authorization token required")
+    if authorization:
+        token_worker_id = get_user_id_from_token(authorization)
+        if token_worker_id and token_worker_id != worker_id:
+            raise HTTPException(status_code=403, detail="You can only view your own earnings")
+
+    season = season or date.today().year
+    weeks = max(1, min(weeks, 53))
+    try:
+        season_response = (
+            supabase.table("worker_earnings_season")
+            .select("total_mxn, days_worked, contracts_completed, first_work_date, last_work_date")
+            .eq("worker_id", worker_id)
+            .eq("season", season)
+            .execute()
+        )
+        weekly_response = (
+            supabase.table("worker_earnings_weekly")
+            .select("week_start, total_mxn, days_worked, contracts_completed")
+            .eq("worker_id", worker_id)
+            # The first week of a season can start in late December
+            .gte("week_start", (date(season, 1, 1) - timedelta(days=6)).isoformat())
+            .lt("week_start", f"{season + 1}-01-01")
+            .order("week_start", desc=True)
+            .limit(weeks)
+            .execute()
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+    totals = season_response.data[0] if season_response.data else {}
+    days_worked = totals.get('days_worked') or 0
+    return {
+        'worker_id': worker_id,
+        'season': season,
+        'total_mxn': float(totals.get('total_mxn') or 0),
+        'days_worked': days_worked,
+        'contracts_completed': totals.get('contracts_completed') or 0,
+        'first_work_date': totals.get('first_work_date'),
+        'last_work_date': totals.get('last_work_date'),
+        'benefits_eligible': days_worked >= BENEFITS_MIN_DAYS_WORKED,
+        'benefits_min_days': BENEFITS_MIN_DAYS_WORKED,
+        'weekly': [
+            {
+                'week_start': row['week_start'],
+                'total_mxn': float(row['total_mxn'] or 0),
+                'days_worked': row['days_worked'],
+                'contracts_completed': row['contracts_completed'],
+            }
+            for row in weekly_response.data or []
+        ],
+    }
+
+
 @app.get("/applications", response_model=List[ApplicationResponse])
 async def get_applications(
     grower_id: Optional[str] = None,
@@ -540,6 +1295,19 @@ async def get_applications(
     For admins: returns all applications
     For growers: can filter by grower_id
     """
+    if grower_id:
+        try:
+            uuid.UUID(grower_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="grower_id must be a UUID")
+    pool = pg.get_pool()
+    if pool is not None:
+        try:
+            # One joined query instead of per-application lookups
+            return await pg.applications_with_details(pool, grower_id=grower_id, job_id=job_id, status=status)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    
     # First get applications
     query = supabase.table("applications").select("*")
     
@@ -552,7 +1320,10 @@ async def get_applications(
     # Order by submitted_at descending (newest first)
     query = query.order("submitted_at", desc=True)
     
-    response = query.execute()
+    try:
+        response = query.execute()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
     
     # If filtering by grower_id, we need to filter after getting jobs
     if grower_id:
@@ -614,6 +1385,148 @@ async def get_applications(
     return applications
 
 
+@app.get("/growers/{grower_id}/dashboard", response_model=GrowerDashboard)
+async def get_grower_dashboard(grower_id: str, status: Optional[str] = None):
+    """
+    Per-job application counts, fill rate and latest application time for a
+    grower's jobs, plus totals. Counts are grouped in the database
+    (grower_job_stats view) and cached per grower until the next job or
+    application write; applicant details load per job from
+    `GET /jobs/{job_id}/applications`.
+    """
+    try:
+        uuid.UUID(grower_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="grower_id must be a UUID")
+    cache_key = (grower_id, status)
+    cached = grower_dashboard_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    generation = grower_dashboard_cache.generation
+    
+    pool = pg.get_pool()
+    try:
+        if pool is not None:
+            rows = await pg.grower_job_stats(pool, grower_id, status)
+        else:
+            query = supabase.table("grower_job_stats").select("*").eq("grower_id", grower_id)
+            if status:
+                query = query.eq("status", status)
+            rows = query.order("start_date").order("job_id").execute().data or []
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    
+    jobs = []
+    for row in rows:
+        workers_requested = row['workers_requested'] or 0
+        jobs.append({
+            'job_id': row['job_id'],
+            'title': row['title'],
+            'crop_type': row.get('crop_type'),
+            'start_date': row['start_date'],
+            'status': row['status'],
+            'workers_requested': workers_requested,
+            'applications_count': row['applications_count'],
+            'pending_count': row['pending_count'],
+            'accepted_count': row['accepted_count'],
+            'rejected_count': row['rejected_count'],
+            'fill_rate': round(row['accepted_count'] / workers_requested, 3) if workers_requested else 0.0,
+            'latest_application_at': row.get('latest_application_at'),
+        })
+    
+    workers_requested = sum(job['workers_requested'] for job in jobs)
+    accepted = sum(job['accepted_count'] for job in jobs)
+    dashboard = {
+        'grower_id': grower_id,
+        'total_jobs': len(jobs),
+        'open_jobs': sum(1 for job in jobs if job['status'] == 'open'),
+        'total_applications': sum(job['applications_count'] for job in jobs),
+        'pending_count': sum(job['pending_count'] for job in jobs),
+        'accepted_count': accepted,
+        'rejected_count': sum(job['rejected_count'] for job in jobs),
+        'workers_requested': workers_requested,
+        'fill_rate': round(accepted / workers_requested, 3) if workers_requested else 0.0,
+        'jobs': jobs,
+    }
+    grower_dashboard_cache.set(cache_key, dashboard, generation)
+    return dashboard
+
+
+@app.get("/jobs/{job_id}/applications", response_model=List[ApplicationResponse])
+async def get_job_applications(
+    job_id: int,
+    status: Optional[str] = None,
+    limit: int = 50,
+    offset: int = 0
+):
+    """
+    One page of a job's applications with worker details, newest first.
+    Fetched with a single joined query, for loading applicants lazily per job.
+    """
+    limit = max(1, min(limit, 200))
+    offset = max(0, offset)
+    
+    pool = pg.get_pool()
+    if pool is not None:
+        return await pg.applications_with_details(pool, job_id=job_id, status=status, limit=limit, offset=offset)
+    
+    query = (
+        supabase.table("applications")
+        .select("*, jobs!applications_job_id_fkey(title, grower_id, growers(user_id, farm_name)), workers(users(name, phone))")
+        .eq("job_id", job_id)
+    )
+    if status:
+        query = query.eq("status", status)
+    try:
+        response = (
+            query.order("submitted_at", desc=True)
+            .order("id", desc=True)
+            .range(offset, offset + limit - 1)
+            .execute()
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    
+    applications = []
+    for app in response.data or []:
+        job = app.get('jobs') or {}
+        grower = job.get('growers') or {}
+        user = (app.get('workers') or {}).get('users') or {}
+        applications.append({
+            'id': app['id'],
+            'job_id': app['job_id'],
+            'job_title': job.get('title') or 'Unknown Job',
+            'worker_id': app.get('worker_id'),
+            'worker_name': user.get('name') or 'Unknown Worker',
+            'worker_phone': user.get('phone') or 'N/A',
+            'status': app.get('status') or 'pending',
+            'audio_url': app.get('audio_url'),
+            'notes': app.get('notes'),
+            'submitted_at': app.get('submitted_at') or '',
+            'grower_id': grower.get('user_id') or job.get('grower_id'),
+            'farm_name': grower.get('farm_name'),
+        })
+    return applications
+
+
+def _publish_if_job_filled(job_id: int) -> None:
+    """Announce a job the fill-count trigger just closed, and refresh its search entry."""
+    job_response = supabase.table("jobs").select("*, growers(farm_name)").eq("id", job_id).execute()
+    if not job_response.data:
+        return
+    job = job_response.data[0]
+    # Only the acceptance that filled the last opening announces the close
+    if job.get('status') != 'closed' or job.get('accepted_count') != job['workers_requested']:
+        return
+    index_jobs([job])
+    publish_job_changes(cache_bus, upserted=[job_id])
+    broker.publish('job.closed', {
+        'job_id': job_id,
+        'accepted_count': job['accepted_count'],
+        'workers_requested': job['workers_requested'],
+    })
+
+
 @app.patch("/applications/{application_id}")
 async def update_application_status(
     application_id: int,
@@ -630,6 +1543,17 @@ async def update_application_status(
     if not response.data:
         raise HTTPException(status_code=404, detail="Application not found")
     
+    application = response.data[0]
+    broker.publish('application.status_changed', {
+        'application_id': application_id,
+        'job_id': application.get('job_id'),
+        'worker_id': application.get('worker_id'),
+        'status': update.status,
+    })
+    _invalidate_job_views()
+    if update.status == 'accepted' and application.get('job_id'):
+        _publish_if_job_filled(application['job_id'])
+    
     # Also update the associated contract if it exists
     contract_response = supabase.table("contracts").select("*").eq("application_id", application_id).execute()
     if contract_response.data:
@@ -664,6 +1588,7 @@ async def update_application_status(
                         pass
                 
                 # Generate PDF
+                from contract_pdf import generate_contract_pdf
                 pdf_buffer = generate_contract_pdf(
                     contract_data=contract,
                     job_data=job,
@@ -697,6 +1622,13 @@ async def update_application_status(
                     'contract_pdf_url': pdf_url,
                     'signed_at': datetime.now().isoformat()
                 }).eq("id", contract['id']).execute()
+                
+                if pdf_url:
+                    broker.publish('contract.pdf_ready', {
+                        'contract_id': contract['id'],
+                        'worker_id': worker_id,
+                        'contract_pdf_url': pdf_url,
+                    })
             except Exception as e:
                 print(f"Error generating PDF: {e}")
                 # Still update status even if PDF generation fails
@@ -712,14 +1644,75 @@ async def update_application_status(
     return {"message": f"Application {application_id} status updated to {update.status}"}
 
 
+@app.post("/voice-uploads", response_model=VoiceUploadStatus)
+async def create_voice_upload(
+    upload: VoiceUploadCreate,
+    authorization: Optional[str] = Header(None)
+):
+    """
+    Start a resumable voice-application upload.
+    Send the recording with PATCH /voice-uploads/{upload_id} in one or more
+    chunks, each with an Upload-Offset header.
+    """
+    worker_id = upload.worker_id or (get_user_id_from_token(authorization) if authorization else None)
+    try:
+        session = voice_uploads.create_session(
+            total_size=upload.total_size,
+            content_type=upload.content_type,
+            worker_id=worker_id,
+            application_id=upload.application_id
+        )
+    except voice_uploads.UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    
+    return {**session, 'chunk_size': voice_uploads.CHUNK_SIZE}
+
+
+@app.get("/voice-uploads/{upload_id}", response_model=VoiceUploadStatus)
+async def get_voice_upload(upload_id: str, response: Response):
+    """Get upload progress; `offset` is where the client should resume."""
+    try:
+        session = voice_uploads.load_session(upload_id)
+    except voice_uploads.UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    
+    response.headers["Upload-Offset"] = str(session['offset'])
+    return {**session, 'chunk_size': voice_uploads.CHUNK_SIZE}
+
+
+@app.patch("/voice-uploads/{upload_id}", response_model=VoiceUploadStatus)
+async def upload_voice_chunk(
+    upload_id: str,
+    request: Request,
+    response: Response,
+    upload_offset: int = Header(...)
+):
+    """
+    Append a chunk of the recording at Upload-Offset.
+    The request body is streamed to disk as it arrives. On an offset mismatch
+    (e.g. after a dropped connection) a 409 returns the stored offset in the
+    Upload-Offset header so the client can resume from there.
+    """
+    try:
+        session = await voice_uploads.append_chunk(upload_id, upload_offset, request.stream())
+    except voice_uploads.UploadError as e:
+        headers = {"Upload-Offset": str(e.offset)} if e.offset is not None else None
+        raise HTTPException(status_code=e.status_code, detail=e.detail, headers=headers)
+    
+    response.headers["Upload-Offset"] = str(session['offset'])
+    return {**session, 'chunk_size': voice_uploads.CHUNK_SIZE}
+
+
 @app.get("/contracts/{contract_id}/pdf")
 async def download_contract_pdf(
     contract_id: int,
+    compact: Optional[bool] = None,
     authorization: Optional[str] = Header(None)
 ):
     """
     Generate and download PDF contract for a specific contract.
     Only the worker who owns the contract can download it.
+    Pass compact=true for the smaller single-page layout.
     """
     # Get contract
     contract_response = supabase.table("contracts").select("*, jobs(*), workers(*)").eq("id", contract_id).execute()
@@ -761,11 +1754,13 @@ async def download_contract_pdf(
     
     # Generate PDF
     try:
+        from contract_pdf import generate_contract_pdf
         pdf_buffer = generate_contract_pdf(
             contract_data=contract,
             job_data=job,
             worker_data=worker_data,
-            grower_data=grower if grower else None
+            grower_data=grower if grower else None,
+            compact=compact
         )
         
         # Return PDF as download
@@ -780,9 +1775,151 @@ async def download_contract_pdf(
         raise HTTPException(status_code=500, detail=f"Error generating PDF: {str(e)}")
 
 
+@app.get("/stream")
+async def stream_events(
+    request: Request,
+    topics: Optional[str] = None,
+    worker_id: Optional[str] = None,
+    authorization: Optional[str] = Header(None),
+    last_event_id: Optional[str] = Header(None)
+):
+    """
+    Server-sent events stream of live updates.
+    - topics: comma-separated subset of jobs, applications, contracts (default: all)
+    - Application/contract events are limited to the caller's own rows when
+      a worker_id or authorization token is given
+    - Reconnecting clients send Last-Event-ID to replay recently missed events
+    """
+    selected = [t.strip() for t in topics.split(',') if t.strip()] if topics else list(EVENT_TOPICS)
+    unknown = [t for t in selected if t not in EVENT_TOPICS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown topics: {', '.join(unknown)}")
+    
+    if not worker_id and authorization:
+        worker_id = get_user_id_from_token(authorization)
+    
+    subscriber = broker.subscribe(
+        selected,
+        worker_id=worker_id,
+        last_event_id=int(last_event_id) if last_event_id and last_event_id.isdigit() else None
+    )
+    
+    return StreamingResponse(
+        event_stream(broker, subscriber, request),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",  # Disable proxy buffering
+        }
+    )
+
+
+@app.get("/export/{table}.{fmt}")
+async def export_table(
+    table: str,
+    fmt: str,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    grower_id: Optional[str] = None
+):
+    """
+    Download jobs, applications or contracts as a single Parquet or Arrow IPC
+    file for research analysis, e.g. `/export/jobs.parquet?start_date=2025-01-01`.
+    Dates filter jobs by start_date, applications by submitted_at and
+    contracts by created_at. Rows are streamed from the database in pages.
+    """
+    try:
+        import export
+    except ImportError:
+        raise HTTPException(status_code=501, detail="Columnar export requires pyarrow (pip install pyarrow)")
+    
+    if table not in export.EXPORT_TABLES:
+        raise HTTPException(status_code=404, detail=f"Unknown table. Available: {', '.join(export.EXPORT_TABLES)}")
+    if fmt not in export.FORMATS:
+        raise HTTPException(status_code=404, detail=f"Unknown format. Available: {', '.join(export.FORMATS)}")
+    for name, value in (('start_date', start_date), ('end_date', end_date)):
+        if value:
+            try:
+                date.fromisoformat(value)
+            except ValueError:
+                raise HTTPException(status_code=400, detail=f"{name} must be a date (YYYY-MM-DD)")
+    if grower_id:
+        try:
+            uuid.UUID(grower_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="grower_id must be a UUID")
+    
+    try:
+        # Reads the first page now, so database errors get a proper status
+        chunks = await run_in_threadpool(export.stream_export, supabase, table, fmt, start_date, end_date, grower_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    return StreamingResponse(
+        chunks,
+        media_type=export.FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{table}.{fmt}"'}
+    )
+
+
+def _demand_forecast_chart(summary: Optional[dict]) -> list:
+    """Monthly labor demand chart derived from the latest forecast summary."""
+    if summary is not None:
+        # Use forecast data if available
+        return [
+            {'month': 'Jan', 'demand': int(summary.get('total_jobs', 0) * 0.8)},
+            {'month': 'Feb', 'demand': int(summary.get('total_jobs', 0) * 0.9)},
+            {'month': 'Mar', 'demand': int(summary.get('total_jobs', 0) * 1.0)},
+            {'month': 'Apr', 'demand': int(summary.get('total_jobs', 0) * 1.1)},
+            {'month': 'May', 'demand': int(summary.get('total_jobs', 0) * 1.2)},
+            {'month': 'Jun', 'demand': int(summary.get('total_jobs', 0) * 1.3)},
+        ]
+    return [
+        {'month': 'Jan', 'demand': 0},
+        {'month': 'Feb', 'demand': 0},
+        {'month': 'Mar', 'demand': 0},
+        {'month': 'Apr', 'demand': 0},
+        {'month': 'May', 'demand': 0},
+        {'month': 'Jun', 'demand': 0},
+    ]
+
+
+async def _get_stats_from_postgres(pool) -> StatsResponse:
+    """Dashboard statistics aggregated in SQL over the direct Postgres pool."""
+    week_ago = (datetime.now() - timedelta(days=7)).date()
+    aggregates = await pg.dashboard_stats(pool, week_ago)
+    
+    days = [(datetime.now() - timedelta(days=6-i)).strftime('%a') for i in range(7)]
+    return StatsResponse(
+        active_jobs=aggregates['active_jobs'],
+        total_applications=aggregates['total_applications'],
+        weekly_jobs=[{'name': day, 'jobs': aggregates['jobs_by_day'].get(day, 0)} for day in days],
+        weekly_applications=[{'name': day, 'applications': aggregates['applications_by_day'].get(day, 0)} for day in days],
+        labor_demand_forecast=_demand_forecast_chart(aggregates['forecast_summary']),
+        category_stats=aggregates['category_stats']
+    )
+
+
 @app.get("/stats", response_model=StatsResponse)
 async def get_stats():
-    """Get statistics for the admin dashboard."""
+    """Get statistics for the admin dashboard (cached until the next job or application write)."""
+    # Weekly charts are relative to today, so entries are per day
+    cache_key = date.today().isoformat()
+    cached = stats_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    generation = stats_cache.generation
+    
+    pool = pg.get_pool()
+    if pool is not None:
+        stats = await _get_stats_from_postgres(pool)
+    else:
+        stats = await _get_stats_from_supabase()
+    stats_cache.set(cache_key, stats, generation)
+    return stats
+
+
+async def _get_stats_from_supabase() -> StatsResponse:
+    """Dashboard statistics assembled from PostgREST queries."""
     # Get active jobs
     active_jobs_response = supabase.table("jobs").select("id", count="exact").eq("status", "open").execute()
     active_jobs = active_jobs_response.count if active_jobs_response.count else 0
@@ -793,7 +1930,7 @@ async def get_stats():
     
     # Get weekly jobs (last 7 days)
     week_ago = (datetime.now() - timedelta(days=7)).strftime('%Y-%m-%d')
-    weekly_jobs_response = supabase.table("jobs").select("start_date").gte("start_date", week_ago).execute()
+    weekly_jobs_response = supabase.table("jobs").select("start_date").gte("start_date", week_ago).is_("deleted_at", "null").execute()
     
     # Group by day
     weekly_jobs_data = {}
@@ -826,31 +1963,12 @@ async def get_stats():
     weekly_applications = [{'name': day, 'applications': weekly_applications_data[day]} for day in weekly_applications_data.keys()]
     
     # Get labor demand forecast from demand_forecast table
-    forecast_response = supabase.table("demand_forecast").select("*").order("generated_at", desc=True).limit(1).execute()
-    
-    if forecast_response.data:
-        summary = forecast_response.data[0].get('summary_json', {})
-        # Use forecast data if available
-        forecast_data = [
-            {'month': 'Jan', 'demand': int(summary.get('total_jobs', 0) * 0.8)},
-            {'month': 'Feb', 'demand': int(summary.get('total_jobs', 0) * 0.9)},
-            {'month': 'Mar', 'demand': int(summary.get('total_jobs', 0) * 1.0)},
-            {'month': 'Apr', 'demand': int(summary.get('total_jobs', 0) * 1.1)},
-            {'month': 'May', 'demand': int(summary.get('total_jobs', 0) * 1.2)},
-            {'month': 'Jun', 'demand': int(summary.get('total_jobs', 0) * 1.3)},
-        ]
-    else:
-        forecast_data = [
-            {'month': 'Jan', 'demand': 0},
-            {'month': 'Feb', 'demand': 0},
-            {'month': 'Mar', 'demand': 0},
-            {'month': 'Apr', 'demand': 0},
-            {'month': 'May', 'demand': 0},
-            {'month': 'Jun', 'demand': 0},
-        ]
+    latest_forecast = forecasts.latest_summary(supabase)
+    summary = (latest_forecast.get('summary_json') or {}) if latest_forecast else None
+    forecast_data = _demand_forecast_chart(summary)
     
     # Get category stats
-    category_response = supabase.table("jobs").select("crop_type, workers_requested").execute()
+    category_response = supabase.table("jobs").select("crop_type, workers_requested").is_("deleted_at", "null").execute()
     
     category_stats = []
     crop_counts = {}
@@ -878,28 +1996,178 @@ async def get_stats():
     )
 
 
+@app.get("/forecasts", response_model=List[ForecastSummary])
+async def get_forecasts(limit: int = 20):
+    """List recent demand forecast summaries, newest first (detail is fetched separately)."""
+    if limit < 1 or limit > 100:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 100")
+    
+    return forecasts.list_summaries(supabase, limit=limit)
+
+
+@app.get("/forecasts/{forecast_id}/detail")
+async def get_forecast_detail(forecast_id: int):
+    """Get the generated job stream of a forecast, as column arrays."""
+    detail = forecasts.get_detail(supabase, forecast_id)
+    if detail is None:
+        raise HTTPException(status_code=404, detail="Forecast detail not found (not stored or compacted away)")
+    
+    return {'forecast_id': forecast_id, **detail}
+
+
+@app.post("/forecasts/compact")
+async def compact_forecasts(
+    keep_detail: int = forecasts.DETAIL_RETENTION_COUNT,
+    retention_days: int = forecasts.SUMMARY_RETENTION_DAYS
+):
+    """Drop detail beyond the newest `keep_detail` forecasts and summaries older than `retention_days`."""
+    if keep_detail < 0 or retention_days < 1:
+        raise HTTPException(status_code=400, detail="keep_detail must be >= 0 and retention_days >= 1")
+    
+    try:
+        return forecasts.compact_forecasts(supabase, keep_detail=keep_detail, retention_days=retention_days)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error compacting forecasts: {str(e)}")
+
+
+@app.post("/jobs/archive")
+async def archive_jobs(older_than_days: int = ARCHIVE_AFTER_DAYS, batch_size: int = 1000):
+    """
+    Move closed jobs that started more than `older_than_days` ago, and jobs
+    deleted more than `older_than_days` ago, together with their applications
+    and contracts, into the season-partitioned archive tables.
+    Runs the archive_closed_jobs database function in batches of `batch_size`.
+    """
+    if older_than_days < 0 or not 1 <= batch_size <= 10000:
+        raise HTTPException(status_code=400, detail="older_than_days must be >= 0 and batch_size between 1 and 10000")
+    
+    totals = {'jobs_archived': 0, 'applications_archived': 0, 'contracts_archived': 0}
+    try:
+        with call_timeout(120):
+            while True:
+                result = supabase.rpc('archive_closed_jobs', {
+                    'older_than_days': older_than_days,
+                    'batch_size': batch_size,
+                }).execute().data or {}
+                for key in totals:
+                    totals[key] += result.get(key, 0)
+                # Another archiver holds the lock, or this was the last batch
+                if result.get('skipped') or result.get('jobs_archived', 0) < batch_size:
+                    break
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error archiving jobs: {str(e)}")
+    
+    if totals['jobs_archived']:
+        # Archived jobs leave the jobs table; search indexes rebuild without them
+        reset_index()
+        publish_job_changes(cache_bus, reload=True)
+        _invalidate_job_views()
+    return totals
+
+
+@app.post("/simulations", response_model=SimulationResponse)
+async def create_simulation(request: SimulationRequest):
+    """
+    Simulate a day of job arrivals against a crew pool of `pool_size` workers.
+    Runs `replications` Monte Carlo days (or replays `jobs` once) and reports
+    utilization, unfilled-job rate and wait-time distribution. Identical
+    requests are served from cache.
+    """
+    if request.pool_size < 1:
+        raise HTTPException(status_code=400, detail="pool_size must be at least 1")
+    if not 1 <= request.replications <= 10000:
+        raise HTTPException(status_code=400, detail="replications must be between 1 and 10000")
+    if not request.jobs and not 1 <= request.num_jobs <= 5000:
+        raise HTTPException(status_code=400, detail="num_jobs must be between 1 and 5000")
+    if not request.jobs and request.replications * request.num_jobs > SIMULATION_MAX_JOBS:
+        raise HTTPException(status_code=400, detail=f"replications x num_jobs must be at most {SIMULATION_MAX_JOBS}")
+    if request.arrival_rate_minutes <= 0:
+        raise HTTPException(status_code=400, detail="arrival_rate_minutes must be greater than 0")
+    if request.seed < 0:
+        raise HTTPException(status_code=400, detail="seed must not be negative")
+    if request.jobs and len(request.jobs) > 5000:
+        raise HTTPException(status_code=400, detail="jobs may list at most 5000 jobs")
+    if request.patience_mins is not None and request.patience_mins <= 0:
+        raise HTTPException(status_code=400, detail="patience_mins must be greater than 0")
+    if request.horizon_mins is not None and request.horizon_mins <= 0:
+        raise HTTPException(status_code=400, detail="horizon_mins must be greater than 0")
+    
+    import simulation
+    
+    params = request.model_dump()
+    if request.jobs:
+        # A fixed job stream is deterministic, so one replication is enough
+        params.update(replications=1, num_jobs=len(request.jobs))
+    simulation_id = simulation.SimulationCache.key(params)
+    
+    result = simulation.simulation_cache.get(simulation_id)
+    cached = result is not None
+    if not cached:
+        result = await run_in_threadpool(simulation.run_simulation, **params)
+        simulation.simulation_cache.put(simulation_id, {**result, 'parameters': params})
+        result = simulation.simulation_cache.get(simulation_id)
+    
+    return {**result, 'simulation_id': simulation_id, 'cached': cached}
+
+
+@app.get("/simulations/{simulation_id}", response_model=SimulationResponse)
+async def get_simulation(simulation_id: str):
+    """Get a previously run simulation from the cache."""
+    import simulation
+    
+    result = simulation.simulation_cache.get(simulation_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Simulation not found (results are cached in memory)")
+    
+    return {**result, 'simulation_id': simulation_id, 'cached': True}
+
+
 @app.post("/jobs/regenerate")
-async def regenerate_jobs(num_jobs: int = 25, arrival_rate_minutes: float = 30.0):
+async def regenerate_jobs(num_jobs: int = 25, arrival_rate_minutes: float = 30.0, store_detail: bool = True):
     """
     Delete all existing jobs and regenerate new ones with current dates.
+    Existing jobs are soft-deleted (cancelled) so their history can be archived.
     Jobs will have pay rates specified in MXN (Mexican Pesos).
+    Set `store_detail=false` to record only the forecast summary.
     """
     try:
-        # Delete all existing jobs first
-        delete_response = supabase.table("jobs").delete().neq("id", 0).execute()
-        deleted_count = len(delete_response.data) if delete_response.data else 0
+        # Cancel all live jobs first
+        delete_response = (
+            supabase.table("jobs")
+            .update({'status': 'cancelled', 'deleted_at': datetime.now().isoformat()}, count="exact", returning="minimal")
+            .is_("deleted_at", "null")
+            .execute()
+        )
+        deleted_count = delete_response.count or 0
         
         # Generate and insert new jobs with current dates
-        result = insert_jobs_to_supabase(
-            num_jobs=num_jobs,
-            arrival_rate_minutes=arrival_rate_minutes
-        )
+        from data_generator import insert_jobs_to_supabase
+        # Large batch inserts can outlast the default per-call timeout
+        with call_timeout(120):
+            result = insert_jobs_to_supabase(
+                num_jobs=num_jobs,
+                arrival_rate_minutes=arrival_rate_minutes,
+                store_detail=store_detail
+            )
+        
+        # Keep forecast storage bounded as regenerations accumulate
+        try:
+            forecasts.compact_forecasts(supabase)
+        except Exception as e:
+            print(f"Warning: Could not compact demand forecasts: {e}")
+        
+        # Rebuild the search index from the new job set on next search, in every worker
+        reset_index()
+        publish_job_changes(cache_bus, reload=True)
+        _invalidate_job_views()
+        broker.publish('job.regenerated', {'jobs_deleted': deleted_count})
         
         if result['success']:
             return {
                 "message": f"Deleted {deleted_count} old jobs. {result['message']}",
                 "jobs_deleted": deleted_count,
-                "jobs_inserted": result['jobs_inserted']
+                "jobs_inserted": result['jobs_inserted'],
+                "forecast_id": result.get('forecast_id')
             }
         else:
             raise HTTPException(status_code=500, detail=result['error'])
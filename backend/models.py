@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Dict, List, Optional
 from datetime import datetime
 
 
@@ -18,6 +18,8 @@ class JobCreate(BaseModel):
     location: str
     date: str
     description: Optional[str] = None
+    quantity: Optional[int] = None  # Units to harvest (default 0)
+    workers_requested: Optional[int] = None  # Crew size (default 1)
 
 
 class JobResponse(Job):
@@ -27,6 +29,24 @@ class JobResponse(Job):
     pay_rate_mxn: Optional[float] = None
     total_value_mxn: Optional[float] = None
     service_time_mins: Optional[float] = None
+    applications_count: Optional[int] = None  # Applications received
+    accepted_count: Optional[int] = None  # Accepted workers, vs workers_requested
+    has_openings: Optional[bool] = None  # Open and not yet full
+
+
+class WorkerHomeJob(JobResponse):
+    applied: bool = False
+    application_status: Optional[str] = None
+    contract_id: Optional[int] = None
+    contract_status: Optional[str] = None
+
+
+class WorkerHome(BaseModel):
+    worker_id: Optional[str] = None
+    jobs: List[WorkerHomeJob]
+    offset: int
+    limit: int
+    has_more: bool
 
 
 class Contract(BaseModel):
@@ -52,6 +72,18 @@ class ContractUpdate(BaseModel):
     status: str  # 'accepted', 'rejected'
 
 
+class QueuedApplication(BaseModel):
+    client_id: str  # Generated on the device; makes resubmitting the queue safe
+    job_id: int
+    audio_url: Optional[str] = None
+    notes: Optional[str] = None
+
+
+class SyncPush(BaseModel):
+    worker_id: Optional[str] = None  # UUID string; defaults to the token's user
+    applications: List[QueuedApplication] = []
+
+
 class StatsResponse(BaseModel):
     active_jobs: int
     total_applications: int
@@ -76,6 +108,114 @@ class ApplicationResponse(BaseModel):
     farm_name: Optional[str] = None
 
 
+class GrowerJobSummary(BaseModel):
+    job_id: int
+    title: str
+    crop_type: Optional[str] = None
+    start_date: str
+    status: str
+    workers_requested: int
+    applications_count: int
+    pending_count: int
+    accepted_count: int
+    rejected_count: int
+    fill_rate: float  # accepted / workers_requested
+    latest_application_at: Optional[str] = None
+
+
+class GrowerDashboard(BaseModel):
+    grower_id: str
+    total_jobs: int
+    open_jobs: int
+    total_applications: int
+    pending_count: int
+    accepted_count: int
+    rejected_count: int
+    workers_requested: int
+    fill_rate: float
+    jobs: List[GrowerJobSummary]
+
+
 class ApplicationStatusUpdate(BaseModel):
     status: str  # 'pending', 'accepted', 'rejected'
 
+
+
+class JobSearchResponse(BaseModel):
+    total: int
+    jobs: List[JobResponse]
+    facets: Dict[str, Dict[str, int]]  # facet name -> value -> matching job count
+
+
+class VoiceUploadCreate(BaseModel):
+    total_size: int  # Size of the full recording in bytes
+    content_type: str = 'audio/webm'
+    worker_id: Optional[str] = None  # UUID string
+    application_id: Optional[int] = None
+
+
+class VoiceUploadStatus(BaseModel):
+    upload_id: str
+    offset: int
+    total_size: int
+    status: str  # 'uploading', 'processing', 'complete', 'failed'
+    chunk_size: Optional[int] = None
+    audio_url: Optional[str] = None
+    duration_seconds: Optional[int] = None
+    error: Optional[str] = None
+
+
+class ForecastSummary(BaseModel):
+    id: int
+    generated_at: str
+    num_jobs: int
+    arrival_rate_minutes: float
+    summary_json: Optional[dict] = None
+
+
+class EarningsWeek(BaseModel):
+    week_start: str
+    total_mxn: float
+    days_worked: int
+    contracts_completed: int
+
+
+class WorkerEarnings(BaseModel):
+    worker_id: str
+    season: int
+    total_mxn: float
+    days_worked: int
+    contracts_completed: int
+    first_work_date: Optional[str] = None
+    last_work_date: Optional[str] = None
+    benefits_eligible: bool
+    benefits_min_days: int
+    weekly: List[EarningsWeek]
+
+
+class SimulationJob(BaseModel):
+    arrival_time_poisson: float  # Minutes from start of day
+    workers_requested: int
+    service_time_mins: float
+
+
+class SimulationRequest(BaseModel):
+    pool_size: int  # Workers available for the day
+    num_jobs: int = 25
+    arrival_rate_minutes: float = 30.0
+    replications: int = 1000
+    patience_mins: Optional[float] = None  # Max wait before a job goes unfilled
+    horizon_mins: Optional[float] = None  # Length of the working day
+    seed: int = 42
+    jobs: Optional[List[SimulationJob]] = None  # Replay this stream instead of sampling
+
+
+class SimulationResponse(BaseModel):
+    simulation_id: str
+    cached: bool
+    parameters: dict
+    replications: int
+    utilization: Dict[str, float]
+    unfilled_rate: Dict[str, float]
+    wait_time_mins: Dict[str, float]
+    wait_histogram: list
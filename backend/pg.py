@@ -0,0 +1,268 @@
+"""
+Optional direct Postgres access for analytical endpoints.
+PostgREST can't express GROUP BY, date_trunc or window functions, so dashboard
+aggregates otherwise ship rows to Python. When DATABASE_URL is set (a read
+replica, the Supabase direct connection string, or a local Postgres), an
+asyncpg pool is opened by the app lifespan and those endpoints run their
+aggregation as SQL instead. Without it (or without asyncpg installed) the
+endpoints fall back to their PostgREST implementations.
+Every query run on the pool is recorded in the query-shape registry
+(query_log.py); slow ones get an EXPLAIN ANALYZE plan captured.
+"""
+import asyncio
+import json
+import os
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+POOL_MIN_SIZE = int(os.getenv("PG_POOL_MIN", "1"))
+POOL_MAX_SIZE = int(os.getenv("PG_POOL_MAX", "10"))
+STATEMENT_TIMEOUT_MS = int(os.getenv("PG_STATEMENT_TIMEOUT_MS", "10000"))
+
+_pool = None
+
+# asyncpg's own housekeeping when a connection goes back to the pool
+_RESET_QUERY_PREFIX = 'SELECT pg_advisory_unlock_all()'
+
+
+async def _explain(query: str, args, shape: str) -> None:
+    from query_log import registry
+
+    plan = None
+    start = asyncio.get_running_loop().time()
+    try:
+        plan = await _pool.fetchval(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {query}", *args)
+    except Exception as e:
+        print(f"Warning: Could not capture plan for {shape}: {e}")
+    registry.set_plan('postgres', shape, plan, (asyncio.get_running_loop().time() - start) * 1000)
+
+
+async def _on_query(record) -> None:
+    """asyncpg query logger: record the shape and explain slow queries."""
+    from query_log import registry, sql_shape
+
+    query = record.query.lstrip()
+    if query[:7].upper() == 'EXPLAIN' or query.startswith(_RESET_QUERY_PREFIX):
+        return
+    shape = sql_shape(record.query)
+    capture = registry.record('postgres', shape, record.elapsed, record.exception is None)
+    # ANALYZE executes the statement again, so only reads are explained (the pool is read-only too)
+    if capture and _pool is not None and shape.upper().startswith(('SELECT', 'WITH')):
+        await _explain(record.query, record.args or (), shape)
+    elif capture:
+        registry.set_plan('postgres', shape, None)
+
+
+async def _init_connection(connection) -> None:
+    connection.add_query_logger(_on_query)
+
+
+async def init_pool():
+    """Open the pool if DATABASE_URL is configured (called on app startup)."""
+    global _pool
+    database_url = os.getenv("DATABASE_URL", "").strip().strip('"').strip("'")
+    if not database_url or _pool is not None:
+        return _pool
+    try:
+        import asyncpg
+    except ImportError:
+        # Fallback if asyncpg not installed; the PostgREST paths are used instead
+        print("Warning: DATABASE_URL is set but asyncpg is not installed; using PostgREST for aggregates")
+        return None
+    try:
+        _pool = await asyncpg.create_pool(
+            database_url,
+            min_size=POOL_MIN_SIZE,
+            max_size=POOL_MAX_SIZE,
+            # PgBouncer (Supabase pooler) in transaction mode can't keep prepared statements
+            statement_cache_size=0,
+            init=_init_connection,
+            server_settings={
+                'application_name': 'labor-api',
+                'statement_timeout': str(STATEMENT_TIMEOUT_MS),
+                'default_transaction_read_only': 'on',
+            },
+        )
+    except Exception as e:
+        print(f"Warning: Could not connect to DATABASE_URL, using PostgREST for aggregates: {e}")
+        _pool = None
+    return _pool
+
+
+async def close_pool() -> None:
+    global _pool
+    pool, _pool = _pool, None
+    if pool is not None:
+        await pool.close()
+
+
+def get_pool():
+    """Return the asyncpg pool, or None when direct Postgres access isn't configured."""
+    return _pool
+
+
+async def dashboard_stats(pool, week_start: date) -> Dict[str, Any]:
+    """
+    Compute the admin dashboard aggregates in the database.
+
+    Args:
+        pool: asyncpg pool
+        week_start: First day of the weekly charts
+
+    Returns:
+        Dictionary with active_jobs, total_applications, jobs_by_day and
+        applications_by_day (keyed by 'Mon'..'Sun'), category_stats and the
+        latest forecast summary
+    """
+    totals, jobs_by_day, apps_by_day, categories, forecast = await asyncio.gather(
+        pool.fetchrow(
+            """
+            SELECT
+                (SELECT count(*) FROM jobs WHERE status = 'open') AS active_jobs,
+                (SELECT count(*) FROM applications) AS total_applications
+            """
+        ),
+        pool.fetch(
+            """
+            SELECT to_char(start_date, 'Dy') AS day, count(*) AS count
+            FROM jobs
+            WHERE start_date >= $1::date AND deleted_at IS NULL
+            GROUP BY 1
+            """,
+            week_start,
+        ),
+        pool.fetch(
+            """
+            SELECT to_char(submitted_at AT TIME ZONE 'UTC', 'Dy') AS day, count(*) AS count
+            FROM applications
+            WHERE submitted_at >= $1::date
+            GROUP BY 1
+            """,
+            week_start,
+        ),
+        pool.fetch(
+            """
+            SELECT coalesce(crop_type, 'Other') AS category,
+                   count(*) AS jobs,
+                   coalesce(sum(workers_requested), 0) AS workers
+            FROM jobs
+            WHERE deleted_at IS NULL
+            GROUP BY 1
+            ORDER BY 1
+            """
+        ),
+        # asyncpg returns jsonb as text
+        pool.fetchval("SELECT summary_json FROM demand_forecast ORDER BY generated_at DESC LIMIT 1"),
+    )
+
+    return {
+        'active_jobs': totals['active_jobs'],
+        'total_applications': totals['total_applications'],
+        'jobs_by_day': {row['day']: row['count'] for row in jobs_by_day},
+        'applications_by_day': {row['day']: row['count'] for row in apps_by_day},
+        'category_stats': [
+            {'category': row['category'], 'jobs': row['jobs'], 'workers': int(row['workers'])}
+            for row in categories
+        ],
+        'forecast_summary': json.loads(forecast) if forecast else None,
+    }
+
+
+async def applications_with_details(
+    pool,
+    grower_id: Optional[str] = None,
+    job_id: Optional[int] = None,
+    status: Optional[str] = None,
+    limit: Optional[int] = None,
+    offset: int = 0,
+) -> List[Dict[str, Any]]:
+    """
+    Applications joined with their job, grower and worker in one query,
+    newest first. Returns rows shaped like ApplicationResponse.
+    """
+    rows = await pool.fetch(
+        """
+        SELECT a.id, a.job_id, a.worker_id::text AS worker_id, a.status, a.audio_url,
+               a.notes, a.submitted_at, j.title AS job_title,
+               coalesce(g.user_id, j.grower_id)::text AS grower_id,
+               g.farm_name, u.name AS worker_name, u.phone AS worker_phone
+        FROM applications a
+        LEFT JOIN jobs j ON j.id = a.job_id
+        LEFT JOIN growers g ON g.user_id = j.grower_id
+        LEFT JOIN users u ON u.id = a.worker_id
+        WHERE ($1::uuid IS NULL OR j.grower_id = $1::uuid)
+          AND ($2::int IS NULL OR a.job_id = $2)
+          AND ($3::text IS NULL OR a.status = $3)
+        ORDER BY a.submitted_at DESC, a.id DESC
+        LIMIT $4 OFFSET $5
+        """,
+        grower_id, job_id, status, limit, offset,
+    )
+    return [
+        {
+            'id': row['id'],
+            'job_id': row['job_id'],
+            'job_title': row['job_title'] or 'Unknown Job',
+            'worker_id': row['worker_id'],
+            'worker_name': row['worker_name'] or 'Unknown Worker',
+            'worker_phone': row['worker_phone'] or 'N/A',
+            'status': row['status'] or 'pending',
+            'audio_url': row['audio_url'],
+            'notes': row['notes'],
+            'submitted_at': row['submitted_at'].isoformat() if row['submitted_at'] else '',
+            'grower_id': row['grower_id'],
+            'farm_name': row['farm_name'],
+        }
+        for row in rows
+    ]
+
+
+async def worker_home_jobs(
+    pool,
+    worker_id: Optional[str],
+    crop_type: Optional[str],
+    limit: int,
+    offset: int,
+) -> List[Dict[str, Any]]:
+    """
+    Open jobs, newest first, each joined to the worker's own application and
+    contract (at most one of each per job). Returns jobs rows plus
+    application_status, contract_id and contract_status.
+    """
+    rows = await pool.fetch(
+        """
+        SELECT j.id, j.title, j.crop_type, j.pay_rate_mxn, j.quantity_units, j.unit_type,
+               j.workers_requested, j.start_date::text AS start_date, j.description,
+               j.service_time_mins, j.arrival_time_poisson, j.applications_count,
+               j.accepted_count, j.has_openings,
+               a.status AS application_status, c.id AS contract_id, c.status AS contract_status
+        FROM jobs j
+        LEFT JOIN applications a ON a.job_id = j.id AND a.worker_id = $1::uuid
+        LEFT JOIN contracts c ON c.job_id = j.id AND c.worker_id = $1::uuid
+        WHERE j.status = 'open' AND j.deleted_at IS NULL
+          AND ($2::text IS NULL OR j.crop_type = $2)
+        ORDER BY j.start_date DESC, j.id DESC
+        LIMIT $3 OFFSET $4
+        """,
+        worker_id, crop_type, limit, offset,
+    )
+    return [dict(row) for row in rows]
+
+
+async def grower_job_stats(pool, grower_id: str, status: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Rows of the grower_job_stats view for one grower's live jobs, soonest start first."""
+    rows = await pool.fetch(
+        """
+        SELECT job_id, title, crop_type, start_date::text AS start_date, status, workers_requested,
+               applications_count, pending_count, accepted_count, rejected_count, latest_application_at
+        FROM grower_job_stats
+        WHERE grower_id = $1::uuid
+          AND ($2::text IS NULL OR status = $2)
+        ORDER BY start_date, job_id
+        """,
+        grower_id, status,
+    )
+    return [
+        {**dict(row), 'latest_application_at': row['latest_application_at'].isoformat() if row['latest_application_at'] else None}
+        for row in rows
+    ]
@@ -0,0 +1,353 @@
+"""
+Sampling profiler for finding where slow requests spend their time.
+A background thread snapshots Python stacks (`sys._current_frames()`) at a
+fixed interval, so the profiled code runs unmodified and there is no cost
+while nothing is being sampled. Two ways to use it:
+
+- On demand: add `?profile=1` (or an `X-Profile: 1` header) to any request
+  along with `X-Profile-Token: $PROFILER_TOKEN`. The request runs as usual but
+  the response is its profile, as speedscope JSON (open it at
+  https://www.speedscope.app) or, with `profile_format=collapsed`, collapsed
+  stacks for flamegraph.pl. Only the thread serving the request is sampled.
+  Blocking PostgREST calls show up under httpx, response validation under
+  pydantic/fastapi, and time waiting on the event loop under `select`.
+- Continuous: with PROFILER_CONTINUOUS=1 every thread is sampled at a coarse
+  interval and aggregated collapsed stacks are written to PROFILER_DIR every
+  PROFILER_FLUSH_SECONDS, keeping the newest PROFILER_KEEP files.
+
+On-demand profiling is off unless PROFILER_TOKEN is set.
+"""
+import hmac
+import json
+import os
+import sys
+import sysconfig
+import tempfile
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+PROFILER_TOKEN = os.getenv("PROFILER_TOKEN", "").strip()
+PROFILER_SAMPLE_MS = float(os.getenv("PROFILER_SAMPLE_MS", "1"))
+PROFILER_CONTINUOUS = os.getenv("PROFILER_CONTINUOUS", "").strip().lower() in ("1", "true", "yes")
+PROFILER_CONTINUOUS_SAMPLE_MS = float(os.getenv("PROFILER_CONTINUOUS_SAMPLE_MS", "20"))
+PROFILER_FLUSH_SECONDS = float(os.getenv("PROFILER_FLUSH_SECONDS", "60"))
+PROFILER_KEEP = int(os.getenv("PROFILER_KEEP", "60"))
+PROFILER_DIR = Path(os.getenv("PROFILER_DIR", Path(tempfile.gettempdir()) / "labor-api-profiles"))
+
+# Stacks deeper than this are truncated at the root end
+MAX_DEPTH = 128
+
+Frame = Tuple[str, str, int]  # (function, file, first line)
+
+
+_BACKEND_DIR = os.path.dirname(os.path.abspath(__file__)) + os.sep
+_STDLIB_DIR = sysconfig.get_paths()['stdlib'] + os.sep
+
+
+def _short_path(filename: str) -> str:
+    """Trim interpreter and site-packages prefixes so frames read as module paths."""
+    for marker in ('site-packages/', 'dist-packages/'):
+        index = filename.rfind(marker)
+        if index != -1:
+            return filename[index + len(marker):]
+    for prefix in (_BACKEND_DIR, _STDLIB_DIR):
+        if filename.startswith(prefix):
+            return filename[len(prefix):]
+    return filename
+
+
+def _stack(frame) -> Tuple[Frame, ...]:
+    """Root-first stack of (function, file, line) for a frame."""
+    frames = []
+    while frame is not None and len(frames) < MAX_DEPTH:
+        code = frame.f_code
+        frames.append((code.co_name, _short_path(code.co_filename), code.co_firstlineno))
+        frame = frame.f_back
+    frames.reverse()
+    return tuple(frames)
+
+
+class StackSampler:
+    """
+    Samples the stacks of one thread (or every thread) from a background thread.
+
+    `counts` aggregates identical stacks; with `timeline` set, `samples` also
+    keeps each (stack, weight in ms) in order, for speedscope's time-order view.
+    """
+
+    def __init__(self, interval_ms: float, thread_id: Optional[int] = None, timeline: bool = False):
+        self.interval = interval_ms / 1000
+        self.thread_id = thread_id
+        self.timeline = timeline
+        self.counts: Counter = Counter()
+        self.samples: List[Tuple[Tuple[Frame, ...], float]] = []
+        self.started_at = 0.0
+        self.duration = 0.0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.duration = time.perf_counter() - self.started_at
+
+    def drain(self) -> Counter:
+        """Return the stacks counted so far and start a new aggregate."""
+        with self._lock:
+            counts, self.counts = self.counts, Counter()
+        return counts
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            weight_ms, last = (now - last) * 1000, now
+            frames = sys._current_frames()
+            if self.thread_id is not None:
+                selected = [(self.thread_id, frames.get(self.thread_id))]
+            else:
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+                # Skip the profiler's own threads
+                selected = [
+                    (ident, frame) for ident, frame in frames.items()
+                    if ident != own_id and not names.get(ident, '').startswith('profiler')
+                ]
+            with self._lock:
+                for ident, frame in selected:
+                    if frame is None:
+                        continue
+                    stack = _stack(frame)
+                    if self.thread_id is None:
+                        # Group continuous samples by thread at the root
+                        stack = ((names.get(ident, f"thread-{ident}"), '', 0),) + stack
+                    self.counts[stack] += 1
+                    if self.timeline:
+                        self.samples.append((stack, weight_ms))
+            del frames
+
+
+def _frame_label(frame: Frame) -> str:
+    name, filename, line = frame
+    label = f"{name} ({filename}:{line})" if filename else name
+    # ';' separates frames in the collapsed format
+    return label.replace(';', ':')
+
+
+def to_collapsed(counts: Counter) -> str:
+    """Collapsed stacks ("root;...;leaf count" per line), as read by flamegraph.pl and speedscope."""
+    lines = [
+        ';'.join(_frame_label(frame) for frame in stack) + f" {count}"
+        for stack, count in counts.most_common()
+    ]
+    return '\n'.join(lines) + ('\n' if lines else '')
+
+
+def to_speedscope(sampler: StackSampler, name: str) -> Dict[str, Any]:
+    """A speedscope file with one sampled profile, weighted by measured time between samples."""
+    frame_index: Dict[Frame, int] = {}
+    frames: List[Dict[str, Any]] = []
+
+    def index(frame: Frame) -> int:
+        if frame not in frame_index:
+            frame_index[frame] = len(frames)
+            function, filename, line = frame
+            entry: Dict[str, Any] = {'name': function}
+            if filename:
+                entry.update(file=filename, line=line)
+            frames.append(entry)
+        return frame_index[frame]
+
+    if sampler.timeline:
+        weighted = sampler.samples
+    else:
+        interval_ms = sampler.interval * 1000
+        weighted = [(stack, count * interval_ms) for stack, count in sampler.counts.items()]
+    samples = [[index(frame) for frame in stack] for stack, _ in weighted]
+    weights = [round(weight, 3) for _, weight in weighted]
+    return {
+        '$schema': 'https://www.speedscope.app/file-format-schema.json',
+        'name': name,
+        'exporter': 'labor-api profiler',
+        'activeProfileIndex': 0,
+        'shared': {'frames': frames},
+        'profiles': [{
+            'type': 'sampled',
+            'name': name,
+            'unit': 'milliseconds',
+            'startValue': 0,
+            'endValue': round(sum(weights), 3),
+            'samples': samples,
+            'weights': weights,
+        }],
+    }
+
+
+def _wants_profile(scope) -> bool:
+    """Cheap check run on every request: is profiling asked for at all?"""
+    if b'profile=' in scope['query_string']:
+        query = parse_qs(scope['query_string'].decode('latin-1'))
+        if query.get('profile', [''])[0] in ('1', 'true'):
+            return True
+    for name, value in scope['headers']:
+        if name == b'x-profile' and value in (b'1', b'true'):
+            return True
+    return False
+
+
+def _header(scope, name: bytes) -> str:
+    for key, value in scope['headers']:
+        if key == name:
+            return value.decode('latin-1')
+    return ''
+
+
+async def _send_body(send, status: int, body: bytes, content_type: str, headers: List[Tuple[bytes, bytes]] = ()) -> None:
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', content_type.encode()), (b'content-length', str(len(body)).encode()), *headers],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+class ProfileMiddleware:
+    """
+    Pure ASGI middleware: runs a request under the sampler when `?profile=1`
+    or `X-Profile: 1` is sent with a valid X-Profile-Token, and returns the
+    profile in place of the response. Other requests pass straight through.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        # One profiled request at a time; each lowers the interpreter's switch interval
+        self._busy = threading.Lock()
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or not PROFILER_TOKEN or not _wants_profile(scope):
+            await self.app(scope, receive, send)
+            return
+        if not hmac.compare_digest(_header(scope, b'x-profile-token').encode(), PROFILER_TOKEN.encode()):
+            await _send_body(send, 403, b'{"detail":"Invalid or missing X-Profile-Token"}', 'application/json')
+            return
+        if not self._busy.acquire(blocking=False):
+            await _send_body(send, 409, b'{"detail":"Another request is being profiled"}', 'application/json')
+            return
+
+        status = {'code': None}
+
+        async def capture(message):
+            # The profile replaces the response; keep only its status
+            if message['type'] == 'http.response.start':
+                status['code'] = message['status']
+
+        query = parse_qs(scope['query_string'].decode('latin-1'))
+        fmt = query.get('profile_format', ['speedscope'])[0]
+        sampler = StackSampler(PROFILER_SAMPLE_MS, thread_id=threading.get_ident(), timeline=True)
+        # Let the sampler thread take the GIL at its interval rather than every 5ms
+        switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(min(switch_interval, sampler.interval / 2))
+        sampler.start()
+        try:
+            await self.app(scope, receive, capture)
+        finally:
+            sampler.stop()
+            sys.setswitchinterval(switch_interval)
+            self._busy.release()
+
+        name = f"{scope['method']} {scope['path']}"
+        headers = [
+            (b'x-profiled-status', str(status['code']).encode()),
+            (b'x-profile-duration-ms', f"{sampler.duration * 1000:.1f}".encode()),
+            (b'x-profile-samples', str(sum(sampler.counts.values())).encode()),
+        ]
+        if fmt == 'collapsed':
+            await _send_body(send, 200, to_collapsed(sampler.counts).encode(), 'text/plain; charset=utf-8', headers)
+        else:
+            body = json.dumps(to_speedscope(sampler, name), separators=(',', ':')).encode()
+            headers.append((b'content-disposition', b'attachment; filename="profile.speedscope.json"'))
+            await _send_body(send, 200, body, 'application/json', headers)
+
+
+class ContinuousProfiler:
+    """Samples every thread at a coarse interval and writes collapsed stacks to disk periodically."""
+
+    def __init__(self, directory: Path = PROFILER_DIR, interval_ms: float = PROFILER_CONTINUOUS_SAMPLE_MS,
+                 flush_seconds: float = PROFILER_FLUSH_SECONDS, keep: int = PROFILER_KEEP):
+        self.directory = Path(directory)
+        self.interval_ms = interval_ms
+        self.flush_seconds = flush_seconds
+        self.keep = keep
+        self.files_written = 0
+        self._sampler: Optional[StackSampler] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._sampler is not None:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._stop.clear()
+        self._sampler = StackSampler(self.interval_ms)
+        self._sampler.start()
+        self._thread = threading.Thread(target=self._flush_loop, name="profiler-flush", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        sampler, self._sampler = self._sampler, None
+        if sampler is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        sampler.stop()
+        self._write(sampler.drain())
+
+    def _flush_loop(self) -> None:
+        while not self._stop.wait(self.flush_seconds):
+            sampler = self._sampler
+            if sampler is not None:
+                self._write(sampler.drain())
+
+    def _write(self, counts: Counter) -> None:
+        if not counts:
+            return
+        stamp = time.strftime('%Y%m%dT%H%M%S', time.gmtime())
+        path = self.directory / f"profile-{os.getpid()}-{stamp}.collapsed"
+        try:
+            path.write_text(to_collapsed(counts))
+            self.files_written += 1
+            self._prune()
+        except OSError as e:
+            print(f"Warning: Could not write profile {path}: {e}")
+
+    def _prune(self) -> None:
+        # Only this process's files; siblings prune their own
+        mine = sorted(self.directory.glob(f"profile-{os.getpid()}-*.collapsed"))
+        for old in mine[:-self.keep] if self.keep > 0 else []:
+            try:
+                old.unlink()
+            except OSError:
+                pass
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            'running': self._sampler is not None,
+            'directory': str(self.directory),
+            'interval_ms': self.interval_ms,
+            'flush_seconds': self.flush_seconds,
+            'files_written': self.files_written,
+        }
+
+
+continuous_profiler = ContinuousProfiler()
@@ -0,0 +1,290 @@
+"""
+Query-shape registry and slow-query log.
+Every PostgREST call and every direct-Postgres query is fingerprinted by its
+shape (table, select/embeds, filter columns and operators, ordering; literal
+values dropped), and per-shape latency is tracked so `GET /metrics/queries`
+shows which shapes cost the most. Calls slower than SLOW_QUERY_MS are logged.
+
+With QUERY_PLANS enabled (the default), a slow shape also gets its plan
+captured with EXPLAIN ANALYZE, at most once per QUERY_PLAN_INTERVAL_SECONDS:
+asyncpg queries are explained on the pool, PostgREST reads are re-sent with
+PostgREST's plan media type (only works where `db_plan_enabled` is on, e.g. a
+local stack; it is disabled after the first refusal). Sequential scans over
+many rows and sorts that spill to disk are listed as findings, which usually
+point at a missing index.
+"""
+import json
+import os
+import re
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+from urllib.parse import unquote
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "500"))
+QUERY_PLANS = os.getenv("QUERY_PLANS", "1").strip().lower() not in ("0", "false", "no")
+QUERY_PLAN_INTERVAL_SECONDS = float(os.getenv("QUERY_PLAN_INTERVAL_SECONDS", "600"))
+# Sequential scans reading at least this many rows are reported
+SEQ_SCAN_MIN_ROWS = int(os.getenv("SEQ_SCAN_MIN_ROWS", "1000"))
+
+# Latencies kept per shape for percentiles, and recent slow calls kept overall
+SHAPE_WINDOW = 500
+SLOW_LOG_SIZE = 100
+# Don't repeat the slow-query warning for a shape more often than this
+SLOW_WARNING_INTERVAL_SECONDS = 60.0
+MAX_SHAPES = 1000
+
+# PostgREST query parameters that aren't column filters
+_POSTGREST_KEYWORDS = {'select', 'order', 'limit', 'offset', 'on_conflict', 'columns'}
+# Values inside and=(...) / or=(...) filters
+_LOGIC_VALUE = re.compile(r'\.(not\.)?(eq|neq|gt|gte|lt|lte|like|ilike|match|imatch|in|cs|cd|ov|fts|plfts|phfts|wfts)\.(\([^)]*\)|[^,()]*)')
+_WHITESPACE = re.compile(r'\s+')
+
+PLAN_MEDIA_TYPE = 'application/vnd.pgrst.plan+json; for="application/json"; options=analyze|buffers'
+
+
+def _filter_shape(value: str) -> str:
+    """`eq.open` -> `eq.?`, `not.in.(1,2)` -> `not.in.?`; `is.null` etc. are kept (they change plans)."""
+    negated = value.startswith('not.')
+    if negated:
+        value = value[4:]
+    operator, _, _ = value.partition('.')
+    shape = value if operator == 'is' else f"{operator}.?"
+    return f"not.{shape}" if negated else shape
+
+
+def _logic_value_shape(match) -> str:
+    return f".{match.group(1) or ''}{match.group(2)}.?"
+
+
+def postgrest_shape(method: str, path: str, params, prefer: str = '') -> str:
+    """
+    Fingerprint a PostgREST request, e.g.
+    `GET jobs?deleted_at=is.null&limit=?&order=start_date.desc&select=*&status=eq.?`.
+    """
+    resource = path.split('/rest/v1/', 1)[-1].strip('/')
+    parts = []
+    for key, value in params:
+        value = unquote(value)
+        if key in ('limit', 'offset'):
+            parts.append(f"{key}=?")
+        elif key in _POSTGREST_KEYWORDS:
+            parts.append(f"{key}={_WHITESPACE.sub('', value)}")
+        elif key in ('and', 'or') or key.endswith(('.and', '.or')):
+            parts.append(f"{key}={_LOGIC_VALUE.sub(_logic_value_shape, value)}")
+        else:
+            parts.append(f"{key}={_filter_shape(value)}")
+    if 'count=' in prefer:
+        parts.append('count=' + prefer.split('count=', 1)[1].split(',')[0].strip())
+    query = '&'.join(sorted(parts))
+    return f"{method} {resource}" + (f"?{query}" if query else '')
+
+
+def sql_shape(query: str) -> str:
+    """Normalized SQL text (asyncpg queries already use $n placeholders for values)."""
+    return _WHITESPACE.sub(' ', query).strip()
+
+
+def plan_findings(plan: Any) -> List[str]:
+    """Sequential scans over many rows and on-disk sorts in an EXPLAIN (FORMAT JSON) plan."""
+    findings: List[str] = []
+
+    def visit(node: Dict[str, Any]) -> None:
+        loops = node.get('Actual Loops', 1) or 1
+        if node.get('Node Type') == 'Seq Scan':
+            read = (node.get('Actual Rows', 0) + node.get('Rows Removed by Filter', 0)) * loops
+            if read >= SEQ_SCAN_MIN_ROWS:
+                finding = f"Seq Scan on {node.get('Relation Name')} read {read} rows"
+                if node.get('Filter'):
+                    finding += f" (filter: {node['Filter']}, removed {node.get('Rows Removed by Filter', 0) * loops})"
+                findings.append(finding)
+        if node.get('Sort Space Type') == 'Disk':
+            findings.append(f"Sort on {', '.join(node.get('Sort Key', []))} spilled {node.get('Sort Space Used')}kB to disk")
+        for child in node.get('Plans', []):
+            visit(child)
+
+    if isinstance(plan, (str, bytes)):
+        plan = json.loads(plan)
+    if isinstance(plan, list):
+        plan = plan[0] if plan else {}
+    if isinstance(plan, dict) and 'Plan' in plan:
+        visit(plan['Plan'])
+    return findings
+
+
+class _Shape:
+    __slots__ = ('source', 'shape', 'calls', 'errors', 'total_ms', 'max_ms', 'latencies',
+                 'slow_calls', 'last_warned', 'plan', 'plan_ms', 'plan_captured_at', 'findings',
+                 'plan_pending')
+
+    def __init__(self, source: str, shape: str):
+        self.source = source
+        self.shape = shape
+        self.calls = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.latencies = deque(maxlen=SHAPE_WINDOW)
+        self.slow_calls = 0
+        self.last_warned = 0.0
+        self.plan: Any = None
+        self.plan_ms: Optional[float] = None
+        self.plan_captured_at = 0.0
+        self.findings: List[str] = []
+        self.plan_pending = False
+
+
+class QueryRegistry:
+    """Per-shape latency statistics, the recent slow-call log, and captured plans."""
+
+    def __init__(self, slow_ms: float = SLOW_QUERY_MS, plan_interval: float = QUERY_PLAN_INTERVAL_SECONDS):
+        self.slow_ms = slow_ms
+        self.plan_interval = plan_interval
+        self.postgrest_plans = QUERY_PLANS
+        self._shapes: Dict[str, _Shape] = {}
+        self._slow: deque = deque(maxlen=SLOW_LOG_SIZE)
+        self._lock = threading.Lock()
+
+    def record(self, source: str, shape: str, seconds: float, ok: bool = True) -> bool:
+        """
+        Record one call. Returns True when the caller should capture a plan
+        for it (slow, plans enabled, none captured recently for this shape).
+        """
+        elapsed_ms = seconds * 1000
+        now = time.time()
+        key = f"{source}:{shape}"
+        with self._lock:
+            entry = self._shapes.get(key)
+            if entry is None:
+                if len(self._shapes) >= MAX_SHAPES:
+                    return False
+                entry = self._shapes[key] = _Shape(source, shape)
+            entry.calls += 1
+            entry.errors += 0 if ok else 1
+            entry.total_ms += elapsed_ms
+            entry.max_ms = max(entry.max_ms, elapsed_ms)
+            entry.latencies.append(elapsed_ms)
+            if elapsed_ms < self.slow_ms:
+                return False
+            entry.slow_calls += 1
+            self._slow.append({'source': source, 'shape': shape, 'ms': round(elapsed_ms, 1), 'at': now, 'ok': ok})
+            warn = now - entry.last_warned >= SLOW_WARNING_INTERVAL_SECONDS
+            if warn:
+                entry.last_warned = now
+            capture = QUERY_PLANS and ok and not entry.plan_pending and now - entry.plan_captured_at >= self.plan_interval
+            if capture:
+                entry.plan_pending = True
+        if warn:
+            print(f"Warning: slow {source} query ({elapsed_ms:.0f}ms): {shape}")
+        return capture
+
+    def set_plan(self, source: str, shape: str, plan: Any, plan_ms: Optional[float] = None) -> None:
+        """Store a captured plan (None if capture failed) and its findings."""
+        if isinstance(plan, (str, bytes)):
+            plan = json.loads(plan)
+        findings = plan_findings(plan) if plan is not None else []
+        with self._lock:
+            entry = self._shapes.get(f"{source}:{shape}")
+            if entry is None:
+                return
+            entry.plan_pending = False
+            entry.plan_captured_at = time.time()
+            if plan is not None:
+                entry.plan = plan
+                entry.plan_ms = plan_ms
+                entry.findings = findings
+        for finding in findings:
+            print(f"Warning: {finding} in {source} query: {shape}")
+
+    def snapshot(self, limit: int = 50, include_plans: bool = False) -> Dict[str, Any]:
+        """Shapes by total time spent, plus recent slow calls."""
+        with self._lock:
+            entries = sorted(self._shapes.values(), key=lambda entry: entry.total_ms, reverse=True)
+            shapes = []
+            for entry in entries[:limit]:
+                latencies = sorted(entry.latencies)
+
+                def percentile(p: float) -> float:
+                    return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))], 1) if latencies else 0.0
+
+                item = {
+                    'source': entry.source,
+                    'shape': entry.shape,
+                    'calls': entry.calls,
+                    'errors': entry.errors,
+                    'slow_calls': entry.slow_calls,
+                    'total_ms': round(entry.total_ms, 1),
+                    'mean_ms': round(entry.total_ms / entry.calls, 1) if entry.calls else 0.0,
+                    'p50_ms': percentile(0.50),
+                    'p95_ms': percentile(0.95),
+                    'p99_ms': percentile(0.99),
+                    'max_ms': round(entry.max_ms, 1),
+                    'findings': list(entry.findings),
+                }
+                if include_plans and entry.plan is not None:
+                    item['plan'] = entry.plan
+                    item['plan_ms'] = entry.plan_ms
+                shapes.append(item)
+            return {
+                'slow_query_ms': self.slow_ms,
+                'plans_enabled': QUERY_PLANS,
+                'postgrest_plans': self.postgrest_plans,
+                'shape_count': len(self._shapes),
+                'shapes': shapes,
+                'recent_slow': list(self._slow)[::-1],
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._shapes.clear()
+            self._slow.clear()
+
+
+registry = QueryRegistry()
+
+# One background thread re-sends slow PostgREST reads for their plans
+_plan_executor = None
+_plan_executor_lock = threading.Lock()
+
+
+def _capture_postgrest_plan(transport, request, shape: str) -> None:
+    import httpx
+
+    plan = None
+    start = time.perf_counter()
+    try:
+        headers = dict(request.headers)
+        headers['accept'] = PLAN_MEDIA_TYPE
+        headers.pop('content-length', None)
+        plan_request = httpx.Request('GET', request.url, headers=headers)
+        response = transport.handle_request(plan_request)
+        body = response.read()
+        response.close()
+        if response.status_code == 200:
+            plan = json.loads(body)
+        elif response.status_code in (400, 406, 415):
+            # The server doesn't allow plans (db_plan_enabled off); stop asking
+            registry.postgrest_plans = False
+    except Exception as e:
+        print(f"Warning: Could not capture plan for {shape}: {e}")
+    registry.set_plan('postgrest', shape, plan, (time.perf_counter() - start) * 1000)
+
+
+def observe_postgrest(transport, request, status_code: Optional[int], seconds: float) -> None:
+    """InstrumentedTransport hook: record a PostgREST call and maybe capture its plan."""
+    global _plan_executor
+    shape = postgrest_shape(request.method, request.url.path, request.url.params.multi_items(), request.headers.get('prefer', ''))
+    ok = status_code is not None and status_code < 400
+    capture = registry.record('postgrest', shape, seconds, ok)
+    if not capture:
+        return
+    # Re-running a write would repeat it; only reads are explained
+    if request.method != 'GET' or not registry.postgrest_plans:
+        registry.set_plan('postgrest', shape, None)
+        return
+    with _plan_executor_lock:
+        if _plan_executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+            _plan_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="query-plan")
+    _plan_executor.submit(_capture_postgrest_plan, transport, request, shape)
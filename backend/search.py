@@ -0,0 +1,480 @@
+"""
+In-process job search index.
+Keeps an inverted index over job titles, descriptions, crops and farm names so
+`GET /jobs/search` can answer keyword queries with faceted counts (crop, farm,
+pay bucket) without scanning the jobs table. The index is built once from
+Supabase in a background thread (searches get a 503 until it is ready) and
+then updated incrementally by the job write endpoints; other worker processes
+get the changed job ids over the cache bus (INDEX_TOPIC) and apply them in
+place.
+"""
+import re
+import threading
+import unicodedata
+from collections import OrderedDict, defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+# Pay buckets in MXN per unit: (label, lower bound inclusive, upper bound exclusive)
+PAY_BUCKETS = [
+    ('0-10', 0.0, 10.0),
+    ('10-25', 10.0, 25.0),
+    ('25-40', 25.0, 40.0),
+    ('40+', 40.0, float('inf')),
+]
+
+FACETS = ('crop_type', 'farm', 'pay_bucket', 'status')
+
+# Location shown for jobs whose description doesn't name a farm
+DEFAULT_LOCATION = 'San Quintín'
+
+# PostgREST returns at most this many rows per request
+FETCH_PAGE_SIZE = 1000
+
+# Cache bus topic carrying changed job ids between worker processes, and ids per message
+INDEX_TOPIC = 'job_index'
+INDEX_MESSAGE_IDS = 500
+
+# Number of distinct (query, filters) results kept between writes
+RESULT_CACHE_SIZE = 256
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Lowercase, strip accents and split text into alphanumeric tokens."""
+    if not text:
+        return []
+    normalized = unicodedata.normalize('NFKD', text)
+    ascii_text = normalized.encode('ascii', 'ignore').decode('ascii').lower()
+    return _TOKEN_RE.findall(ascii_text)
+
+
+def pay_bucket(pay_rate: Optional[float]) -> str:
+    """Return the label of the pay bucket a pay rate falls into."""
+    rate = float(pay_rate or 0)
+    for label, low, high in PAY_BUCKETS:
+        if low <= rate < high:
+            return label
+    return PAY_BUCKETS[0][0]
+
+
+def location_from_description(description: Optional[str]) -> str:
+    """Farm name mentioned in a generated job description, or the default region."""
+    description = description or ''
+    return description.split('Farm')[1].split('.')[0].strip() if 'Farm' in description else DEFAULT_LOCATION
+
+
+def _date_key(start_date: Optional[str]) -> int:
+    """Turn 'YYYY-MM-DD' into a sortable integer (20261018)."""
+    digits = (start_date or '')[:10].replace('-', '')
+    return int(digits) if digits.isdigit() else 0
+
+
+class JobSearchIndex:
+    """
+    Columnar search index over jobs.
+
+    Every job gets a dense slot number. Facet values and start dates are kept
+    in numpy arrays indexed by slot, so filtering, facet counting and picking
+    the newest page are vectorized passes instead of Python loops. Text tokens
+    map to sets of slots (materialized as sorted arrays on demand). An updated
+    job keeps its slot, and a removed job's slot is reused by the next new
+    one, so the arrays stay as large as the most jobs indexed at once.
+    Cached results hold the match count, facet counts and the slots of the
+    newest matches, not a mask over every slot.
+    numpy is imported on first use so app startup doesn't pay for it.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._rows: List[Optional[Dict[str, Any]]] = []
+        self._slots: Dict[int, int] = {}  # job id -> slot
+        self._free: List[int] = []  # slots of removed jobs, reused by new ones
+        self._job_ids = None
+        self._alive = None
+        self._dates = None
+        self._codes = {facet: None for facet in FACETS}
+        self._values: Dict[str, List[str]] = {facet: [] for facet in FACETS}
+        self._value_codes: Dict[str, Dict[str, int]] = {facet: {} for facet in FACETS}
+        self._tokens: Dict[str, Set[int]] = defaultdict(set)
+        self._token_arrays: Dict[str, Any] = {}  # token -> sorted numpy array of slots
+        self._results: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self.loaded = False
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def _code(self, facet: str, value: str) -> int:
+        codes = self._value_codes[facet]
+        if value not in codes:
+            codes[value] = len(self._values[facet])
+            self._values[facet].append(value)
+        return codes[value]
+
+    def _grow(self, needed: int) -> None:
+        import numpy as np
+
+        capacity = 0 if self._alive is None else len(self._alive)
+        if needed <= capacity:
+            return
+        new_capacity = max(needed, capacity * 2, 1024)
+
+        def grown(old, dtype):
+            new = np.zeros(new_capacity, dtype=dtype)
+            if old is not None:
+                new[:capacity] = old
+            return new
+
+        self._job_ids = grown(self._job_ids, np.int64)
+        self._alive = grown(self._alive, bool)
+        self._dates = grown(self._dates, np.int64)
+        for facet, old in self._codes.items():
+            self._codes[facet] = grown(old, np.int32)
+
+    def add(self, job: Dict[str, Any]) -> None:
+        """Add or replace a job row in the index."""
+        job_id = int(job['id'])
+        growers = job.get('growers') if isinstance(job.get('growers'), dict) else {}
+        # Jobs without a grower (e.g. generated ones) facet by the location /jobs shows
+        farm = (growers or {}).get('farm_name') or job.get('farm_name') or location_from_description(job.get('description'))
+        row = {**job, 'farm_name': farm}
+        tokens = set(
+            tokenize(job.get('title'))
+            + tokenize(job.get('description'))
+            + tokenize(job.get('crop_type'))
+            + tokenize(farm)
+        )
+        facet_values = {
+            'crop_type': job.get('crop_type') or 'Other',
+            'farm': farm,
+            'pay_bucket': pay_bucket(job.get('pay_rate_mxn')),
+            'status': job.get('status') or 'open',
+        }
+
+        with self._lock:
+            slot = self._slots.get(job_id)
+            if slot is not None:
+                self._unindex_tokens(slot)
+            elif self._free:
+                slot = self._free.pop()
+            else:
+                slot = len(self._rows)
+                self._grow(slot + 1)
+                self._rows.append(None)
+            self._rows[slot] = row
+            self._slots[job_id] = slot
+            self._job_ids[slot] = job_id
+            self._alive[slot] = True
+            self._dates[slot] = _date_key(job.get('start_date'))
+            for facet, value in facet_values.items():
+                self._codes[facet][slot] = self._code(facet, value)
+            for token in tokens:
+                self._tokens[token].add(slot)
+                self._token_arrays.pop(token, None)
+            row['_tokens'] = tokens
+            self._results.clear()
+
+    def add_many(self, jobs: Iterable[Dict[str, Any]]) -> None:
+        for job in jobs:
+            self.add(job)
+
+    def remove(self, job_id: int) -> None:
+        """Remove a job from the index if present."""
+        with self._lock:
+            self._remove_locked(int(job_id))
+
+    def _remove_locked(self, job_id: int) -> None:
+        slot = self._slots.pop(job_id, None)
+        if slot is None:
+            return
+        self._unindex_tokens(slot)
+        self._rows[slot] = None
+        self._alive[slot] = False
+        self._free.append(slot)
+        self._results.clear()
+
+    def _unindex_tokens(self, slot: int) -> None:
+        for token in self._rows[slot]['_tokens']:
+            postings = self._tokens.get(token)
+            if postings is not None:
+                postings.discard(slot)
+                self._token_arrays.pop(token, None)
+                if not postings:
+                    del self._tokens[token]
+
+    def clear(self) -> None:
+        """Drop every document; the next search rebuilds from the database."""
+        with self._lock:
+            self._reset()
+
+    def _token_slots(self, token: str):
+        import numpy as np
+
+        array = self._token_arrays.get(token)
+        if array is None:
+            postings = self._tokens.get(token, ())
+            array = np.fromiter(postings, dtype=np.int64, count=len(postings))
+            array.sort()
+            self._token_arrays[token] = array
+        return array
+
+    def _match(self, terms: tuple, filters: tuple) -> tuple:
+        """Return (boolean mask of matched slots, facet counts)."""
+        import numpy as np
+
+        size = len(self._rows)
+        self._grow(1)
+        mask = self._alive[:size].copy()
+
+        for term in terms:
+            if term in self._tokens:
+                slots = self._token_slots(term)
+            else:
+                # Fall back to prefix matching so partial words still match
+                prefixed = [self._token_slots(t) for t in self._tokens if t.startswith(term)]
+                slots = np.concatenate(prefixed) if prefixed else np.empty(0, dtype=np.int64)
+            term_mask = np.zeros(size, dtype=bool)
+            term_mask[slots] = True
+            mask &= term_mask
+
+        for facet, value in filters:
+            code = self._value_codes[facet].get(value)
+            if code is None:
+                mask[:] = False
+                break
+            mask &= self._codes[facet][:size] == code
+
+        facet_counts = {}
+        for facet in ('crop_type', 'farm', 'pay_bucket'):
+            counts = np.bincount(self._codes[facet][:size][mask], minlength=len(self._values[facet]))
+            facet_counts[facet] = {
+                self._values[facet][code]: int(count)
+                for code, count in enumerate(counts)
+                if count
+            }
+        return mask, facet_counts
+
+    def _newest(self, mask, count: int) -> List[int]:
+        """Return up to `count` matched slots ordered by start_date then ID, newest first."""
+        import numpy as np
+
+        slots = np.flatnonzero(mask)
+        if len(slots) == 0 or count <= 0:
+            return []
+        # Combine date and job id into a single descending sort key
+        keys = self._dates[slots] * (1 << 32) + self._job_ids[slots]
+        if len(slots) > count:
+            top = np.argpartition(-keys, count - 1)[:count]
+            slots, keys = slots[top], keys[top]
+        return slots[np.argsort(-keys, kind='stable')].tolist()
+
+    def search(
+        self,
+        query: Optional[str] = None,
+        filters: Optional[Dict[str, Optional[str]]] = None,
+        limit: int = 20,
+        offset: int = 0,
+    ) -> Dict[str, Any]:
+        """
+        Search the index.
+
+        Args:
+            query: Free-text query; every token must match (prefix match as fallback)
+            filters: Exact facet filters, e.g. {'crop_type': 'Tomato', 'status': 'open'}
+            limit: Maximum number of rows to return
+            offset: Number of rows to skip (for pagination)
+
+        Returns:
+            Dictionary with matching job rows (newest start_date first), total
+            match count and facet counts over the matched set
+        """
+        terms = tuple(sorted(set(tokenize(query))))
+        active_filters = tuple(sorted((k, v) for k, v in (filters or {}).items() if v is not None))
+        cache_key = (terms, active_filters)
+
+        wanted = offset + limit
+        with self._lock:
+            cached = self._results.get(cache_key)
+            # A cached entry serves any page within the newest slots it kept
+            if cached is not None and (wanted <= len(cached[2]) or len(cached[2]) == cached[0]):
+                self._results.move_to_end(cache_key)
+                total, facet_counts, newest = cached
+            else:
+                mask, facet_counts = self._match(terms, active_filters)
+                total = int(mask.sum())
+                newest = self._newest(mask, wanted)
+                self._results[cache_key] = (total, facet_counts, newest)
+                self._results.move_to_end(cache_key)
+                if len(self._results) > RESULT_CACHE_SIZE:
+                    self._results.popitem(last=False)
+            rows = [self._rows[slot] for slot in newest[offset:wanted]]
+
+        return {
+            'total': total,
+            'jobs': [{k: v for k, v in row.items() if k != '_tokens'} for row in rows],
+            'facets': facet_counts,
+        }
+
+
+def fetch_all_jobs(client, columns: str = "*, growers(farm_name)") -> List[Dict[str, Any]]:
+    """
+    Page through the live jobs (PostgREST caps rows per request). Pages are
+    keyed on id rather than OFFSET, so each one is an index range scan.
+    """
+    rows: List[Dict[str, Any]] = []
+    last_id = 0
+    while True:
+        response = (
+            client.table("jobs")
+            .select(columns)
+            .is_("deleted_at", "null")
+            .gt("id", last_id)
+            .order("id")
+            .limit(FETCH_PAGE_SIZE)
+            .execute()
+        )
+        batch = response.data or []
+        rows.extend(batch)
+        if len(batch) < FETCH_PAGE_SIZE:
+            return rows
+        last_id = batch[-1]['id']
+
+
+job_index = JobSearchIndex()
+
+# Background build state. Changes seen while the build runs are queued and
+# re-read once it finishes, since the pages already fetched may predate them.
+_build_lock = threading.Lock()
+_building = False
+_rebuild_requested = False
+_pending_upserted: Set[int] = set()
+_pending_removed: Set[int] = set()
+
+
+def publish_job_changes(bus, upserted: Iterable[int] = (), removed: Iterable[int] = (), reload: bool = False) -> None:
+    """
+    Tell other worker processes which jobs changed so they update their index.
+
+    Args:
+        bus: The cache invalidation bus
+        upserted: Ids of jobs created or changed (status, fill counts)
+        removed: Ids of jobs deleted
+        reload: Drop the whole index instead (e.g. after regenerating or archiving jobs)
+    """
+    if reload:
+        bus.publish(INDEX_TOPIC, {'reload': True})
+        return
+    upserted, removed = [int(i) for i in upserted], [int(i) for i in removed]
+    # Keep each message well under the NOTIFY payload limit
+    for start in range(0, max(len(upserted), len(removed)), INDEX_MESSAGE_IDS):
+        bus.publish(INDEX_TOPIC, {
+            'upserted': upserted[start:start + INDEX_MESSAGE_IDS],
+            'removed': removed[start:start + INDEX_MESSAGE_IDS],
+        })
+
+
+def _queue_if_building(upserted: Iterable[int], removed: Iterable[int]) -> bool:
+    with _build_lock:
+        if _building:
+            _pending_upserted.update(int(i) for i in upserted)
+            _pending_removed.update(int(i) for i in removed)
+        return _building
+
+
+def index_jobs(rows: Iterable[Dict[str, Any]] = (), removed: Iterable[int] = ()) -> None:
+    """Apply this process's own job writes (rows created or changed, ids deleted) to the index."""
+    rows = list(rows)
+    if _queue_if_building((row['id'] for row in rows), removed):
+        return
+    if not job_index.loaded:
+        return
+    for job_id in removed:
+        job_index.remove(job_id)
+    for row in rows:
+        job_index.add(row)
+
+
+def apply_job_changes(client, upserted: Iterable[int] = (), removed: Iterable[int] = ()) -> None:
+    """Re-read changed jobs into the index and drop removed ones (no-op until it is loaded)."""
+    upserted, removed = list(upserted), list(removed)
+    if _queue_if_building(upserted, removed) or not job_index.loaded:
+        return
+    for job_id in removed:
+        job_index.remove(job_id)
+    for start in range(0, len(upserted), FETCH_PAGE_SIZE):
+        ids = upserted[start:start + FETCH_PAGE_SIZE]
+        rows = client.table("jobs").select("*, growers(farm_name)").in_("id", ids).execute().data or []
+        for row in rows:
+            if row.get('deleted_at'):
+                job_index.remove(row['id'])
+            else:
+                job_index.add(row)
+        for job_id in set(ids) - {row['id'] for row in rows}:
+            job_index.remove(job_id)
+
+
+def _build(client) -> None:
+    global _building, _rebuild_requested
+    while True:
+        try:
+            rows = fetch_all_jobs(client)
+        except Exception as e:
+            print(f"Warning: Could not build job search index: {e}")
+            with _build_lock:
+                _building = False
+                _pending_upserted.clear()
+                _pending_removed.clear()
+            return
+        with _build_lock:
+            if _rebuild_requested:
+                # Jobs were replaced wholesale while fetching; start over
+                _rebuild_requested = False
+                _pending_upserted.clear()
+                _pending_removed.clear()
+                continue
+        with job_index._lock:
+            job_index._reset()
+            job_index.add_many(rows)
+            job_index.loaded = True
+        with _build_lock:
+            _building = False
+            upserted, removed = list(_pending_upserted), list(_pending_removed)
+            _pending_upserted.clear()
+            _pending_removed.clear()
+        if upserted or removed:
+            try:
+                apply_job_changes(client, upserted, removed)
+            except Exception as e:
+                # Stale entries would stay until the next reload; start over instead
+                print(f"Warning: Could not apply job changes made during the index build: {e}")
+                reset_index()
+        return
+
+
+def ensure_loaded(client) -> bool:
+    """
+    Return True if the index is ready. Otherwise start building it from the
+    database in a background thread (if not already running) and return False;
+    callers answer from elsewhere until it is loaded.
+    """
+    global _building
+    if job_index.loaded:
+        return True
+    with _build_lock:
+        if _building or job_index.loaded:
+            return job_index.loaded
+        _building = True
+    threading.Thread(target=_build, args=(client,), name="search-index-build", daemon=True).start()
+    return False
+
+
+def reset_index() -> None:
+    """Drop the index (jobs were replaced wholesale); it is rebuilt on next use."""
+    global _rebuild_requested
+    with _build_lock:
+        if _building:
+            _rebuild_requested = True
+    job_index.clear()
@@ -0,0 +1,277 @@
+"""
+Discrete-event harvest simulator for crew capacity planning.
+Replays a day of job arrivals against a fixed pool of workers: a job starts
+when enough workers are free to field its whole crew, holds them for its
+service time, and gives up (goes unfilled) if it waits longer than the
+grower's patience. Monte Carlo mode draws thousands of job streams at once
+with NumPy and runs the replications across a process pool.
+"""
+import hashlib
+import heapq
+import json
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+# Event kinds, ordered so releases at time t are handled before arrivals at t
+RELEASE, ARRIVAL, ABANDON = 0, 1, 2
+
+# Replications per process-pool task; small runs stay in-process
+CHUNK_SIZE = 64
+MIN_PARALLEL_REPLICATIONS = 2 * CHUNK_SIZE
+
+SIMULATION_PROCESSES = int(os.getenv("SIMULATION_PROCESSES", os.cpu_count() or 1))
+CACHE_SIZE = 128
+
+WAIT_HISTOGRAM_BINS = [0, 15, 30, 60, 120, 240, 480]  # minutes
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def simulate_day(
+    arrivals: np.ndarray,
+    crews: np.ndarray,
+    service_times: np.ndarray,
+    pool_size: int,
+    patience_mins: Optional[float] = None,
+    horizon_mins: Optional[float] = None,
+) -> Dict[str, Any]:
+    """
+    Run one replication as a heap-based discrete event simulation.
+
+    Jobs are served first-come first-served: a waiting job at the head of the
+    queue blocks later (smaller) jobs, matching how crews are dispatched in order.
+
+    Args:
+        arrivals: Job arrival times in minutes, ascending
+        crews: Workers each job needs at once
+        service_times: Minutes each job holds its crew
+        pool_size: Workers available for the day
+        patience_mins: Maximum wait before a job goes unfilled (None = wait forever)
+        horizon_mins: End of the working day; jobs not started by then go unfilled
+            (None = run until every job is served)
+
+    Returns:
+        Dictionary with busy worker-minutes, day length, per-job waits of
+        filled jobs and the unfilled count
+    """
+    num_jobs = len(arrivals)
+    events = [(float(arrivals[i]), ARRIVAL, i) for i in range(num_jobs)]
+    heapq.heapify(events)
+
+    free = pool_size
+    queue = deque()
+    waiting = np.zeros(num_jobs, dtype=bool)
+    waits: List[float] = []
+    busy_minutes = 0.0
+    now = 0.0
+
+    def start_ready_jobs(t):
+        nonlocal free, busy_minutes
+        while queue:
+            job = queue[0]
+            if not waiting[job]:
+                queue.popleft()  # abandoned while queued
+                continue
+            if crews[job] > free:
+                break
+            queue.popleft()
+            waiting[job] = False
+            free -= crews[job]
+            end = t + service_times[job]
+            if horizon_mins is not None:
+                busy_minutes += crews[job] * (min(end, horizon_mins) - t)
+            else:
+                busy_minutes += crews[job] * service_times[job]
+            waits.append(t - arrivals[job])
+            heapq.heappush(events, (end, RELEASE, job))
+
+    while events:
+        now, kind, job = heapq.heappop(events)
+        if horizon_mins is not None and now > horizon_mins:
+            now = horizon_mins
+            break
+        if kind == RELEASE:
+            free += crews[job]
+            start_ready_jobs(now)
+        elif kind == ARRIVAL:
+            if crews[job] > pool_size:
+                continue  # can never be staffed from this pool
+            waiting[job] = True
+            queue.append(job)
+            start_ready_jobs(now)
+            if waiting[job] and patience_mins is not None:
+                heapq.heappush(events, (now + patience_mins, ABANDON, job))
+        elif waiting[job]:
+            waiting[job] = False
+            # The abandoned job may have been blocking the head of the queue
+            start_ready_jobs(now)
+
+    # Every job that never started goes unfilled: too big for the pool,
+    # abandoned, still queued, or arriving after the horizon
+    unfilled = num_jobs - len(waits)
+
+    return {
+        'busy_worker_minutes': float(busy_minutes),
+        'day_minutes': float(horizon_mins if horizon_mins is not None else now),
+        'waits': waits,
+        'unfilled': unfilled,
+        'jobs': num_jobs,
+    }
+
+
+def _run_chunk(arrivals, crews, service_times, pool_size, patience_mins, horizon_mins) -> List[Dict[str, Any]]:
+    """Run a block of replications (one row each); the unit of work sent to the pool."""
+    return [
+        simulate_day(arrivals[r], crews[r], service_times[r], pool_size, patience_mins, horizon_mins)
+        for r in range(len(arrivals))
+    ]
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn, not fork: the API process runs threads (uvicorn, broker)
+            _pool = ProcessPoolExecutor(
+                max_workers=SIMULATION_PROCESSES,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def shutdown_pool() -> None:
+    """Stop the worker processes (called on app shutdown)."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _summarize(runs: List[Dict[str, Any]], pool_size: int) -> Dict[str, Any]:
+    utilization = np.array([
+        r['busy_worker_minutes'] / (pool_size * r['day_minutes']) if r['day_minutes'] > 0 else 0.0
+        for r in runs
+    ])
+    unfilled_rate = np.array([r['unfilled'] / r['jobs'] if r['jobs'] else 0.0 for r in runs])
+    waits = np.concatenate([np.asarray(r['waits'], dtype=float) for r in runs]) if runs else np.array([])
+
+    def distribution(values: np.ndarray) -> Dict[str, float]:
+        if len(values) == 0:
+            return {'mean': 0.0, 'p5': 0.0, 'p50': 0.0, 'p95': 0.0}
+        p5, p50, p95 = np.percentile(values, [5, 50, 95])
+        return {'mean': float(values.mean()), 'p5': float(p5), 'p50': float(p50), 'p95': float(p95)}
+
+    bins = WAIT_HISTOGRAM_BINS + [np.inf]
+    counts, _ = np.histogram(waits, bins=bins)
+    histogram = [
+        {'min_wait_mins': low, 'max_wait_mins': None if np.isinf(high) else high, 'jobs': int(count)}
+        for low, high, count in zip(bins[:-1], bins[1:], counts)
+    ]
+
+    wait_summary = {'mean': 0.0, 'p50': 0.0, 'p90': 0.0, 'p99': 0.0, 'max': 0.0}
+    if len(waits):
+        p50, p90, p99 = np.percentile(waits, [50, 90, 99])
+        wait_summary = {'mean': float(waits.mean()), 'p50': float(p50), 'p90': float(p90),
+                        'p99': float(p99), 'max': float(waits.max())}
+
+    return {
+        'replications': len(runs),
+        'utilization': distribution(utilization),
+        'unfilled_rate': distribution(unfilled_rate),
+        'wait_time_mins': wait_summary,
+        'wait_histogram': histogram,
+    }
+
+
+def run_simulation(
+    pool_size: int,
+    num_jobs: int = 25,
+    arrival_rate_minutes: float = 30.0,
+    replications: int = 1000,
+    patience_mins: Optional[float] = None,
+    horizon_mins: Optional[float] = None,
+    seed: int = 42,
+    jobs: Optional[List[Dict[str, float]]] = None,
+) -> Dict[str, Any]:
+    """
+    Simulate crews being consumed by a day's jobs.
+
+    Args:
+        pool_size: Workers available
+        num_jobs: Jobs per simulated day (ignored when `jobs` is given)
+        arrival_rate_minutes: Average time between job arrivals (Poisson process)
+        replications: Independent days to simulate (Monte Carlo)
+        patience_mins: Maximum wait before a job goes unfilled
+        horizon_mins: Length of the working day in minutes
+        seed: Seed for the job streams, so identical requests give identical results
+        jobs: Explicit job stream (arrival_time_poisson, workers_requested,
+            service_time_mins per job) to replay once instead of sampling
+
+    Returns:
+        Utilization, unfilled-job rate and wait-time distribution summaries
+    """
+    if jobs:
+        ordered = sorted(jobs, key=lambda j: j['arrival_time_poisson'])
+        arrivals = np.array([[j['arrival_time_poisson'] for j in ordered]], dtype=float)
+        crews = np.array([[j['workers_requested'] for j in ordered]], dtype=np.int64)
+        service_times = np.array([[j['service_time_mins'] for j in ordered]], dtype=float)
+    else:
+        from data_generator import sample_job_arrays
+
+        streams = sample_job_arrays(np.random.default_rng(seed), replications, num_jobs, arrival_rate_minutes)
+        arrivals = streams['arrival_time_poisson']
+        crews = streams['workers_requested']
+        service_times = streams['service_time_mins']
+
+    total = len(arrivals)
+    if total < MIN_PARALLEL_REPLICATIONS or SIMULATION_PROCESSES <= 1:
+        runs = _run_chunk(arrivals, crews, service_times, pool_size, patience_mins, horizon_mins)
+    else:
+        pool = _get_pool()
+        futures = [
+            pool.submit(_run_chunk, arrivals[i:i + CHUNK_SIZE], crews[i:i + CHUNK_SIZE],
+                        service_times[i:i + CHUNK_SIZE], pool_size, patience_mins, horizon_mins)
+            for i in range(0, total, CHUNK_SIZE)
+        ]
+        runs = [run for future in futures for run in future.result()]
+
+    return _summarize(runs, pool_size)
+
+
+class SimulationCache:
+    """Small LRU of simulation results keyed by a hash of the request parameters."""
+
+    def __init__(self, max_size: int = CACHE_SIZE):
+        self._max_size = max_size
+        self._results: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(params: Dict[str, Any]) -> str:
+        encoded = json.dumps(params, sort_keys=True, default=str).encode()
+        return hashlib.sha256(encoded).hexdigest()[:16]
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            result = self._results.get(key)
+            if result is not None:
+                self._results.move_to_end(key)
+            return result
+
+    def put(self, key: str, result: Dict[str, Any]) -> None:
+        with self._lock:
+            self._results[key] = result
+            self._results.move_to_end(key)
+            while len(self._results) > self._max_size:
+                self._results.popitem(last=False)
+
+
+simulation_cache = SimulationCache()
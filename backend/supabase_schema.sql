@@ -48,7 +48,14 @@ CREATE TABLE IF NOT EXISTS jobs (
     status TEXT DEFAULT 'open' CHECK (status IN ('open', 'closed', 'cancelled')),
     service_time_mins NUMERIC(10, 2),
     arrival_time_poisson NUMERIC(10, 2),
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+    -- Fill level, maintained by the sync_job_fill_counts trigger on applications
+    applications_count INTEGER NOT NULL DEFAULT 0,
+    accepted_count INTEGER NOT NULL DEFAULT 0,
+    has_openings BOOLEAN GENERATED ALWAYS AS (status = 'open' AND accepted_count < workers_requested) STORED,
+    -- Set (with status 'cancelled') when a job is deleted; rows move to jobs_archive later
+    deleted_at TIMESTAMP WITH TIME ZONE,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
 -- 5. Applications Table
@@ -59,7 +66,10 @@ CREATE TABLE IF NOT EXISTS applications (
     status TEXT DEFAULT 'pending' CHECK (status IN ('pending', 'accepted', 'rejected')),
     audio_url TEXT,
     submitted_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
-    notes TEXT
+    notes TEXT,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    -- One application per worker per job (retried submissions can't duplicate it)
+    CONSTRAINT applications_job_worker_key UNIQUE (job_id, worker_id)
 );
 
 -- 6. Contracts Table
@@ -72,7 +82,9 @@ CREATE TABLE IF NOT EXISTS contracts (
     benefit_enrolled BOOLEAN DEFAULT FALSE,
     contract_pdf_url TEXT,
     status TEXT DEFAULT 'pending' CHECK (status IN ('pending', 'signed', 'completed')),
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    CONSTRAINT contracts_job_worker_key UNIQUE (job_id, worker_id)
 );
 
 -- 7. Voice Messages Table
@@ -95,19 +107,23 @@ CREATE TABLE IF NOT EXISTS analytics_logs (
     metadata JSONB
 );
 
--- 9. Demand Forecast Table
+-- 9. Demand Forecast Table (one compact summary row per generation run)
 CREATE TABLE IF NOT EXISTS demand_forecast (
     id SERIAL PRIMARY KEY,
     generated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
     num_jobs INTEGER NOT NULL,
     arrival_rate_minutes NUMERIC(10, 2) NOT NULL,
-    forecast_json JSONB,
     summary_json JSONB
 );
 
+-- 10. Demand Forecast Detail (optional generated job stream, stored column-wise)
+CREATE TABLE IF NOT EXISTS demand_forecast_detail (
+    forecast_id INTEGER PRIMARY KEY REFERENCES demand_forecast(id) ON DELETE CASCADE,
+    detail_json JSONB NOT NULL
+);
+
 -- Create indexes for better query performance
 CREATE INDEX IF NOT EXISTS idx_jobs_grower_id ON jobs(grower_id);
-CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status);
 CREATE INDEX IF NOT EXISTS idx_jobs_start_date ON jobs(start_date);
 CREATE INDEX IF NOT EXISTS idx_applications_job_id ON applications(job_id);
 CREATE INDEX IF NOT EXISTS idx_applications_worker_id ON applications(worker_id);
@@ -117,4 +133,600 @@ CREATE INDEX IF NOT EXISTS idx_contracts_worker_id ON contracts(worker_id);
 CREATE INDEX IF NOT EXISTS idx_analytics_logs_user_id ON analytics_logs(user_id);
 CREATE INDEX IF NOT EXISTS idx_analytics_logs_event_type ON analytics_logs(event_type);
 CREATE INDEX IF NOT EXISTS idx_analytics_logs_timestamp ON analytics_logs(timestamp);
+CREATE INDEX IF NOT EXISTS idx_demand_forecast_generated_at ON demand_forecast(generated_at DESC);
+
+-- Migration for databases created before forecast detail was split out:
+-- repack existing forecast_json job lists into column-wise detail, then drop the column
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_name = 'demand_forecast' AND column_name = 'forecast_json'
+    ) THEN
+        INSERT INTO demand_forecast_detail (forecast_id, detail_json)
+        SELECT f.id, jsonb_build_object(
+            'arrival_time_poisson', jsonb_agg(j->'arrival_time_poisson'),
+            'crop_type', jsonb_agg(j->'crop_type'),
+            'workers_requested', jsonb_agg(j->'workers_requested'),
+            'service_time_mins', jsonb_agg(j->'service_time_mins'),
+            'pay_rate_mxn', jsonb_agg(j->'pay_rate_mxn'),
+            'quantity_units', jsonb_agg(j->'quantity_units'),
+            'job_ids', '[]'::jsonb
+        )
+        FROM demand_forecast f, jsonb_array_elements(f.forecast_json) j
+        WHERE jsonb_typeof(f.forecast_json) = 'array'
+        GROUP BY f.id
+        ON CONFLICT (forecast_id) DO NOTHING;
+        ALTER TABLE demand_forecast DROP COLUMN forecast_json;
+    END IF;
+END $$;
+
+-- Migration for databases created before (job_id, worker_id) was unique:
+-- keep the earliest application/contract per worker and job, then add the constraints
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'contracts_job_worker_key') THEN
+        DELETE FROM contracts c
+        USING contracts earlier
+        WHERE c.job_id = earlier.job_id
+          AND c.worker_id = earlier.worker_id
+          AND c.id > earlier.id;
+        ALTER TABLE contracts ADD CONSTRAINT contracts_job_worker_key UNIQUE (job_id, worker_id);
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'applications_job_worker_key') THEN
+        DELETE FROM applications a
+        USING applications earlier
+        WHERE a.job_id = earlier.job_id
+          AND a.worker_id = earlier.worker_id
+          AND a.id > earlier.id;
+        ALTER TABLE applications ADD CONSTRAINT applications_job_worker_key UNIQUE (job_id, worker_id);
+    END IF;
+END $$;
+
+-- Migration for databases created before jobs tracked their fill level
+ALTER TABLE jobs ADD COLUMN IF NOT EXISTS applications_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE jobs ADD COLUMN IF NOT EXISTS accepted_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE jobs ADD COLUMN IF NOT EXISTS has_openings BOOLEAN
+    GENERATED ALWAYS AS (status = 'open' AND accepted_count < workers_requested) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_jobs_has_openings ON jobs(start_date DESC) WHERE has_openings;
+
+-- Keep jobs.applications_count / accepted_count in step with application writes,
+-- and close a job once its last opening is filled
+CREATE OR REPLACE FUNCTION sync_job_fill_counts() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.job_id IS NOT NULL THEN
+        UPDATE jobs
+        SET applications_count = applications_count - 1,
+            accepted_count = accepted_count - (OLD.status = 'accepted')::int
+        WHERE id = OLD.job_id;
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.job_id IS NOT NULL THEN
+        UPDATE jobs
+        SET applications_count = applications_count + 1,
+            accepted_count = accepted_count + (NEW.status = 'accepted')::int,
+            status = CASE
+                WHEN status = 'open' AND accepted_count + (NEW.status = 'accepted')::int >= workers_requested
+                    THEN 'closed'
+                ELSE status
+            END
+        WHERE id = NEW.job_id;
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS applications_fill_counts ON applications;
+CREATE TRIGGER applications_fill_counts
+    AFTER INSERT OR DELETE OR UPDATE OF job_id, status ON applications
+    FOR EACH ROW EXECUTE FUNCTION sync_job_fill_counts();
+
+-- Backfill counts (idempotent; only touches jobs whose counts are off)
+UPDATE jobs j
+SET applications_count = counts.applications,
+    accepted_count = counts.accepted
+FROM (
+    SELECT jobs.id,
+           count(a.id) AS applications,
+           count(a.id) FILTER (WHERE a.status = 'accepted') AS accepted
+    FROM jobs
+    LEFT JOIN applications a ON a.job_id = jobs.id
+    GROUP BY jobs.id
+) counts
+WHERE j.id = counts.id
+  AND (j.applications_count, j.accepted_count) IS DISTINCT FROM (counts.applications, counts.accepted);
+
+-- Earnings ledger: one append-only entry per contract completion (and a
+-- negative reversal if a completed contract is moved back). A worker's share
+-- of a job is pay_rate_mxn * quantity_units split evenly across workers_requested.
+CREATE TABLE IF NOT EXISTS earnings_ledger (
+    id BIGSERIAL PRIMARY KEY,
+    worker_id UUID NOT NULL,
+    contract_id INTEGER NOT NULL,  -- no FK: the ledger outlives deleted contracts/jobs
+    job_id INTEGER,
+    work_date DATE NOT NULL,
+    entry_type TEXT NOT NULL CHECK (entry_type IN ('earning', 'reversal')),
+    amount_mxn NUMERIC(12, 2) NOT NULL,
+    pay_rate_mxn NUMERIC(10, 2),
+    quantity_units NUMERIC(12, 2),
+    crop_type TEXT,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- Per-worker rollups maintained incrementally from the ledger
+CREATE TABLE IF NOT EXISTS worker_earnings_daily (
+    worker_id UUID NOT NULL,
+    work_date DATE NOT NULL,
+    total_mxn NUMERIC(12, 2) NOT NULL DEFAULT 0,
+    contracts_completed INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (worker_id, work_date)
+);
+
+CREATE TABLE IF NOT EXISTS worker_earnings_weekly (
+    worker_id UUID NOT NULL,
+    week_start DATE NOT NULL,  -- Monday
+    total_mxn NUMERIC(12, 2) NOT NULL DEFAULT 0,
+    days_worked INTEGER NOT NULL DEFAULT 0,
+    contracts_completed INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (worker_id, week_start)
+);
+
+CREATE TABLE IF NOT EXISTS worker_earnings_season (
+    worker_id UUID NOT NULL,
+    season INTEGER NOT NULL,  -- calendar year of the work date
+    total_mxn NUMERIC(12, 2) NOT NULL DEFAULT 0,
+    days_worked INTEGER NOT NULL DEFAULT 0,
+    contracts_completed INTEGER NOT NULL DEFAULT 0,
+    first_work_date DATE,
+    last_work_date DATE,
+    PRIMARY KEY (worker_id, season)
+);
+
+CREATE INDEX IF NOT EXISTS idx_earnings_ledger_worker_date ON earnings_ledger(worker_id, work_date DESC);
+CREATE INDEX IF NOT EXISTS idx_earnings_ledger_contract_id ON earnings_ledger(contract_id);
+
+CREATE OR REPLACE FUNCTION earnings_ledger_append_only() RETURNS TRIGGER AS $$
+BEGIN
+    RAISE EXCEPTION 'earnings_ledger is append-only; insert a reversal instead';
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS earnings_ledger_no_changes ON earnings_ledger;
+CREATE TRIGGER earnings_ledger_no_changes
+    BEFORE UPDATE OR DELETE ON earnings_ledger
+    FOR EACH ROW EXECUTE FUNCTION earnings_ledger_append_only();
+
+-- Fold each ledger entry into the daily, weekly and season rollups
+CREATE OR REPLACE FUNCTION apply_earnings_entry() RETURNS TRIGGER AS $$
+DECLARE
+    sign INTEGER := CASE WHEN NEW.entry_type = 'earning' THEN 1 ELSE -1 END;
+    day_contracts INTEGER;
+    day_delta INTEGER := 0;
+BEGIN
+    INSERT INTO worker_earnings_daily AS d (worker_id, work_date, total_mxn, contracts_completed)
+    VALUES (NEW.worker_id, NEW.work_date, NEW.amount_mxn, sign)
+    ON CONFLICT (worker_id, work_date) DO UPDATE
+    SET total_mxn = d.total_mxn + EXCLUDED.total_mxn,
+        contracts_completed = d.contracts_completed + EXCLUDED.contracts_completed
+    RETURNING contracts_completed INTO day_contracts;
+
+    -- A day counts as worked while it has at least one completed contract
+    IF sign = 1 AND day_contracts = 1 THEN
+        day_delta := 1;
+    ELSIF sign = -1 AND day_contracts = 0 THEN
+        day_delta := -1;
+    END IF;
+
+    INSERT INTO worker_earnings_weekly AS w (worker_id, week_start, total_mxn, days_worked, contracts_completed)
+    VALUES (NEW.worker_id, date_trunc('week', NEW.work_date)::date, NEW.amount_mxn, day_delta, sign)
+    ON CONFLICT (worker_id, week_start) DO UPDATE
+    SET total_mxn = w.total_mxn + EXCLUDED.total_mxn,
+        days_worked = w.days_worked + EXCLUDED.days_worked,
+        contracts_completed = w.contracts_completed + EXCLUDED.contracts_completed;
+
+    INSERT INTO worker_earnings_season AS s
+        (worker_id, season, total_mxn, days_worked, contracts_completed, first_work_date, last_work_date)
+    VALUES (NEW.worker_id, extract(year FROM NEW.work_date)::int, NEW.amount_mxn, day_delta, sign,
+            NEW.work_date, NEW.work_date)
+    ON CONFLICT (worker_id, season) DO UPDATE
+    SET total_mxn = s.total_mxn + EXCLUDED.total_mxn,
+        days_worked = s.days_worked + EXCLUDED.days_worked,
+        contracts_completed = s.contracts_completed + EXCLUDED.contracts_completed,
+        first_work_date = LEAST(s.first_work_date, EXCLUDED.first_work_date),
+        last_work_date = GREATEST(s.last_work_date, EXCLUDED.last_work_date);
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS earnings_ledger_rollups ON earnings_ledger;
+CREATE TRIGGER earnings_ledger_rollups
+    AFTER INSERT ON earnings_ledger
+    FOR EACH ROW EXECUTE FUNCTION apply_earnings_entry();
+
+-- Write ledger entries when a contract enters or leaves 'completed'
+CREATE OR REPLACE FUNCTION record_contract_earnings() RETURNS TRIGGER AS $$
+DECLARE
+    entry_type TEXT;
+BEGIN
+    IF NEW.worker_id IS NULL THEN
+        RETURN NULL;
+    END IF;
+    IF NEW.status = 'completed' AND (TG_OP = 'INSERT' OR OLD.status IS DISTINCT FROM 'completed') THEN
+        entry_type := 'earning';
+    ELSIF TG_OP = 'UPDATE' AND OLD.status = 'completed' AND NEW.status <> 'completed' THEN
+        entry_type := 'reversal';
+    ELSE
+        RETURN NULL;
+    END IF;
+
+    INSERT INTO earnings_ledger
+        (worker_id, contract_id, job_id, work_date, entry_type, amount_mxn, pay_rate_mxn, quantity_units, crop_type)
+    SELECT NEW.worker_id, NEW.id, j.id, j.start_date, entry_type,
+           round(j.pay_rate_mxn * j.quantity_units / GREATEST(j.workers_requested, 1), 2)
+               * CASE WHEN entry_type = 'earning' THEN 1 ELSE -1 END,
+           j.pay_rate_mxn,
+           round(j.quantity_units::numeric / GREATEST(j.workers_requested, 1), 2),
+           j.crop_type
+    FROM jobs j
+    WHERE j.id = NEW.job_id;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS contracts_earnings ON contracts;
+CREATE TRIGGER contracts_earnings
+    AFTER INSERT OR UPDATE OF status ON contracts
+    FOR EACH ROW EXECUTE FUNCTION record_contract_earnings();
+
+-- Backfill: ledger entries for contracts completed before the ledger existed
+INSERT INTO earnings_ledger
+    (worker_id, contract_id, job_id, work_date, entry_type, amount_mxn, pay_rate_mxn, quantity_units, crop_type)
+SELECT c.worker_id, c.id, j.id, j.start_date, 'earning',
+       round(j.pay_rate_mxn * j.quantity_units / GREATEST(j.workers_requested, 1), 2),
+       j.pay_rate_mxn,
+       round(j.quantity_units::numeric / GREATEST(j.workers_requested, 1), 2),
+       j.crop_type
+FROM contracts c
+JOIN jobs j ON j.id = c.job_id
+WHERE c.status = 'completed'
+  AND c.worker_id IS NOT NULL
+  AND NOT EXISTS (SELECT 1 FROM earnings_ledger l WHERE l.contract_id = c.id);
+
+-- Soft delete and archive tiering.
+-- Deleting a job marks it cancelled (deleted_at set) instead of cascading
+-- through applications and contracts. archive_closed_jobs() later moves
+-- closed/cancelled jobs with their applications and contracts into archive
+-- tables partitioned by season (year of start_date), keeping the hot tables
+-- and their indexes limited to current work.
+ALTER TABLE jobs ADD COLUMN IF NOT EXISTS deleted_at TIMESTAMP WITH TIME ZONE;
+
+-- Job listings filter on status and sort by start_date over live jobs only
+DROP INDEX IF EXISTS idx_jobs_status;
+CREATE INDEX IF NOT EXISTS idx_jobs_live_status_start_date ON jobs(status, start_date DESC) WHERE deleted_at IS NULL;
+
+CREATE TABLE IF NOT EXISTS jobs_archive (
+    season INTEGER NOT NULL,
+    id INTEGER NOT NULL,
+    grower_id UUID,
+    title TEXT NOT NULL,
+    crop_type TEXT NOT NULL,
+    pay_rate_mxn NUMERIC(10, 2) NOT NULL,
+    quantity_units INTEGER NOT NULL,
+    unit_type TEXT NOT NULL,
+    workers_requested INTEGER NOT NULL,
+    start_date DATE NOT NULL,
+    description TEXT,
+    status TEXT,
+    service_time_mins NUMERIC(10, 2),
+    arrival_time_poisson NUMERIC(10, 2),
+    applications_count INTEGER NOT NULL DEFAULT 0,
+    accepted_count INTEGER NOT NULL DEFAULT 0,
+    deleted_at TIMESTAMP WITH TIME ZONE,
+    created_at TIMESTAMP WITH TIME ZONE,
+    archived_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (season, id)
+) PARTITION BY LIST (season);
+
+CREATE TABLE IF NOT EXISTS applications_archive (
+    season INTEGER NOT NULL,
+    id INTEGER NOT NULL,
+    job_id INTEGER,
+    worker_id UUID,
+    status TEXT,
+    audio_url TEXT,
+    submitted_at TIMESTAMP WITH TIME ZONE,
+    notes TEXT,
+    archived_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (season, id)
+) PARTITION BY LIST (season);
+
+CREATE TABLE IF NOT EXISTS contracts_archive (
+    season INTEGER NOT NULL,
+    id INTEGER NOT NULL,
+    job_id INTEGER,
+    worker_id UUID,
+    application_id INTEGER,
+    signed_at TIMESTAMP WITH TIME ZONE,
+    benefit_enrolled BOOLEAN,
+    contract_pdf_url TEXT,
+    status TEXT,
+    created_at TIMESTAMP WITH TIME ZONE,
+    archived_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (season, id)
+) PARTITION BY LIST (season);
+
+-- Partitioned indexes; each season partition gets its own copy
+CREATE INDEX IF NOT EXISTS idx_jobs_archive_grower_id ON jobs_archive(grower_id);
+CREATE INDEX IF NOT EXISTS idx_applications_archive_job_id ON applications_archive(job_id);
+CREATE INDEX IF NOT EXISTS idx_applications_archive_worker_id ON applications_archive(worker_id);
+CREATE INDEX IF NOT EXISTS idx_contracts_archive_job_id ON contracts_archive(job_id);
+CREATE INDEX IF NOT EXISTS idx_contracts_archive_worker_id ON contracts_archive(worker_id);
+
+-- Move up to batch_size archivable jobs (closed and started more than
+-- older_than_days ago, or deleted more than older_than_days ago) and their
+-- applications and contracts into the archive. Call repeatedly until
+-- jobs_archived < batch_size, e.g. from POST /jobs/archive or pg_cron:
+--   SELECT cron.schedule('archive-jobs', '15 3 * * *', 'SELECT archive_closed_jobs()');
+CREATE OR REPLACE FUNCTION archive_closed_jobs(older_than_days INTEGER DEFAULT 30, batch_size INTEGER DEFAULT 1000)
+RETURNS JSONB AS $$
+DECLARE
+    cutoff DATE := current_date - older_than_days;
+    job_ids INTEGER[];
+    season_value INTEGER;
+    archived_jobs INTEGER := 0;
+    archived_applications INTEGER := 0;
+    archived_contracts INTEGER := 0;
+BEGIN
+    -- One archiver at a time; a concurrent call returns immediately
+    IF NOT pg_try_advisory_xact_lock(hashtext('archive_closed_jobs')) THEN
+        RETURN jsonb_build_object('jobs_archived', 0, 'applications_archived', 0,
+                                  'contracts_archived', 0, 'skipped', true);
+    END IF;
+
+    SELECT array_agg(id) INTO job_ids
+    FROM (
+        SELECT id FROM jobs
+        WHERE (status = 'closed' AND start_date < cutoff)
+           OR (status = 'cancelled' AND COALESCE(deleted_at::date, start_date) < cutoff)
+        ORDER BY id
+        LIMIT batch_size
+        FOR UPDATE SKIP LOCKED
+    ) batch;
+
+    IF job_ids IS NULL THEN
+        RETURN jsonb_build_object('jobs_archived', 0, 'applications_archived', 0, 'contracts_archived', 0);
+    END IF;
+
+    FOR season_value IN
+        SELECT DISTINCT extract(year FROM start_date)::int FROM jobs WHERE id = ANY(job_ids)
+    LOOP
+        EXECUTE format('CREATE TABLE IF NOT EXISTS %I PARTITION OF jobs_archive FOR VALUES IN (%s)',
+                       'jobs_archive_' || season_value, season_value);
+        EXECUTE format('CREATE TABLE IF NOT EXISTS %I PARTITION OF applications_archive FOR VALUES IN (%s)',
+                       'applications_archive_' || season_value, season_value);
+        EXECUTE format('CREATE TABLE IF NOT EXISTS %I PARTITION OF contracts_archive FOR VALUES IN (%s)',
+                       'contracts_archive_' || season_value, season_value);
+    END LOOP;
+
+    INSERT INTO jobs_archive
+        (season, id, grower_id, title, crop_type, pay_rate_mxn, quantity_units, unit_type, workers_requested,
+         start_date, description, status, service_time_mins, arrival_time_poisson, applications_count,
+         accepted_count, deleted_at, created_at)
+    SELECT extract(year FROM start_date)::int, id, grower_id, title, crop_type, pay_rate_mxn, quantity_units,
+           unit_type, workers_requested, start_date, description, status, service_time_mins, arrival_time_poisson,
+           applications_count, accepted_count, deleted_at, created_at
+    FROM jobs WHERE id = ANY(job_ids)
+    ON CONFLICT DO NOTHING;
+    GET DIAGNOSTICS archived_jobs = ROW_COUNT;
+
+    INSERT INTO applications_archive (season, id, job_id, worker_id, status, audio_url, submitted_at, notes)
+    SELECT extract(year FROM j.start_date)::int, a.id, a.job_id, a.worker_id, a.status, a.audio_url,
+           a.submitted_at, a.notes
+    FROM applications a JOIN jobs j ON j.id = a.job_id
+    WHERE a.job_id = ANY(job_ids)
+    ON CONFLICT DO NOTHING;
+    GET DIAGNOSTICS archived_applications = ROW_COUNT;
+
+    INSERT INTO contracts_archive
+        (season, id, job_id, worker_id, application_id, signed_at, benefit_enrolled, contract_pdf_url, status, created_at)
+    SELECT extract(year FROM j.start_date)::int, c.id, c.job_id, c.worker_id, c.application_id, c.signed_at,
+           c.benefit_enrolled, c.contract_pdf_url, c.status, c.created_at
+    FROM contracts c JOIN jobs j ON j.id = c.job_id
+    WHERE c.job_id = ANY(job_ids)
+    ON CONFLICT DO NOTHING;
+    GET DIAGNOSTICS archived_contracts = ROW_COUNT;
+
+    -- Children first, so the cascade from jobs has nothing left to do
+    DELETE FROM contracts WHERE job_id = ANY(job_ids);
+    DELETE FROM applications WHERE job_id = ANY(job_ids);
+    DELETE FROM jobs WHERE id = ANY(job_ids);
+
+    RETURN jsonb_build_object('jobs_archived', archived_jobs, 'applications_archived', archived_applications,
+                              'contracts_archived', archived_contracts);
+END;
+$$ LANGUAGE plpgsql;
+
+-- Per-job application counts for the grower dashboard, grouped in the
+-- database. grower_id is a grouping column so a grower_id filter is applied
+-- before aggregation.
+CREATE OR REPLACE VIEW grower_job_stats WITH (security_invoker = true) AS
+SELECT j.id AS job_id,
+       j.grower_id,
+       j.title,
+       j.crop_type,
+       j.start_date,
+       j.status,
+       j.workers_requested,
+       count(a.id) AS applications_count,
+       count(a.id) FILTER (WHERE a.status = 'pending') AS pending_count,
+       count(a.id) FILTER (WHERE a.status = 'accepted') AS accepted_count,
+       count(a.id) FILTER (WHERE a.status = 'rejected') AS rejected_count,
+       max(a.submitted_at) AS latest_application_at
+FROM jobs j
+LEFT JOIN applications a ON a.job_id = j.id
+WHERE j.deleted_at IS NULL
+GROUP BY j.id, j.grower_id;
+
+-- Change tracking for offline sync (GET /sync).
+-- Every insert, update and delete on jobs, applications and contracts appends
+-- a change_log row; a sync token is the last change_log id a device has seen,
+-- so a reconnect reads only the changes after it. Application and contract
+-- changes carry the worker they belong to.
+ALTER TABLE jobs ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW();
+ALTER TABLE applications ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW();
+ALTER TABLE contracts ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW();
+
+CREATE TABLE IF NOT EXISTS change_log (
+    id BIGSERIAL PRIMARY KEY,
+    table_name TEXT NOT NULL CHECK (table_name IN ('jobs', 'applications', 'contracts')),
+    row_id INTEGER NOT NULL,
+    worker_id UUID,
+    op TEXT NOT NULL CHECK (op IN ('upsert', 'delete')),
+    changed_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT clock_timestamp()
+);
+
+CREATE INDEX IF NOT EXISTS idx_change_log_worker_id ON change_log(worker_id, id);
+CREATE INDEX IF NOT EXISTS idx_change_log_changed_at ON change_log(changed_at);
+
+CREATE OR REPLACE FUNCTION touch_updated_at() RETURNS TRIGGER AS $$
+BEGIN
+    NEW.updated_at := NOW();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION log_change() RETURNS TRIGGER AS $$
+DECLARE
+    changed RECORD := CASE WHEN TG_OP = 'DELETE' THEN OLD ELSE NEW END;
+    worker UUID;
+    op TEXT := CASE WHEN TG_OP = 'DELETE' THEN 'delete' ELSE 'upsert' END;
+BEGIN
+    IF TG_TABLE_NAME = 'jobs' THEN
+        -- A soft-deleted job is gone as far as devices are concerned
+        IF TG_OP <> 'DELETE' AND changed.deleted_at IS NOT NULL THEN
+            op := 'delete';
+        END IF;
+    ELSE
+        worker := changed.worker_id;
+    END IF;
+
+    INSERT INTO change_log (table_name, row_id, worker_id, op)
+    VALUES (TG_TABLE_NAME, changed.id, worker, op);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS jobs_touch_updated_at ON jobs;
+CREATE TRIGGER jobs_touch_updated_at BEFORE UPDATE ON jobs
+    FOR EACH ROW EXECUTE FUNCTION touch_updated_at();
+DROP TRIGGER IF EXISTS applications_touch_updated_at ON applications;
+CREATE TRIGGER applications_touch_updated_at BEFORE UPDATE ON applications
+    FOR EACH ROW EXECUTE FUNCTION touch_updated_at();
+DROP TRIGGER IF EXISTS contracts_touch_updated_at ON contracts;
+CREATE TRIGGER contracts_touch_updated_at BEFORE UPDATE ON contracts
+    FOR EACH ROW EXECUTE FUNCTION touch_updated_at();
+
+DROP TRIGGER IF EXISTS jobs_log_change ON jobs;
+CREATE TRIGGER jobs_log_change AFTER INSERT OR UPDATE OR DELETE ON jobs
+    FOR EACH ROW EXECUTE FUNCTION log_change();
+DROP TRIGGER IF EXISTS applications_log_change ON applications;
+CREATE TRIGGER applications_log_change AFTER INSERT OR UPDATE OR DELETE ON applications
+    FOR EACH ROW EXECUTE FUNCTION log_change();
+DROP TRIGGER IF EXISTS contracts_log_change ON contracts;
+CREATE TRIGGER contracts_log_change AFTER INSERT OR UPDATE OR DELETE ON contracts
+    FOR EACH ROW EXECUTE FUNCTION log_change();
+
+-- Job lifecycle (lifecycle.py).
+-- Jobs whose start date has passed are closed and signed contracts are
+-- completed once the job's service time is over, in batches, so the open set
+-- (and idx_jobs_has_openings / idx_jobs_live_status_start_date) only covers
+-- current work. A lease row makes sure only one replica runs the sweep.
+CREATE TABLE IF NOT EXISTS worker_leases (
+    name TEXT PRIMARY KEY,
+    holder TEXT NOT NULL,
+    expires_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    acquired_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW()
+);
+
+-- Take or renew the named lease for ttl_seconds. Returns false while another
+-- holder's lease is unexpired.
+CREATE OR REPLACE FUNCTION acquire_lease(lease_name TEXT, holder_id TEXT, ttl_seconds INTEGER DEFAULT 60)
+RETURNS BOOLEAN AS $$
+BEGIN
+    INSERT INTO worker_leases (name, holder, expires_at)
+    VALUES (lease_name, holder_id, NOW() + make_interval(secs => ttl_seconds))
+    ON CONFLICT (name) DO UPDATE
+        SET holder = EXCLUDED.holder,
+            expires_at = EXCLUDED.expires_at,
+            acquired_at = CASE WHEN worker_leases.holder = EXCLUDED.holder
+                               THEN worker_leases.acquired_at ELSE NOW() END
+        WHERE worker_leases.holder = EXCLUDED.holder OR worker_leases.expires_at < NOW();
+    RETURN FOUND;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION release_lease(lease_name TEXT, holder_id TEXT)
+RETURNS BOOLEAN AS $$
+BEGIN
+    DELETE FROM worker_leases WHERE name = lease_name AND holder = holder_id;
+    RETURN FOUND;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Close up to batch_size open jobs that started before as_of. Call repeatedly
+-- until closed < batch_size.
+CREATE OR REPLACE FUNCTION close_expired_jobs(batch_size INTEGER DEFAULT 1000, as_of DATE DEFAULT current_date)
+RETURNS JSONB AS $$
+DECLARE
+    closed_ids INTEGER[];
+BEGIN
+    WITH batch AS (
+        SELECT id FROM jobs
+        WHERE status = 'open' AND deleted_at IS NULL AND start_date < as_of
+        ORDER BY start_date
+        LIMIT batch_size
+        FOR UPDATE SKIP LOCKED
+    ), closed AS (
+        UPDATE jobs j SET status = 'closed'
+        FROM batch WHERE j.id = batch.id
+        RETURNING j.id
+    )
+    SELECT array_agg(id) INTO closed_ids FROM closed;
+
+    RETURN jsonb_build_object('closed', COALESCE(cardinality(closed_ids), 0),
+                              'job_ids', COALESCE(to_jsonb(closed_ids), '[]'::jsonb));
+END;
+$$ LANGUAGE plpgsql;
+
+-- Complete up to batch_size signed contracts whose job (start date plus
+-- service_time_mins) is over; the contracts_earnings trigger writes their
+-- ledger entries. Call repeatedly until completed < batch_size.
+CREATE OR REPLACE FUNCTION complete_finished_contracts(batch_size INTEGER DEFAULT 1000)
+RETURNS JSONB AS $$
+DECLARE
+    completed_count INTEGER;
+BEGIN
+    WITH batch AS (
+        SELECT c.id FROM contracts c
+        JOIN jobs j ON j.id = c.job_id
+        WHERE c.status = 'signed'
+          AND j.status <> 'cancelled'
+          AND j.start_date + make_interval(mins => COALESCE(j.service_time_mins, 0)::integer) < NOW()
+        ORDER BY c.id
+        LIMIT batch_size
+        FOR UPDATE OF c SKIP LOCKED
+    )
+    UPDATE contracts c SET status = 'completed'
+    FROM batch WHERE c.id = batch.id;
+    GET DIAGNOSTICS completed_count = ROW_COUNT;
+
+    RETURN jsonb_build_object('completed', completed_count);
+END;
+$$ LANGUAGE plpgsql;
 
+-- The contract sweep only looks at signed contracts
+CREATE INDEX IF NOT EXISTS idx_contracts_signed_job_id ON contracts(job_id) WHERE status = 'signed';
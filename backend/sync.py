@@ -0,0 +1,178 @@
+"""
+Delta sync for offline-first worker devices.
+Triggers append a `change_log` row for every write to jobs, applications and
+contracts. A device keeps the token from its last sync and sends it back;
+only rows changed since then are read and returned (open jobs, plus the
+caller's own applications and contracts). A device with no token, or one
+older than the change log's retention, gets a full snapshot instead.
+
+Tokens only advance past changes older than SYNC_SETTLE_SECONDS, so a write
+whose change_log id was allocated before a concurrent one but committed after
+it is still picked up on the next sync; recent changes may be sent twice and
+should be applied as upserts.
+"""
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from search import fetch_all_jobs
+
+# Change log rows read per sync; a device with more pending calls again
+SYNC_PAGE_SIZE = int(os.getenv("SYNC_PAGE_SIZE", "500"))
+SYNC_SETTLE_SECONDS = float(os.getenv("SYNC_SETTLE_SECONDS", "10"))
+CHANGE_LOG_RETENTION_DAYS = int(os.getenv("CHANGE_LOG_RETENTION_DAYS", "30"))
+
+# Rows per `in.(...)` filter, keeping request URLs short
+ID_CHUNK_SIZE = 200
+
+SYNCED_TABLES = ('jobs', 'applications', 'contracts')
+
+
+def encode_token(change_id: int, issued_at: Optional[datetime] = None) -> str:
+    issued_at = issued_at or datetime.now(timezone.utc)
+    return f"{change_id}.{int(issued_at.timestamp())}"
+
+
+def decode_token(token: str) -> Tuple[int, datetime]:
+    """
+    Split a sync token into the last change_log id and when it was issued.
+
+    Raises:
+        ValueError: If the token is malformed
+    """
+    change_id, issued = token.split('.', 1)
+    change_id = int(change_id)
+    if change_id < 0:
+        raise ValueError("negative change id")
+    return change_id, datetime.fromtimestamp(int(issued), tz=timezone.utc)
+
+
+def token_expired(issued_at: datetime, retention_days: int = CHANGE_LOG_RETENTION_DAYS) -> bool:
+    """Whether changes after this token may already have been pruned from the log."""
+    oldest_kept = datetime.now(timezone.utc) - timedelta(days=retention_days)
+    return issued_at - timedelta(seconds=SYNC_SETTLE_SECONDS) < oldest_kept
+
+
+def _parse_time(value: str) -> datetime:
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+def _fetch_by_ids(client, table: str, ids: List[int], worker_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    rows: List[Dict[str, Any]] = []
+    for start in range(0, len(ids), ID_CHUNK_SIZE):
+        query = client.table(table).select("*").in_("id", ids[start:start + ID_CHUNK_SIZE])
+        if worker_id:
+            query = query.eq("worker_id", worker_id)
+        rows.extend(query.execute().data or [])
+    return rows
+
+
+def _split_jobs(rows: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[int]]:
+    """Open live jobs, and the ids of jobs a device should drop."""
+    listed, removed = [], []
+    for job in rows:
+        if job.get('status') == 'open' and not job.get('deleted_at'):
+            listed.append(job)
+        else:
+            removed.append(job['id'])
+    return listed, removed
+
+
+def snapshot(client, worker_id: Optional[str]) -> Dict[str, Any]:
+    """
+    Full state for a device without a usable token.
+
+    The token is taken before the rows are read, so anything written while
+    the snapshot is assembled is delivered again by the next delta.
+    """
+    settled_before = (datetime.now(timezone.utc) - timedelta(seconds=SYNC_SETTLE_SECONDS)).isoformat()
+    latest = (
+        client.table("change_log")
+        .select("id")
+        .lt("changed_at", settled_before)
+        .order("id", desc=True)
+        .limit(1)
+        .execute()
+    ).data
+    token = latest[0]['id'] if latest else 0
+
+    jobs, _ = _split_jobs(fetch_all_jobs(client, columns="*"))
+    result = {
+        'token': encode_token(token),
+        'reset': True,
+        'has_more': False,
+        'jobs': {'upserted': jobs, 'deleted': []},
+        'applications': {'upserted': [], 'deleted': []},
+        'contracts': {'upserted': [], 'deleted': []},
+    }
+    if worker_id:
+        for table in ('applications', 'contracts'):
+            rows = client.table(table).select("*").eq("worker_id", worker_id).order("id").execute().data or []
+            result[table]['upserted'] = rows
+    return result
+
+
+def changes_since(client, since: int, worker_id: Optional[str], limit: int = SYNC_PAGE_SIZE) -> Dict[str, Any]:
+    """
+    Rows created, updated or deleted after change `since`.
+
+    Args:
+        client: Supabase client
+        since: Last change_log id the device has applied
+        worker_id: Caller; their application/contract changes are included
+        limit: Maximum change_log rows read
+
+    Returns:
+        Dictionary with the next token, has_more, and per table the current
+        version of changed rows ('upserted') and ids to drop ('deleted')
+    """
+    query = client.table("change_log").select("id, table_name, row_id, op, changed_at").gt("id", since)
+    if worker_id:
+        query = query.or_(f"worker_id.is.null,worker_id.eq.{worker_id}")
+    else:
+        query = query.is_("worker_id", "null")
+    changes = query.order("id").limit(limit).execute().data or []
+
+    # Advance only over the settled prefix; later changes come again next time
+    settled_before = datetime.now(timezone.utc) - timedelta(seconds=SYNC_SETTLE_SECONDS)
+    token = since
+    for change in changes:
+        if _parse_time(change['changed_at']) >= settled_before:
+            break
+        token = change['id']
+
+    # Only the latest change per row matters
+    latest: Dict[str, Dict[int, str]] = {table: {} for table in SYNCED_TABLES}
+    for change in changes:
+        latest[change['table_name']][change['row_id']] = change['op']
+
+    result: Dict[str, Any] = {
+        'token': encode_token(token),
+        'reset': False,
+        # A full page that moved the token means more changes are waiting
+        'has_more': len(changes) == limit and token > since,
+    }
+    for table in SYNCED_TABLES:
+        upsert_ids = [row_id for row_id, op in latest[table].items() if op == 'upsert']
+        deleted = {row_id for row_id, op in latest[table].items() if op == 'delete'}
+        owner = worker_id if table != 'jobs' else None
+        rows = _fetch_by_ids(client, table, upsert_ids, owner) if upsert_ids else []
+        if table == 'jobs':
+            rows, removed = _split_jobs(rows)
+            deleted.update(removed)
+        # Rows deleted (or archived) after the change was logged
+        found = {row['id'] for row in rows}
+        deleted.update(row_id for row_id in upsert_ids if row_id not in found)
+        result[table] = {'upserted': rows, 'deleted': sorted(deleted)}
+    return result
+
+
+def compact_change_log(client, retention_days: int = CHANGE_LOG_RETENTION_DAYS) -> int:
+    """Delete change_log rows older than the retention window; returns the number removed."""
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=retention_days)).isoformat()
+    return (
+        client.table("change_log")
+        .delete(count="exact", returning="minimal")
+        .lt("changed_at", cutoff)
+        .execute()
+    ).count or 0
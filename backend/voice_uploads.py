@@ -0,0 +1,386 @@
+"""
+Resumable voice-application uploads.
+Clients create an upload session, then send the recording in chunks with an
+`Upload-Offset` header; each chunk is streamed straight to disk, so a dropped
+connection resumes from the last stored byte instead of starting over. Once
+the last byte arrives the file is handed to a background pool that converts
+it to compact mono Opus (when ffmpeg is available), measures its duration,
+uploads it to storage and records a `voice_messages` row.
+
+Chunks for one upload are appended one at a time (a per-upload lock), and file
+I/O runs in a thread so large chunks don't stall the event loop. On startup,
+sessions a previous process left in 'processing' are queued again; a
+processor first takes an exclusive lock on the upload's `.claim` file, so with
+several workers or replicas sharing VOICE_UPLOAD_DIR each upload is processed
+once (the lock goes away with a process that dies). A periodic sweep removes sessions (and their partial files) that have been idle
+for VOICE_UPLOAD_TTL_SECONDS.
+"""
+import asyncio
+import fcntl
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+import wave
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+UPLOAD_DIR = Path(os.getenv("VOICE_UPLOAD_DIR", Path(tempfile.gettempdir()) / "voice-uploads"))
+MAX_UPLOAD_BYTES = int(os.getenv("VOICE_UPLOAD_MAX_BYTES", 20 * 1024 * 1024))
+TRANSCODE_WORKERS = int(os.getenv("VOICE_TRANSCODE_WORKERS", 2))
+STORAGE_BUCKET = "voice-applications"
+# Sessions idle this long are removed, along with their partial files
+UPLOAD_TTL_SECONDS = float(os.getenv("VOICE_UPLOAD_TTL_SECONDS", 24 * 3600))
+SWEEP_INTERVAL_SECONDS = 600
+
+# Suggested chunk size for clients on slow mobile links
+CHUNK_SIZE = 256 * 1024
+
+# Voice-tuned Opus: mono, 16 kHz, 24 kbps is plenty for speech
+FFMPEG_ARGS = ["-vn", "-ac", "1", "-ar", "16000", "-c:a", "libopus", "-b:a", "24k", "-application", "voip"]
+
+_executor = ThreadPoolExecutor(max_workers=TRANSCODE_WORKERS, thread_name_prefix="voice-transcode")
+_session_lock = threading.Lock()
+# One asyncio.Lock per upload being written; entries go away with their last user
+_upload_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+_sweep_task: Optional[asyncio.Task] = None
+
+
+class UploadError(Exception):
+    """Raised for invalid upload requests; carries the HTTP status to return."""
+
+    def __init__(self, status_code: int, detail: str, offset: Optional[int] = None):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.offset = offset
+
+
+def _session_path(upload_id: str) -> Path:
+    return UPLOAD_DIR / f"{upload_id}.json"
+
+
+def _data_path(upload_id: str) -> Path:
+    return UPLOAD_DIR / f"{upload_id}.part"
+
+
+def _claim_path(upload_id: str) -> Path:
+    return UPLOAD_DIR / f"{upload_id}.claim"
+
+
+def _save_session(session: Dict[str, Any]) -> None:
+    # Write-then-rename so a crash never leaves a half-written session file
+    path = _session_path(session['upload_id'])
+    tmp_path = path.with_suffix('.json.tmp')
+    tmp_path.write_text(json.dumps(session))
+    tmp_path.replace(path)
+
+
+def _store_session(session: Dict[str, Any]) -> None:
+    with _session_lock:
+        _save_session(session)
+
+
+def load_session(upload_id: str) -> Dict[str, Any]:
+    """Load an upload session from disk."""
+    try:
+        uuid.UUID(upload_id)
+    except ValueError:
+        raise UploadError(404, "Upload not found")
+    path = _session_path(upload_id)
+    if not path.exists():
+        raise UploadError(404, "Upload not found")
+    session = json.loads(path.read_text())
+    data_path = _data_path(upload_id)
+    # The bytes on disk are the source of truth for the resume offset
+    if session['status'] == 'uploading':
+        session['offset'] = data_path.stat().st_size if data_path.exists() else 0
+    return session
+
+
+def create_session(
+    total_size: int,
+    content_type: str,
+    worker_id: Optional[str] = None,
+    application_id: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Start a new upload session and reserve its file on disk."""
+    if total_size <= 0:
+        raise UploadError(400, "total_size must be greater than 0")
+    if total_size > MAX_UPLOAD_BYTES:
+        raise UploadError(413, f"Recording too large (max {MAX_UPLOAD_BYTES} bytes)")
+    if not content_type.startswith("audio/"):
+        raise UploadError(415, "Only audio uploads are accepted")
+
+    UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+    upload_id = str(uuid.uuid4())
+    _data_path(upload_id).touch()
+    session = {
+        'upload_id': upload_id,
+        'total_size': total_size,
+        'content_type': content_type,
+        'worker_id': worker_id,
+        'application_id': application_id,
+        'offset': 0,
+        'status': 'uploading',  # 'uploading', 'processing', 'complete', 'failed'
+        'audio_url': None,
+        'duration_seconds': None,
+        'error': None,
+    }
+    _save_session(session)
+    return session
+
+
+def _upload_lock(upload_id: str) -> asyncio.Lock:
+    lock = _upload_locks.get(upload_id)
+    if lock is None:
+        lock = _upload_locks[upload_id] = asyncio.Lock()
+    return lock
+
+
+async def append_chunk(upload_id: str, offset: int, chunks) -> Dict[str, Any]:
+    """
+    Append a chunk streamed from the request body at `offset`.
+
+    Concurrent requests for the same upload are serialized; the session is
+    (re)loaded and checked only once the lock is held, so a retried chunk
+    can't interleave with the original or queue the upload twice.
+
+    Args:
+        upload_id: Upload session ID
+        offset: Byte offset the client believes it is resuming from
+        chunks: Async iterator of body bytes (e.g. `request.stream()`)
+
+    Returns:
+        The updated session. When the final byte is written the session moves
+        to 'processing' and the file is queued for transcoding.
+    """
+    async with _upload_lock(upload_id):
+        session = await asyncio.to_thread(load_session, upload_id)
+        if session['status'] != 'uploading':
+            raise UploadError(409, f"Upload is already {session['status']}", session['offset'])
+        if offset != session['offset']:
+            raise UploadError(409, "Upload-Offset does not match stored offset", session['offset'])
+
+        written = session['offset']
+        f = await asyncio.to_thread(open, _data_path(upload_id), 'r+b')
+        try:
+            await asyncio.to_thread(f.seek, written)
+            async for chunk in chunks:
+                if written + len(chunk) > session['total_size']:
+                    await asyncio.to_thread(f.truncate, session['offset'])
+                    raise UploadError(413, "Chunk exceeds declared total_size", session['offset'])
+                await asyncio.to_thread(f.write, chunk)
+                written += len(chunk)
+        finally:
+            await asyncio.to_thread(f.close)
+
+        session['offset'] = written
+        if written == session['total_size']:
+            session['status'] = 'processing'
+            await asyncio.to_thread(_store_session, session)
+            _executor.submit(_process_upload, upload_id)
+    return session
+
+
+def requeue_processing() -> List[str]:
+    """
+    Queue sessions left in 'processing' by a previous process (e.g. after a restart).
+    Every worker does this at startup; `_process_upload` skips uploads another
+    process has claimed or already finished.
+    """
+    requeued = []
+    if not UPLOAD_DIR.exists():
+        return requeued
+    for path in UPLOAD_DIR.glob('*.json'):
+        try:
+            session = json.loads(path.read_text())
+        except (OSError, ValueError):
+            continue
+        if session.get('status') == 'processing':
+            _executor.submit(_process_upload, session['upload_id'])
+            requeued.append(session['upload_id'])
+    return requeued
+
+
+def sweep_expired(ttl_seconds: float = UPLOAD_TTL_SECONDS) -> int:
+    """
+    Delete sessions idle for longer than `ttl_seconds` and files left without a session.
+
+    Sessions still 'processing' are kept; `requeue_processing` owns those.
+
+    Returns:
+        Number of uploads removed
+    """
+    if not UPLOAD_DIR.exists():
+        return 0
+    cutoff = time.time() - ttl_seconds
+    removed = 0
+    for path in list(UPLOAD_DIR.iterdir()):
+        upload_id = path.name.split('.', 1)[0]
+        session_path = _session_path(upload_id)
+        try:
+            if path != session_path:
+                # Partial, transcoded or temp file; only orphans are removed here
+                if not session_path.exists() and path.stat().st_mtime < cutoff:
+                    path.unlink(missing_ok=True)
+                continue
+            data_path = _data_path(upload_id)
+            last_active = max(path.stat().st_mtime, data_path.stat().st_mtime if data_path.exists() else 0)
+            if last_active >= cutoff or json.loads(path.read_text()).get('status') == 'processing':
+                continue
+            for stale in UPLOAD_DIR.glob(f"{upload_id}.*"):
+                stale.unlink(missing_ok=True)
+            removed += 1
+        except FileNotFoundError:
+            continue  # already removed with its session
+        except (OSError, ValueError) as e:
+            print(f"Warning: Could not sweep voice upload {path.name}: {e}")
+    return removed
+
+
+async def _sweep_loop() -> None:
+    while True:
+        try:
+            removed = await asyncio.to_thread(sweep_expired)
+            if removed:
+                print(f"Removed {removed} expired voice uploads")
+        except Exception as e:
+            print(f"Warning: Voice upload sweep failed: {e}")
+        await asyncio.sleep(SWEEP_INTERVAL_SECONDS)
+
+
+async def start() -> None:
+    """Re-queue interrupted processing and start the expiry sweep (called from the app lifespan)."""
+    global _sweep_task
+    try:
+        requeued = await asyncio.to_thread(requeue_processing)
+        if requeued:
+            print(f"Re-queued {len(requeued)} voice uploads left in processing")
+    except Exception as e:
+        print(f"Warning: Could not re-queue voice uploads: {e}")
+    if _sweep_task is None:
+        _sweep_task = asyncio.create_task(_sweep_loop())
+
+
+async def stop() -> None:
+    global _sweep_task
+    task, _sweep_task = _sweep_task, None
+    if task is None:
+        return
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
+
+def _probe_duration(path: Path) -> Optional[float]:
+    """Return the duration of an audio file in seconds, if it can be measured."""
+    if shutil.which("ffprobe"):
+        result = subprocess.run(
+            ["ffprobe", "-v", "error", "-show_entries", "format=duration",
+             "-of", "default=noprint_wrappers=1:nokey=1", str(path)],
+            capture_output=True, text=True, timeout=30,
+        )
+        try:
+            return float(result.stdout.strip())
+        except ValueError:
+            return None
+    try:
+        with wave.open(str(path), 'rb') as wav:
+            return wav.getnframes() / float(wav.getframerate())
+    except (wave.Error, EOFError):
+        return None
+
+
+def _transcode(source: Path) -> tuple:
+    """Convert to mono Opus; returns (path, content type). Keeps the original without ffmpeg."""
+    if not shutil.which("ffmpeg"):
+        return source, None
+    target = source.with_suffix('.ogg')
+    result = subprocess.run(
+        ["ffmpeg", "-y", "-loglevel", "error", "-i", str(source), *FFMPEG_ARGS, str(target)],
+        capture_output=True, text=True, timeout=300,
+    )
+    if result.returncode != 0:
+        print(f"Warning: ffmpeg failed, keeping original audio: {result.stderr.strip()}")
+        return source, None
+    return target, "audio/ogg"
+
+
+def _process_upload(upload_id: str) -> None:
+    """Background job: claim the upload, then process it unless that already happened."""
+    # The claim file is never unlinked while in use (only by the sweep, with
+    # its session), so every process locks the same inode
+    fd = os.open(_claim_path(upload_id), os.O_CREAT | os.O_RDWR, 0o644)
+    try:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return  # another worker is processing it
+        try:
+            session = load_session(upload_id)
+        except UploadError:
+            return
+        if session['status'] == 'processing':
+            _process_claimed(upload_id, session)
+    finally:
+        os.close(fd)  # releases the lock
+
+
+def _process_claimed(upload_id: str, session: Dict[str, Any]) -> None:
+    """Transcode, measure, upload to storage, record voice_messages row."""
+    from db import supabase
+    from events import broker
+
+    source = _data_path(upload_id)
+    try:
+        audio_path, content_type = _transcode(source)
+        content_type = content_type or session['content_type']
+        duration = _probe_duration(audio_path)
+
+        extension = '.ogg' if audio_path.suffix == '.ogg' else '.' + content_type.split('/')[-1].split(';')[0]
+        storage_path = f"{session['worker_id'] or 'anonymous'}/{upload_id}{extension}"
+        supabase.storage.from_(STORAGE_BUCKET).upload(
+            storage_path,
+            audio_path,
+            file_options={"content-type": content_type, "upsert": "true"}
+        )
+        url_data = supabase.storage.from_(STORAGE_BUCKET).get_public_url(storage_path)
+        audio_url = url_data.publicUrl if hasattr(url_data, 'publicUrl') else str(url_data)
+
+        voice_message = {
+            'audio_url': audio_url,
+            'duration_seconds': int(round(duration)) if duration is not None else None,
+        }
+        if session['worker_id']:
+            voice_message['worker_id'] = session['worker_id']
+        if session['application_id']:
+            voice_message['application_id'] = session['application_id']
+            supabase.table("applications").update({'audio_url': audio_url}).eq("id", session['application_id']).execute()
+        supabase.table("voice_messages").insert(voice_message).execute()
+
+        session.update({
+            'status': 'complete',
+            'audio_url': audio_url,
+            'duration_seconds': voice_message['duration_seconds'],
+        })
+        broker.publish('application.voice_ready', {
+            'upload_id': upload_id,
+            'application_id': session['application_id'],
+            'worker_id': session['worker_id'],
+            'audio_url': audio_url,
+        })
+        for path in {source, audio_path}:
+            path.unlink(missing_ok=True)
+    except Exception as e:
+        print(f"Error processing voice upload {upload_id}: {e}")
+        session.update({'status': 'failed', 'error': str(e)})
+    _store_session(session)